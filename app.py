@@ -10,12 +10,17 @@ try:
 except ImportError:
     def gerenciar_configuracoes():
         st.error("Erro ao carregar gerenciamento de configurações. Verifique se o arquivo 'configuracoes.py' está presente.")
-import fitz  # PyMuPDF
-import pandas as pd
 import calendar
+from collections import Counter
 from datetime import datetime, date
-import json
+import io
 import locale
+import time
+# Só o necessário para a tela de login; pandas, PyMuPDF, openai, reportlab e fpdf são
+# importados pelas telas e ações que os usam, na primeira vez que são abertas
+from armazenamento import TAREFA_EXECUTANDO, TAREFA_FALHOU, TAREFA_NA_FILA, Repositorio
+from arquivos_processo import LIMITE_UPLOAD_SESSAO_MB, gravar_upload, remover_blob
+from instrumentacao import execucao_medida, medido, medir
 
 # Ajuste dos imports dos módulos das páginas
 
@@ -108,29 +113,66 @@ def format_date_iso(date_str):
                 return date_str
     return date_str
 
+@st.cache_resource
+def get_repositorio():
+    """Repositório persistente compartilhado por todas as sessões"""
+    return Repositorio()
+
+def obter_chave_openai():
+    """Chave da API da OpenAI da variável de ambiente ou, na falta dela, dos secrets do Streamlit"""
+    if os.environ.get("OPENAI_API_KEY"):
+        return os.environ["OPENAI_API_KEY"]
+    try:
+        return st.secrets.get("OPENAI_API_KEY")
+    except FileNotFoundError:
+        return None
+
+def liberar_upload(arquivo):
+    """Apaga da memória do servidor um arquivo já consumido do file_uploader.
+
+    O Streamlit só descarta os envios quando o usuário remove o arquivo no navegador ou a sessão
+    termina; trocar a chave do widget não basta.
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    contexto = get_script_run_ctx()
+    if contexto is not None:
+        contexto.uploaded_file_mgr.remove_file(contexto.session_id, arquivo.file_id)
+
+def upload_excede_limite_sessao():
+    """Se os arquivos enviados por esta sessão, ainda na memória do servidor, passam do limite somado"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    contexto = get_script_run_ctx()
+    if contexto is None:
+        return False
+    # O gerenciador em memória guarda os envios por sessão; outros gerenciadores não ocupam a memória
+    envios = getattr(contexto.uploaded_file_mgr, "file_storage", {}).get(contexto.session_id, {})
+    return sum(len(envio.data) for envio in envios.values()) > LIMITE_UPLOAD_SESSAO_MB * 1024 * 1024
+
+@st.cache_resource
+def get_fila_pre_laudos():
+    """Fila de pré-laudos em segundo plano, compartilhada por todas as sessões"""
+    from fila_pre_laudos import FilaPreLaudos
+    return FilaPreLaudos(get_repositorio())
+
+@st.cache_resource
+def get_fila_minutas(chave_api):
+    """Fila de redação das minutas com IA em segundo plano, compartilhada por todas as sessões"""
+    from cache_respostas import obter_cache_respostas
+    from fila_minutas import FilaMinutas
+    return FilaMinutas(get_repositorio(), api_key=chave_api, cache=obter_cache_respostas())
+
 def init_session_data():
     """Inicializa dados na sessão do Streamlit"""
-    if 'users' not in st.session_state:
-        st.session_state.users = {
-            "admin": {
-                "password": "admin123",
-                "role": "administrador",
-                "name": "Dr. Hyttallo",
-                "permissoes": {}
-            }
-        }
-    
-    if 'pericias' not in st.session_state:
-        st.session_state.pericias = {}
-    if 'pericias_por_dia' not in st.session_state:
-        st.session_state.pericias_por_dia = {}
-    
-    if 'processos' not in st.session_state:
-        st.session_state.processos = {}
-    
-    if 'locais_estaduais' not in st.session_state:
-        st.session_state.locais_estaduais = []
-    
+    # Usuários, locais, perícias e processos ficam no repositório persistente
+    get_repositorio()
+    # Inicia os despachantes das filas já na primeira execução do script depois que o servidor sobe:
+    # tarefas pendentes de antes da parada voltam a rodar sem esperar alguém abrir a tela de processos
+    # (a das minutas só existe com a chave da API configurada)
+    get_fila_pre_laudos()
+    chave_api = obter_chave_openai()
+    if chave_api:
+        get_fila_minutas(chave_api)
+
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
     
@@ -159,9 +201,9 @@ def init_session_data():
 
 def authenticate_user(username, password):
     """Autentica usuário"""
-    if username in st.session_state.users:
-        if st.session_state.users[username]["password"] == password:
-            return st.session_state.users[username]
+    user_info = get_repositorio().obter_usuario(username)
+    if user_info and user_info["password"] == password:
+        return user_info
     return None
 
 def has_permission(user_info, permission):
@@ -174,12 +216,74 @@ def has_permission(user_info, permission):
 
 def get_all_locais():
     """Retorna todos os locais (federais + estaduais) em ordem alfabética"""
-    estaduais_ordenados = sorted(st.session_state.locais_estaduais)
+    estaduais_ordenados = get_repositorio().listar_locais_estaduais()
     return LOCAIS_FEDERAIS + estaduais_ordenados
+# Campos do processo usados na certidão de ausência (a tupla deles é a chave do cache das certidões)
+CAMPOS_CERTIDAO = ("id", "situacao", "numero_processo", "nome_parte", "tipo", "horario", "data", "local")
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def certidoes_do_dia(ausentes):
+    """PDF com as certidões de ausência do dia; ausentes são tuplas com os CAMPOS_CERTIDAO de cada processo.
+
+    As reexecuções da tela reaproveitam o PDF enquanto os ausentes e seus dados não mudam.
+    """
+    from utilidades import gerar_certidoes_ausencia
+    return gerar_certidoes_ausencia([dict(zip(CAMPOS_CERTIDAO, ausente)) for ausente in ausentes])
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def peticao_inicial(pdf_handle, pdf_sha256):
+    """Texto das primeiras páginas do PDF do processo, ou None se o arquivo não estiver mais no disco.
+
+    Com o documento no cache de texto, recorta as páginas já extraídas; sem ele, lê só essas páginas.
+    """
+    from arquivos_processo import abrir_blob
+    from extracao_pdf import extrair_peticao_inicial
+    try:
+        with abrir_blob(pdf_handle) as buffer:
+            return extrair_peticao_inicial(buffer, sha256=pdf_sha256)
+    except FileNotFoundError:
+        return None
+
+
+@st.cache_data(max_entries=48, show_spinner=False)
+def resumo_do_mes(year, month, versao_agenda):
+    """Resumo do mês para o calendário (rótulos, locais e total de processos por dia).
+
+    A versão da agenda faz parte da chave, então o cache só é refeito quando a agenda muda.
+    """
+    repo = get_repositorio()
+    pericias_por_dia = repo.pericias_do_mes(year, month)
+    processos_por_dia = repo.contar_processos_do_mes(year, month)
+    semanas = []
+    for week in calendar.monthcalendar(year, month):
+        celulas = []
+        for day in week:
+            if day == 0:
+                celulas.append(None)
+                continue
+            date_str = f"{year}-{month:02d}-{day:02d}"
+            locais = pericias_por_dia.get(date_str, [])
+            num_processos = processos_por_dia.get(date_str, 0)
+            if len(locais) == 1:
+                rotulo = f"**{day}**\n📍 {locais[0].split('(')[0].strip()[:10]}"
+                ajuda = f"Perícia em: {locais[0]} ({num_processos} processos)"
+            elif locais:
+                rotulo = f"**{day}**\n📍 {len(locais)} locais"
+                ajuda = f"Perícias em: {', '.join(locais)} ({num_processos} processos)"
+            else:
+                rotulo = f"{day}"
+                ajuda = None
+            celulas.append({"data": date_str, "locais": locais, "rotulo": rotulo, "ajuda": ajuda})
+        semanas.append(celulas)
+    return semanas
+
+@medido()
 def create_calendar_view(year, month):
     """Cria visualização do calendário em português"""
-    cal = calendar.monthcalendar(year, month)
     month_name = MESES_PT[month]
+    semanas = resumo_do_mes(year, month, get_repositorio().versao_agenda)
     
     st.subheader(f"📅 {month_name} {year}")
     
@@ -189,117 +293,82 @@ def create_calendar_view(year, month):
         cols[i].markdown(f"**{day}**")
     
     # Dias do mês
-    for week in cal:
+    for celulas in semanas:
         cols = st.columns(7)
-        for i, day in enumerate(week):
-            if day == 0:
+        for i, celula in enumerate(celulas):
+            if celula is None:
                 cols[i].write("")
-            else:
-                date_str = f"{year}-{month:02d}-{day:02d}"
-
-                # Verificar se há perícias neste dia
-                pericias_do_dia = st.session_state.pericias_por_dia.get(date_str, [])
-
-                if pericias_do_dia:
-                    num_pericias = len(pericias_do_dia)
-                    if num_pericias == 1:
-                        local_short = pericias_do_dia[0].split('(')[0].strip()[:10]
-                        if cols[i].button(
-                            f"**{day}**\n📍 {local_short}",
-                            key=f"day_{date_str}",
-                            help=f"Perícia em: {pericias_do_dia[0]}",
-                            type="primary",
-                            use_container_width=True
-                        ):
-                            st.session_state.selected_date_local = {"data": date_str, "local": pericias_do_dia[0]}
-                            st.rerun()
-                    else:
-                        if cols[i].button(
-                            f"**{day}**\n📍 {num_pericias} locais",
-                            key=f"day_{date_str}",
-                            help=f"Perícias em: {', '.join(pericias_do_dia)}",
-                            type="primary",
-                            use_container_width=True
-                        ):
-                            # Salva a lista de locais para esse dia em selected_date_multilocais
-                            st.session_state.selected_date_multilocais = {
-                                "date": date_str,
-                                "locais": pericias_do_dia
-                            }
-                            st.session_state.selected_date = None
-                            st.rerun()
+                continue
+
+            date_str = celula["data"]
+            pericias_do_dia = celula["locais"]
+            if not pericias_do_dia:
+                if cols[i].button(celula["rotulo"], key=f"day_{date_str}", use_container_width=True):
+                    st.session_state.selected_date = date_str
+            elif cols[i].button(
+                celula["rotulo"],
+                key=f"day_{date_str}",
+                help=celula["ajuda"],
+                type="primary",
+                use_container_width=True
+            ):
+                if len(pericias_do_dia) == 1:
+                    st.session_state.selected_date_local = {"data": date_str, "local": pericias_do_dia[0]}
                 else:
-                    if cols[i].button(f"{day}", key=f"day_{date_str}", use_container_width=True):
-                        st.session_state.selected_date = date_str
+                    # Salva a lista de locais para esse dia em selected_date_multilocais
+                    st.session_state.selected_date_multilocais = {
+                        "date": date_str,
+                        "locais": pericias_do_dia
+                    }
+                    st.session_state.selected_date = None
+                st.rerun()
 
+@medido()
 def show_local_specific_view(local_name):
     """Mostra visualização específica de um local"""
     st.markdown(f"## 📍 {local_name}")
     st.markdown("---")
     
-    # Filtrar perícias deste local
-    pericias_local = []
-    for chave, info in st.session_state.pericias.items():
-        if info['local'] == local_name:
-            if '_' in chave:
-                data_chave = chave.split('_')[0]
-            else:
-                data_chave = chave
-            
-            pericias_local.append({
-                'Data': format_date_br(data_chave),
-                'Local': info['local'],
-                'Observações': info.get('observacoes', ''),
-                'Criado por': info.get('criado_por', 'N/A'),
-                'Data_Sort': data_chave,
-                'Data_ISO': data_chave
-            })
+    # Perícias deste local, já separadas e ordenadas pelo índice do repositório
+    repo = get_repositorio()
+    hoje = datetime.now().date()
+    futuras, passadas = repo.pericias_do_local(local_name, hoje)
     
-    if pericias_local:
-        # Separar por futuras e passadas
-        hoje = datetime.now().date()
-        
-        futuras = []
-        passadas = []
-        
-        for pericia in pericias_local:
-            data_pericia = datetime.strptime(pericia['Data_Sort'], '%Y-%m-%d').date()
-            if data_pericia >= hoje:
-                futuras.append(pericia)
-            else:
-                passadas.append(pericia)
-        
+    if futuras or passadas:
         # Mostrar perícias futuras com datas clicáveis
         if futuras:
             st.markdown("### 📅 Perícias Agendadas")
+            processos_por_data = repo.contar_processos_por_data(local_name, hoje.isoformat())
             
-            for pericia in sorted(futuras, key=lambda x: x['Data_Sort']):
+            for pericia in futuras:
                 col1, col2, col3, col4 = st.columns([2, 3, 3, 2])
                 
                 with col1:
                     # Data clicável
-                    if st.button(f"📅 {pericia['Data']}", key=f"date_click_{pericia['Data_ISO']}_{local_name}"):
-                        st.session_state.selected_date_local = {"data": pericia['Data_ISO'], "local": local_name}
+                    if st.button(f"📅 {pericia['data_obj'].strftime('%d-%m-%Y')}", key=f"date_click_{pericia['data']}_{local_name}"):
+                        st.session_state.selected_date_local = {"data": pericia['data'], "local": local_name}
                         st.rerun()
                 
                 with col2:
                     st.write(f"**Local:** {local_name}")
                 
                 with col3:
-                    st.write(f"**Obs:** {pericia['Observações']}")
+                    st.write(f"**Obs:** {pericia.get('observacoes', '')}")
                 
                 with col4:
                     # Contar processos para esta data/local
-                    key_processos = f"{pericia['Data_ISO']}_{local_name}"
-                    num_processos = len(st.session_state.processos.get(key_processos, []))
-                    st.write(f"**Processos:** {num_processos}")
+                    st.write(f"**Processos:** {processos_por_data.get(pericia['data'], 0)}")
         
-        # Mostrar perícias passadas
+        # Mostrar perícias passadas (já em ordem decrescente)
         if passadas:
             st.markdown("### 📋 Histórico de Perícias")
-            df_passadas = pd.DataFrame(passadas)
-            df_passadas = df_passadas.sort_values('Data_Sort', ascending=False)
-            df_passadas = df_passadas.drop(['Data_Sort', 'Data_ISO'], axis=1)
+            import pandas as pd
+            df_passadas = pd.DataFrame({
+                'Data': [p['data_obj'].strftime('%d-%m-%Y') for p in passadas],
+                'Local': [p['local'] for p in passadas],
+                'Observações': [p.get('observacoes', '') for p in passadas],
+                'Criado por': [p.get('criado_por') or 'N/A' for p in passadas]
+            })
             st.dataframe(df_passadas, use_container_width=True)
     else:
         st.info(f"📭 Nenhuma perícia agendada para {local_name}")
@@ -307,19 +376,32 @@ def show_local_specific_view(local_name):
     # Estatísticas do local
     st.markdown("### 📊 Estatísticas")
     # Novo: mostrar apenas "Total de Dias com Perícias"
-    datas_unicas = set()
-    for p in pericias_local:
-        datas_unicas.add(p['Data_Sort'])
-    st.metric("Total de Dias com Perícias", len(datas_unicas))
-
-def extrair_texto_pdf(uploaded_file):
-    texto = ""
-    with fitz.open(stream=uploaded_file.read(), filetype="pdf") as doc:
-        for pagina in doc:
-            texto += pagina.get_text()
-    return texto
+    st.metric("Total de Dias com Perícias", repo.total_dias_do_local(local_name))
+
+    # Histórico completo (todos os locais) para honorários e relatórios anuais, gravado em lotes;
+    # como abrange todos os locais, só o administrador exporta
+    if st.session_state.user_info['role'] == 'administrador':
+        with st.expander("📤 Exportar histórico completo de perícias e processos"):
+            from entrega_arquivos import VALIDADE_DOWNLOAD_MIN, DownloadGrandeDemais, link_download, reservar_diretorio_download
+            from exportacao_historico import FORMATOS, formatos_disponiveis, gravar_historico
+            formato = st.radio("Formato", formatos_disponiveis(), horizontal=True, key="formato_historico",
+                               format_func=str.upper)
+            if st.button("📤 Gerar arquivo do histórico"):
+                with st.spinner("Gravando o histórico..."), medir("exportar_historico"):
+                    caminho_historico = gravar_historico(repo, formato, reservar_diretorio_download())
+                try:
+                    st.markdown(
+                        link_download(caminho_historico, f"historico_pericias_{hoje.isoformat()}{FORMATOS[formato][0]}",
+                                      "⬇️ Salvar histórico"),
+                        unsafe_allow_html=True
+                    )
+                except DownloadGrandeDemais as erro:
+                    st.error(f"❌ {erro}")
+                else:
+                    st.caption(f"O link vale por {VALIDADE_DOWNLOAD_MIN} minutos.")
 
 
+@medido()
 def show_processos_view(data_iso, local_name):
     """Mostra a tela de gerenciamento de processos para uma data/local específico"""
     data_br = format_date_br(data_iso)
@@ -344,21 +426,8 @@ def show_processos_view(data_iso, local_name):
         col_v1, col_v2 = st.columns(2)
         with col_v1:
             if st.button("✅ Confirmar Vinculação"):
-                # Atualiza pericias_por_dia corretamente para múltiplos locais
-                if data_iso not in st.session_state.pericias_por_dia:
-                    st.session_state.pericias_por_dia[data_iso] = [novo_local]
-                elif novo_local not in st.session_state.pericias_por_dia[data_iso]:
-                    st.session_state.pericias_por_dia[data_iso].append(novo_local)
-
-                # Criar a nova chave da perícia vinculada e adicioná-la
-                chave = f"{data_iso}_{novo_local}"
-                if chave not in st.session_state.pericias:
-                    st.session_state.pericias[chave] = {
-                        "local": novo_local,
-                        "observacoes": "",
-                        "criado_por": st.session_state.username,
-                        "criado_em": datetime.now().isoformat()
-                    }
+                # Registrar a perícia vinculada (ignorado se a data/local já existir)
+                get_repositorio().adicionar_pericia(data_iso, novo_local, st.session_state.username)
 
                 st.session_state.selected_date_local = {"data": data_iso, "local": novo_local}
                 st.session_state.show_vincular_local = False
@@ -372,10 +441,9 @@ def show_processos_view(data_iso, local_name):
     
     # Chave para identificar os processos desta data/local
     key_processos = f"{data_iso}_{local_name}"
-    
-    # Inicializar lista de processos se não existir
-    if key_processos not in st.session_state.processos:
-        st.session_state.processos[key_processos] = []
+    repo = get_repositorio()
+    # Processos indexados por id e por horário (consultas, conflitos, edição e exclusão sem varrer a lista)
+    processos_dia = repo.processos_do_dia(data_iso, local_name)
     
     # Formulário para adicionar novo processo
     with st.expander("➕ Adicionar Novo Processo"):
@@ -394,8 +462,10 @@ def show_processos_view(data_iso, local_name):
                 tipo_pericia = st.selectbox("Tipo", TIPOS_PERICIA)
                 situacao = st.selectbox("Situação", SITUACOES_PROCESSO)
 
-            # Novo campo de upload de PDF
-            uploaded_pdf = st.file_uploader("Selecionar arquivo do processo (PDF)", type=["pdf"], key="upload_pdf")
+            # Novo campo de upload de PDF (a chave muda após cada gravação para o Streamlit liberar o arquivo da memória)
+            versao_upload = st.session_state.get("upload_pdf_versao", 0)
+            uploaded_pdf = st.file_uploader("Selecionar arquivo do processo (PDF)", type=["pdf"], key=f"upload_pdf_{versao_upload}")
+            upload_excede_limite = uploaded_pdf is not None and upload_excede_limite_sessao()
 
             # Verificação do intervalo permitido para o horário
             hora_min = datetime.strptime("08:00", "%H:%M").time()
@@ -407,13 +477,18 @@ def show_processos_view(data_iso, local_name):
             if st.form_submit_button("✅ Adicionar Processo"):
                 if numero_processo and nome_parte:
                     # Verificar se já existe processo com o mesmo horário nesta data/local
-                    existe_horario = any(
-                        p['horario'] == horario.strftime("%H:%M") for p in st.session_state.processos[key_processos]
-                    )
-                    if existe_horario:
+                    if processos_dia.horario_ocupado(horario.strftime("%H:%M")):
                         st.error("❌ Já existe um processo cadastrado neste horário!")
                     elif horario < hora_min or horario > hora_max:
                         st.error("❌ O horário deve estar entre 08:00 e 16:45.")
+                    elif upload_excede_limite:
+                        # O arquivo recusado sai da memória do servidor e do formulário
+                        liberar_upload(uploaded_pdf)
+                        st.session_state.upload_pdf_versao = versao_upload + 1
+                        st.error(
+                            f"❌ Os arquivos enviados nesta sessão passam de {LIMITE_UPLOAD_SESSAO_MB} MB; "
+                            "o PDF foi descartado."
+                        )
                     else:
                         novo_processo = {
                             "numero_processo": numero_processo,
@@ -423,46 +498,89 @@ def show_processos_view(data_iso, local_name):
                             "situacao": situacao,
                             "criado_por": st.session_state.username,
                             "criado_em": datetime.now().isoformat(),
-                            "pdf": uploaded_pdf.read() if uploaded_pdf is not None else None,
                         }
-                        st.session_state.processos[key_processos].append(novo_processo)
-                        st.success("✅ Processo adicionado com sucesso!")
-                        st.session_state.view = "processos"
-                        st.rerun()
-                        return
+                        if uploaded_pdf is not None:
+                            # Grava o PDF no diretório de blobs; o processo guarda só o handle e o hash
+                            novo_processo.update(gravar_upload(uploaded_pdf))
+                        if repo.adicionar_processo(data_iso, local_name, novo_processo) is None:
+                            # Outra sessão ocupou o horário entre a leitura e a gravação; o envio continua
+                            # no formulário para nova tentativa, e o blob recém-gravado não fica órfão
+                            if uploaded_pdf is not None and not repo.blob_em_uso(novo_processo["pdf_handle"]):
+                                remover_blob(novo_processo["pdf_handle"])
+                            st.error("❌ Já existe um processo cadastrado neste horário!")
+                        else:
+                            if uploaded_pdf is not None:
+                                liberar_upload(uploaded_pdf)
+                                st.session_state.upload_pdf_versao = versao_upload + 1
+                            st.success("✅ Processo adicionado com sucesso!")
+                            st.session_state.view = "processos"
+                            st.rerun()
+                            return
                 else:
                     st.error("❌ Número do processo e nome da parte são obrigatórios!")
-    
-    # Listar processos existentes
-    processos_lista = st.session_state.processos.get(key_processos, [])
 
-    if processos_lista:
-        # Tela de confirmação de ação
+    # Importação da pauta enviada pela vara (planilha com número, parte, horário e, opcionalmente, tipo)
+    with st.expander("📥 Importar pauta (CSV ou XLSX)"):
+        versao_pauta = st.session_state.get("upload_pauta_versao", 0)
+        pauta = st.file_uploader(
+            "Planilha da pauta", type=["csv", "xlsx"], key=f"upload_pauta_{versao_pauta}",
+            help="Colunas: número do processo, nome da parte, horário e tipo (opcional; em branco vale o tipo abaixo)."
+        )
+        tipo_padrao_pauta = st.selectbox("Tipo para linhas sem tipo", TIPOS_PERICIA, key="tipo_padrao_pauta")
+        if st.button("📥 Importar pauta", disabled=pauta is None):
+            from importacao_pauta import PautaInvalida, importar_pauta
+            if upload_excede_limite_sessao():
+                # A planilha recusada sai da memória do servidor e do campo de envio
+                liberar_upload(pauta)
+                st.session_state.upload_pauta_versao = versao_pauta + 1
+                st.error(f"❌ Os arquivos enviados nesta sessão passam de {LIMITE_UPLOAD_SESSAO_MB} MB; a planilha foi descartada.")
+            else:
+                try:
+                    with medir("importar_pauta"):
+                        importados, erros = importar_pauta(
+                            repo, data_iso, local_name, pauta, pauta.name, st.session_state.username,
+                            TIPOS_PERICIA, tipo_padrao_pauta
+                        )
+                except PautaInvalida as erro:
+                    st.error(f"❌ {erro}")
+                else:
+                    st.session_state.importacao_pauta = (key_processos, importados, erros)
+                    liberar_upload(pauta)
+                    st.session_state.upload_pauta_versao = versao_pauta + 1
+                    st.rerun()
+        relatorio = st.session_state.get("importacao_pauta")
+        if relatorio and relatorio[0] == key_processos:
+            _, importados, erros = relatorio
+            st.success(f"✅ {importados} processo(s) importado(s).")
+            if erros:
+                st.warning(f"⚠️ {len(erros)} linha(s) não importada(s):")
+                st.dataframe(
+                    [{"Linha": erro["linha"], "Erro": erro["erro"]} for erro in erros],
+                    hide_index=True, use_container_width=True
+                )
+
+    # Listar processos existentes
+    if processos_dia:
+        # Tela de confirmação de ação (guarda só o id; o processo é lido do mapa atual)
         if "confirm_action" in st.session_state:
-            acao, chave, proc = st.session_state.confirm_action
+            acao, chave, processo_id = st.session_state.confirm_action
+            proc = processos_dia.obter(processo_id)
+            if proc is None:
+                del st.session_state.confirm_action
+                st.rerun()
             st.warning(f"⚠️ Deseja realmente confirmar esta ação: {acao.upper()} para o processo {proc['numero_processo']} de {proc['nome_parte']} às {proc['horario']}?")
             col_sim, col_nao = st.columns(2)
             with col_sim:
                 if st.button("✅ Sim"):
                     if acao == "ausencia":
                         # Atualizar a situação do processo para "Ausente"
-                        for i, p in enumerate(st.session_state.processos[chave]):
-                            if (p['numero_processo'] == proc['numero_processo'] and
-                                p['nome_parte'] == proc['nome_parte'] and
-                                p['horario'] == proc['horario']):
-                                st.session_state.processos[chave][i]['situacao'] = 'Ausente'
-                                break
+                        repo.atualizar_processo(proc['id'], {'situacao': 'Ausente'})
                         st.success("✅ Ausência registrada com sucesso.")
                     elif acao == "excluir":
-                        st.session_state.processos[chave] = [
-                            p for p in st.session_state.processos[chave]
-                            if not (p['numero_processo'] == proc['numero_processo'] and
-                                    p['nome_parte'] == proc['nome_parte'] and
-                                    p['horario'] == proc['horario'])
-                        ]
+                        repo.remover_processo(proc['id'])
                         st.success("✅ Processo excluído com sucesso!")
                     del st.session_state.confirm_action
-                    st.session_state.selected_date_local = {"data": chave.split('_')[0], "local": chave.split('_')[1]}
+                    st.session_state.selected_date_local = {"data": proc['data'], "local": proc['local']}
                     st.rerun()
             with col_nao:
                 if st.button("❌ Não"):
@@ -473,7 +591,7 @@ def show_processos_view(data_iso, local_name):
         st.markdown("### 📋 Processos Cadastrados")
 
         # Ordenar por horário
-        processos_ordenados = sorted(processos_lista, key=lambda x: x['horario'])
+        processos_ordenados = processos_dia.ordenados()
 
         # Novo cabeçalho das colunas
         header_cols = st.columns([2, 2, 3, 3, 1.5, 2, 2])
@@ -485,16 +603,26 @@ def show_processos_view(data_iso, local_name):
         header_cols[5].markdown("**Situação**")
         header_cols[6].markdown("**Ação**")
 
-        for idx, processo in enumerate(processos_ordenados):
+        # Situação das tarefas de pré-laudo dos processos do dia (na fila, gerando, falhou)
+        from fila_pre_laudos import ROTULOS_SITUACAO
+        situacao_lote = get_fila_pre_laudos().situacao(processos_dia.por_id)
+        lote_em_andamento = any(
+            item["status"] in (TAREFA_NA_FILA, TAREFA_EXECUTANDO) for item in situacao_lote.values()
+        )
+
+        for processo in processos_ordenados:
             row_cols = st.columns([2, 2, 3, 3, 1.5, 2, 2])
             # BLOCO DE UPLOAD/ANEXO
             with row_cols[0]:
+                status_tarefa = situacao_lote.get(processo["id"], {}).get("status")
                 # NOVA LÓGICA DE EXIBIÇÃO DO STATUS DE ANEXO (ATUALIZADO)
-                if processo.get("anexo_status") == "Pronto":
+                if status_tarefa in (TAREFA_NA_FILA, TAREFA_EXECUTANDO, TAREFA_FALHOU):
+                    st.write(ROTULOS_SITUACAO[status_tarefa])
+                elif processo.get("anexo_status") == "Pronto":
                     st.write("✅ Pronto")
                 elif processo.get("anexo_status") == "Aguardando":
                     st.write("⏳ Aguardando")
-                elif processo.get("pdf") is not None:
+                elif processo.get("tem_pdf"):
                     st.write("⏳ Aguardando")
                 else:
                     st.write("📎 Anexar")
@@ -509,20 +637,20 @@ def show_processos_view(data_iso, local_name):
 
                 # Botão de redigir laudo
                 with col_a:
-                    if st.button("📝", key=f"redigir_{key_processos}_{idx}"):
+                    if st.button("📝", key=f"redigir_{processo['id']}"):
                         # Redirecionar para a tela de edição de laudo, salvando o processo em edição
                         st.session_state.view = "editar_laudo"
                         st.session_state.processo_em_edicao = processo
                         st.rerun()
 
                 with col_b:
-                    if st.button("🚫", key=f"ausente_{key_processos}_{idx}"):
-                        st.session_state.confirm_action = ("ausencia", key_processos, processo)
+                    if st.button("🚫", key=f"ausente_{processo['id']}"):
+                        st.session_state.confirm_action = ("ausencia", key_processos, processo["id"])
                         st.rerun()
 
                 with col_c:
-                    if st.button("🗑️", key=f"excluir_{key_processos}_{idx}"):
-                        st.session_state.confirm_action = ("excluir", key_processos, processo)
+                    if st.button("🗑️", key=f"excluir_{processo['id']}"):
+                        st.session_state.confirm_action = ("excluir", key_processos, processo["id"])
                         st.rerun()
 
         # Interface de edição do laudo Auxílio-Doença (apenas se page == "editar_laudo_ad")
@@ -530,7 +658,7 @@ def show_processos_view(data_iso, local_name):
             proc_info = st.session_state.get("processo_editando")
             if proc_info and proc_info["key_processos"] == key_processos:
                 idx = proc_info["idx"]
-                processo = processos_ordenados[idx]
+                processo = processos_dia.obter(proc_info.get("id")) or processos_ordenados[idx]
                 if processo.get("anexo_status") == "Pronto" and (processo.get("tipo") == "AD" or processo.get("tipo") == "Auxílio Doença (AD)"):
                     st.markdown("## ✍️ Edição do Laudo Auxílio-Doença")
 
@@ -564,28 +692,36 @@ def show_processos_view(data_iso, local_name):
                     conclusao = st.text_area("Conclusão do perito com base nos dados acima", value=processo.get("conclusao", ""), key=f"conclusao_{key_processos}_{idx}")
 
                     if st.button("💾 Salvar Laudo", key=f"salvar_laudo_{key_processos}_{idx}"):
-                        processo["nome"] = nome
-                        processo["profissao"] = profissao
-                        processo["cid"] = cid
-                        processo["anamnese"] = anamnese
-                        processo["exame_fisico"] = exame_fisico
-                        processo["documentos"] = documentos
-                        processo["incapacidade"] = incapacidade
-                        processo["data_inicio"] = str(data_inicio)
-                        processo["data_fim"] = str(data_fim)
-                        processo["quesitos"] = quesitos
-                        processo["conclusao"] = conclusao
+                        repo.atualizar_processo(processo["id"], {
+                            "nome": nome,
+                            "profissao": profissao,
+                            "cid": cid,
+                            "anamnese": anamnese,
+                            "exame_fisico": exame_fisico,
+                            "documentos": documentos,
+                            "incapacidade": incapacidade,
+                            "data_inicio": str(data_inicio),
+                            "data_fim": str(data_fim),
+                            "quesitos": quesitos,
+                            "conclusao": conclusao
+                        })
                         st.success("Laudo salvo com sucesso.")
 
         # Opções de edição (mantido se necessário)
         if has_permission(st.session_state.user_info, 'editar_pericias'):
             st.markdown("### ✏️ Editar Processo")
-            opcoes_processos = [f"{p['horario']} - {p['numero_processo']} - {p['nome_parte']}" for p in processos_ordenados]
+            opcoes_processos = [p["id"] for p in processos_ordenados]
             if opcoes_processos:
-                processo_selecionado = st.selectbox("Selecione o processo para editar:", [""] + opcoes_processos)
-                if processo_selecionado:
-                    indice_processo = opcoes_processos.index(processo_selecionado)
-                    processo_atual = processos_ordenados[indice_processo]
+                processo_selecionado = st.selectbox(
+                    "Selecione o processo para editar:",
+                    [None] + opcoes_processos,
+                    format_func=lambda pid: "" if pid is None else (
+                        f"{processos_dia.obter(pid)['horario']} - {processos_dia.obter(pid)['numero_processo']} - "
+                        f"{processos_dia.obter(pid)['nome_parte']}"
+                    )
+                )
+                if processo_selecionado is not None:
+                    processo_atual = processos_dia.obter(processo_selecionado)
                     with st.form("edit_processo"):
                         st.markdown("#### Editar Processo")
                         col1, col2 = st.columns(2)
@@ -599,25 +735,22 @@ def show_processos_view(data_iso, local_name):
                         col1, col2 = st.columns(2)
                         with col1:
                             if st.form_submit_button("✅ Salvar Alterações", type="primary"):
-                                # Encontrar o processo original na lista
-                                for i, p in enumerate(st.session_state.processos[key_processos]):
-                                    if (p['numero_processo'] == processo_atual['numero_processo'] and
-                                        p['nome_parte'] == processo_atual['nome_parte'] and
-                                        p['horario'] == processo_atual['horario']):
-                                        st.session_state.processos[key_processos][i] = {
-                                            "numero_processo": novo_numero,
-                                            "nome_parte": novo_nome,
-                                            "horario": novo_horario.strftime("%H:%M"),
-                                            "tipo": novo_tipo,
-                                            "situacao": nova_situacao,
-                                            "criado_por": processo_atual['criado_por'],
-                                            "criado_em": processo_atual['criado_em'],
-                                            "editado_por": st.session_state.username,
-                                            "editado_em": datetime.now().isoformat()
-                                        }
-                                        break
-                                st.success("✅ Processo atualizado com sucesso!")
-                                st.experimental_rerun()
+                                if processos_dia.horario_ocupado(novo_horario.strftime("%H:%M"), ignorar_id=processo_atual['id']):
+                                    st.error("❌ Já existe um processo cadastrado neste horário!")
+                                # Só os campos do formulário são mesclados; PDF, anexo e laudo são preservados
+                                elif not repo.atualizar_processo(processo_atual['id'], {
+                                    "numero_processo": novo_numero,
+                                    "nome_parte": novo_nome,
+                                    "horario": novo_horario.strftime("%H:%M"),
+                                    "tipo": novo_tipo,
+                                    "situacao": nova_situacao,
+                                    "editado_por": st.session_state.username,
+                                    "editado_em": datetime.now().isoformat()
+                                }):
+                                    st.error("❌ Já existe um processo cadastrado neste horário!")
+                                else:
+                                    st.success("✅ Processo atualizado com sucesso!")
+                                    st.experimental_rerun()
                         with col2:
                             # Exclusão já disponível acima, pode omitir
                             pass
@@ -626,32 +759,117 @@ def show_processos_view(data_iso, local_name):
         st.markdown("### 📊 Estatísticas de Perícias do Dia")
         col1, col2, col3 = st.columns(3)
         with col1:
-            total_a_realizar = len([p for p in processos_lista if p['situacao'] in ['Pré-laudo', 'Em produção']])
+            total_a_realizar = len([p for p in processos_dia if p['situacao'] in ['Pré-laudo', 'Em produção']])
             st.metric("Total de Perícias a Realizar", total_a_realizar)
         with col2:
-            total_realizadas = len([p for p in processos_lista if p['situacao'] == 'Concluído'])
+            total_realizadas = len([p for p in processos_dia if p['situacao'] == 'Concluído'])
             st.metric("Total de Perícias Realizadas", total_realizadas)
         with col3:
-            total_ausentes = len([p for p in processos_lista if p['situacao'] == 'Ausente'])
+            total_ausentes = len([p for p in processos_dia if p['situacao'] == 'Ausente'])
             st.metric("Total de Ausentes", total_ausentes)
+            if total_ausentes:
+                # Todas as certidões do dia num único PDF, gerado em memória só quando os ausentes mudam
+                ausentes = tuple(
+                    tuple(p.get(campo) for campo in CAMPOS_CERTIDAO)
+                    for p in processos_ordenados if p['situacao'] == 'Ausente'
+                )
+                with medir("certidoes_ausencia"):
+                    certidoes = certidoes_do_dia(ausentes)
+                st.download_button(
+                    "📄 Certidões de ausência do dia",
+                    data=certidoes,
+                    file_name=f"certidoes_ausencia_{data_iso}_{local_name}.pdf",
+                    mime="application/pdf",
+                )
 
         # Bloco: Ações em Lote
         st.markdown("### 🧾 Ações em Lote")
         if st.button("🛠️ Gerar Lote de Pré-Laudos"):
-            for processo in processos_ordenados:
-                tipo = processo.get("tipo", "").upper()
-                if tipo == "AD":
-                    gerar_laudo_ad(processo=processo)
-                # futuro: elif tipo == "BPC":
-                #     gerar_laudo_bpc(processo=processo)
-                
-                processo["anexo_status"] = "Pronto"
-                
-                if "arquivo_path" in processo and os.path.exists(processo["arquivo_path"]):
-                    os.remove(processo["arquivo_path"])
-                    processo["arquivo_path"] = ""
-            st.success("✅ Lote de pré-laudos gerado com sucesso!")
+            # A geração roda na fila em segundo plano e continua mesmo se a página for recarregada
+            with medir("enfileirar_pre_laudos"):
+                novas = get_fila_pre_laudos().enfileirar(processos_ordenados)
+            # A mensagem é mostrada depois do rerun, que atualiza a situação dos processos na lista
+            st.session_state.aviso_lote = (key_processos, novas)
             st.rerun()
+        aviso_lote = st.session_state.pop("aviso_lote", None)
+        if aviso_lote and aviso_lote[0] == key_processos:
+            if aviso_lote[1]:
+                st.success(f"✅ {aviso_lote[1]} pré-laudo(s) enviados para a fila de geração.")
+            else:
+                st.info("ℹ️ Os pré-laudos destes processos já foram gerados ou estão na fila.")
+
+        falhas = [
+            f"{processo['numero_processo']}: {situacao_lote[processo['id']]['erro']}"
+            for processo in processos_ordenados
+            if situacao_lote.get(processo["id"], {}).get("status") == TAREFA_FALHOU
+        ]
+        if falhas:
+            st.error("❌ Falha ao gerar alguns pré-laudos:\n\n" + "\n\n".join(falhas))
+        if lote_em_andamento:
+            if st.button("🔄 Atualizar situação do lote"):
+                st.rerun()
+
+        # Pacote do dia para a vara: laudos concluídos e certidões de ausência num ZIP
+        incluir_processos = st.checkbox("Incluir os PDFs dos processos no pacote", key=f"pacote_processos_{key_processos}")
+        if st.button("📦 Baixar tudo (laudos e certidões)"):
+            # O ZIP é montado em fluxo num arquivo próprio, sem juntar os documentos em memória, e baixado
+            # pela rota estática do Streamlit, que o lê do disco em blocos
+            from entrega_arquivos import VALIDADE_DOWNLOAD_MIN, DownloadGrandeDemais, link_download, reservar_diretorio_download
+            from exportacao_dia import gravar_pacote_dia
+            with st.spinner("Montando o pacote do dia..."), medir("pacote_dia"):
+                caminho_pacote = gravar_pacote_dia(processos_ordenados, incluir_processos, reservar_diretorio_download())
+            try:
+                st.markdown(
+                    link_download(caminho_pacote, f"pacote_{data_iso}_{local_name}.zip", "⬇️ Salvar pacote (ZIP)"),
+                    unsafe_allow_html=True
+                )
+            except DownloadGrandeDemais as erro:
+                st.error(f"❌ {erro} Desmarque os PDFs dos processos.")
+            else:
+                st.caption(f"O link vale por {VALIDADE_DOWNLOAD_MIN} minutos.")
+
+        from fila_minutas import ROTULOS_SITUACAO as ROTULOS_MINUTAS, TIPO_TAREFA as TIPO_TAREFA_MINUTAS
+        if st.button("🤖 Redigir minutas com IA (anamnese, histórico e conclusão)"):
+            from cache_texto import obter_cache_texto
+            chave_api = obter_chave_openai()
+            # Só entram processos com o texto já extraído na geração do pré-laudo (cache de texto)
+            processos_com_texto = [
+                processo for processo in processos_ordenados
+                if processo.get("pdf_sha256") and obter_cache_texto().contem(processo["pdf_sha256"])
+            ]
+            if not processos_com_texto:
+                st.warning("⚠️ Gere os pré-laudos antes de redigir as minutas.")
+            elif not chave_api:
+                st.error("❌ Configure OPENAI_API_KEY (secrets do Streamlit ou variável de ambiente).")
+            else:
+                # A redação roda na fila em segundo plano; cada processo lê as próprias páginas ao sair da fila
+                with medir("enfileirar_minutas"):
+                    novas = get_fila_minutas(chave_api).enfileirar(processos_com_texto)
+                st.session_state.aviso_minutas = (key_processos, novas)
+                st.rerun()
+        aviso_minutas = st.session_state.pop("aviso_minutas", None)
+        if aviso_minutas and aviso_minutas[0] == key_processos:
+            if aviso_minutas[1]:
+                st.success(f"✅ {aviso_minutas[1]} processo(s) enviados para a redação das minutas.")
+            else:
+                st.info("ℹ️ As minutas destes processos já foram redigidas ou estão na fila.")
+
+        situacao_minutas = repo.situacao_tarefas(TIPO_TAREFA_MINUTAS, processos_dia.por_id)
+        if situacao_minutas:
+            contagem = Counter(item["status"] for item in situacao_minutas.values())
+            st.caption("Minutas com IA: " + " · ".join(
+                f"{ROTULOS_MINUTAS[status]} {contagem[status]}" for status in ROTULOS_MINUTAS if contagem[status]
+            ))
+            falhas_minutas = [
+                f"{processo['numero_processo']}: {situacao_minutas[processo['id']]['erro']}"
+                for processo in processos_ordenados
+                if situacao_minutas.get(processo["id"], {}).get("status") == TAREFA_FALHOU
+            ]
+            if falhas_minutas:
+                st.error("❌ Falha ao redigir algumas minutas:\n\n" + "\n\n".join(falhas_minutas))
+            if contagem[TAREFA_NA_FILA] or contagem[TAREFA_EXECUTANDO]:
+                if st.button("🔄 Atualizar situação das minutas"):
+                    st.rerun()
 
     else:
         st.info("📭 Nenhum processo cadastrado para esta data/local ainda.")
@@ -680,7 +898,7 @@ def main():
         st.title("🔐 Sistema de Laudos Periciais")
         st.markdown("### Acesso Restrito")
         
-        with st.form("login_form"):
+        with st.form("login_form"), medir("login"):
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
                 st.markdown("#### Faça seu login")
@@ -722,7 +940,7 @@ def main():
         st.markdown("---")
         
         # Sidebar melhorada
-        with st.sidebar:
+        with st.sidebar, medir("barra_lateral"):
             st.markdown("### ⚙️ Configurações")
             
             # Opção para mudar senha (disponível para todos)
@@ -740,6 +958,33 @@ def main():
                     st.rerun()
                 st.markdown("---")
             
+            # Busca no texto dos processos
+            st.markdown("### 🔎 Buscar nos Processos")
+            consulta = st.text_input(
+                "Buscar nos processos",
+                key="busca_texto",
+                placeholder="ex.: CID M54, hanseníase",
+                label_visibility="collapsed"
+            )
+            if consulta.strip():
+                inicio_busca = time.perf_counter()
+                with medir("busca_texto"):
+                    resultados = get_repositorio().buscar_texto(consulta)
+                duracao_ms = (time.perf_counter() - inicio_busca) * 1000
+                st.caption(f"{len(resultados)} resultado(s) em {duracao_ms:.0f} ms")
+                for i, resultado in enumerate(resultados):
+                    if st.button(
+                        f"📄 {format_date_br(resultado['data'])} · {resultado['numero_processo']} (p. {resultado['pagina']})",
+                        key=f"busca_{i}_{resultado['processo_id']}_{resultado['pagina']}",
+                        help=f"{resultado['nome_parte']} - {resultado['local']}",
+                        use_container_width=True
+                    ):
+                        st.session_state.selected_date_local = {"data": resultado['data'], "local": resultado['local']}
+                        st.session_state.current_local_filter = None
+                        st.rerun()
+                    st.caption(resultado['trecho'])
+            st.markdown("---")
+
             # Locais de Atuação
             st.markdown("### 🏛️ Locais de Atuação")
             
@@ -768,7 +1013,7 @@ def main():
                     st.rerun()
             
             # Listar locais estaduais em ordem alfabética
-            locais_estaduais_ordenados = sorted(st.session_state.locais_estaduais)
+            locais_estaduais_ordenados = get_repositorio().listar_locais_estaduais()
             if locais_estaduais_ordenados:
                 for local in locais_estaduais_ordenados:
                     if st.button(f"📍 {local}", key=f"sidebar_estadual_{local}", use_container_width=True):
@@ -796,6 +1041,13 @@ def main():
                 # Botão para Configurações
                 if st.button("⚙️ Configurações"):
                     st.session_state.pagina = "configuracoes"
+
+                # Painel de desempenho (tempos por tela, registrados a cada execução)
+                if st.button("⏱️ Desempenho"):
+                    st.session_state.show_desempenho = not st.session_state.get("show_desempenho", False)
+                    st.session_state.current_local_filter = None
+                    st.session_state.selected_date_local = None
+                    st.rerun()
         
         # Verificar qual tela mostrar
         if st.session_state.selected_date_local:
@@ -805,7 +1057,8 @@ def main():
                 show_processos_view(data_iso, local_name)
 
         elif hasattr(st.session_state, "pagina") and st.session_state.pagina == "configuracoes":
-            gerenciar_configuracoes()
+            with medir("configuracoes"):
+                gerenciar_configuracoes()
 
         elif st.session_state.show_estaduais_management and user_info['role'] == 'administrador':
             # Gerenciamento de locais estaduais
@@ -817,19 +1070,16 @@ def main():
                 novo_local = st.text_input("Nome do Local")
                 
                 if st.form_submit_button("Adicionar Local"):
-                    if novo_local and novo_local not in st.session_state.locais_estaduais:
-                        st.session_state.locais_estaduais.append(novo_local)
-                        # Manter ordem alfabética
-                        st.session_state.locais_estaduais.sort()
+                    if novo_local and get_repositorio().adicionar_local_estadual(novo_local):
                         st.success(f"✅ Local '{novo_local}' adicionado com sucesso!")
                         st.rerun()
-                    elif novo_local in st.session_state.locais_estaduais:
+                    elif novo_local:
                         st.error("❌ Este local já existe!")
                     else:
                         st.error("❌ Por favor, insira um nome para o local!")
             
             # Listar e gerenciar locais existentes
-            locais_estaduais_ordenados = sorted(st.session_state.locais_estaduais)
+            locais_estaduais_ordenados = get_repositorio().listar_locais_estaduais()
             if locais_estaduais_ordenados:
                 st.markdown("#### 📋 Locais Estaduais Cadastrados")
                 for local in locais_estaduais_ordenados:
@@ -838,7 +1088,7 @@ def main():
                         st.write(f"📍 {local}")
                     with col2:
                         if st.button("🗑️", key=f"del_estadual_{local}"):
-                            st.session_state.locais_estaduais.remove(local)
+                            get_repositorio().remover_local_estadual(local)
                             st.success(f"Local '{local}' removido!")
                             st.rerun()
             else:
@@ -861,10 +1111,10 @@ def main():
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.form_submit_button("✅ Alterar Senha", type="primary"):
-                        if current_password == st.session_state.users[st.session_state.username]["password"]:
+                        if current_password == get_repositorio().obter_usuario(st.session_state.username)["password"]:
                             if new_password == confirm_password:
                                 if len(new_password) >= 6:
-                                    st.session_state.users[st.session_state.username]["password"] = new_password
+                                    get_repositorio().alterar_senha(st.session_state.username, new_password)
                                     st.success("✅ Senha alterada com sucesso!")
                                     st.session_state.show_change_password = False
                                     st.rerun()
@@ -920,7 +1170,7 @@ def main():
                             perm_gerenciar_locais_estaduais = st.checkbox("Gerenciar locais estaduais", value=False)
                     
                     if st.form_submit_button("Criar Usuário"):
-                        if new_username not in st.session_state.users:
+                        if get_repositorio().obter_usuario(new_username) is None:
                             if len(new_password) >= 6:
                                 # Configurar permissões baseadas no perfil
                                 if new_role == "assistente":
@@ -941,12 +1191,12 @@ def main():
                                 else:
                                     permissoes = {}  # Admin tem todas as permissões
                                 
-                                st.session_state.users[new_username] = {
+                                get_repositorio().salvar_usuario(new_username, {
                                     "password": new_password,
                                     "role": new_role,
                                     "name": new_name,
                                     "permissoes": permissoes
-                                }
+                                })
                                 st.success(f"✅ Usuário {new_username} criado com sucesso!")
                             else:
                                 st.error("❌ A senha deve ter pelo menos 6 caracteres!")
@@ -955,7 +1205,7 @@ def main():
             
             # Lista de usuários existentes
             st.markdown("#### 📋 Usuários Cadastrados")
-            for username, info in st.session_state.users.items():
+            for username, info in get_repositorio().listar_usuarios().items():
                 with st.expander(f"👤 {info['name']} ({username}) - {info['role'].title()}"):
                     col1, col2 = st.columns([3, 1])
                     
@@ -978,7 +1228,7 @@ def main():
                     with col2:
                         if username != st.session_state.username:
                             if st.button("🗑️ Remover", key=f"del_{username}", type="secondary"):
-                                del st.session_state.users[username]
+                                get_repositorio().remover_usuario(username)
                                 st.success(f"Usuário {username} removido!")
                                 st.rerun()
                         else:
@@ -989,6 +1239,9 @@ def main():
         elif st.session_state.current_local_filter:
             # Visualização específica do local
             show_local_specific_view(st.session_state.current_local_filter)
+
+        elif user_info['role'] == 'administrador' and st.session_state.get("show_desempenho"):
+            mostrar_painel_desempenho()
         
         elif 'menu_selecionado' in locals() or 'menu_selecionado' in globals():
             if 'menu_selecionado' in locals():
@@ -998,14 +1251,10 @@ def main():
             if _menu.strip() == "⚙️ Configurações":
                 gerenciar_configuracoes()
 
+@medido()
 def editar_laudo_ad(processo):
     """Renderiza a tela de redação do laudo AD em duas colunas, com informações do periciando à esquerda."""
-    st.set_page_config(
-        page_title="Redigir Laudo AD",
-        page_icon="📝",
-        layout="wide",
-        initial_sidebar_state="collapsed"
-    )
+    # A configuração da página já é feita no início do app (só pode ser chamada uma vez)
     # Preparar variáveis
     nome_parte = processo.get("nome", processo.get("nome_parte", ""))
     data_nascimento = processo.get("data_nascimento", None)
@@ -1129,45 +1378,87 @@ def editar_laudo_ad(processo):
             )
     with col_dir:
         # Campos principais do laudo (mantendo campos editáveis)
-        profissao = processo.get("profissao", "")
-        cid = processo.get("cid", "")
-        anamnese = processo.get("anamnese", "")
-        exame_fisico = processo.get("exame_fisico", "")
-        documentos_texto = processo.get("documentos", "")
-        incapacidade = processo.get("incapacidade", "Sim")
-        data_inicio = processo.get("data_inicio", None)
-        data_fim = processo.get("data_fim", None)
-        quesitos = processo.get("quesitos", "")
-        conclusao = processo.get("conclusao", "")
+        def parse_date_field(field):
+            if isinstance(field, date):
+                return field
+            elif isinstance(field, str) and field:
+                try:
+                    return datetime.strptime(field, "%Y-%m-%d").date()
+                except Exception:
+                    try:
+                        return datetime.strptime(field, "%d-%m-%Y").date()
+                    except Exception:
+                        return None
+            return None
+
+        escolaridades = [
+            "Analfabeto",
+            "Apenas assina o nome",
+            "Ensino fundamental incompleto",
+            "Ensino fundamental completo",
+            "Ensino médio incompleto",
+            "Ensino médio completo",
+            "Ensino superior incompleto",
+            "Ensino superior completo"
+        ]
+        incapacidade_opcoes = ["Sim", "Não", "Parcial", "Permanente"]
+
+        # Estado do formulário separado por processo: abrir outro processo não herda os campos
+        # (nem as patologias) do anterior, e voltar a um processo mostra o que já foi gravado nele
+        prefixo = f"laudo_{processo.get('id', processo.get('numero_processo', ''))}_"
+
+        def chave(campo):
+            return prefixo + campo
+
+        valores_iniciais = {
+            "profissao": processo.get("profissao") or "",
+            "historico_laboral": processo.get("historico_laboral") or "",
+            "cid": processo.get("cid") or "",
+            "escolaridade": processo.get("escolaridade") if processo.get("escolaridade") in escolaridades else None,
+            "anamnese": processo.get("anamnese") or "",
+            "exame_fisico": processo.get("exame_fisico") or "",
+            "patologias": list(processo.get("patologias") or []),
+            "incapacidade": processo.get("incapacidade") if processo.get("incapacidade") in incapacidade_opcoes else "Sim",
+            "data_inicio": parse_date_field(processo.get("data_inicio")),
+            "data_fim": parse_date_field(processo.get("data_fim")),
+            "quesitos": processo.get("quesitos") or "",
+            "conclusao": processo.get("conclusao") or "",
+        }
+        for campo, valor in valores_iniciais.items():
+            st.session_state.setdefault(chave(campo), valor)
+        patologias_identificadas = st.session_state[chave("patologias")]
 
         col1, col2 = st.columns(2)
         with col1:
-            st.text_input("Profissão", profissao or "", key="profissao")
+            st.text_input("Profissão", key=chave("profissao"))
+            # CIDs extraídos do PDF do processo (ou informados no cadastro), editáveis antes do laudo
+            st.text_input("CID(s)", key=chave("cid"))
         with col2:
-            st.text_input("Histórico laboral", cid or "", key="cid")
+            st.text_input("Histórico laboral", key=chave("historico_laboral"))
 
         # ====== CAMPO ESCOLARIDADE ADICIONADO AQUI ======
-        escolaridade = col2.selectbox(
+        col2.selectbox(
             "Escolaridade",
-            [
-                "Analfabeto",
-                "Apenas assina o nome",
-                "Ensino fundamental incompleto",
-                "Ensino fundamental completo",
-                "Ensino médio incompleto",
-                "Ensino médio completo",
-                "Ensino superior incompleto",
-                "Ensino superior completo"
-            ],
+            escolaridades,
             index=None,
-            placeholder="Selecione a escolaridade"
+            placeholder="Selecione a escolaridade",
+            key=chave("escolaridade")
         )
         # ====== FIM DO CAMPO ESCOLARIDADE ======
 
+        # Consulta à petição inicial sem abrir o processo inteiro
+        if processo.get("pdf_handle"):
+            with st.expander("📄 Petição inicial (primeiras páginas)"):
+                texto_peticao = peticao_inicial(processo["pdf_handle"], processo.get("pdf_sha256"))
+                if texto_peticao is None:
+                    st.warning("⚠️ O PDF do processo não foi encontrado.")
+                else:
+                    st.text_area("Petição inicial", texto_peticao, height=300, disabled=True)
+
         st.markdown("### 🩺 Anamnese")
         st.text_area(
             "Descreva os dados clínicos e históricos relevantes",
-            anamnese or "", height=120, key="anamnese"
+            height=120, key=chave("anamnese")
         )
 
         # ============================ INÍCIO SEÇÃO EXAME FÍSICO REORGANIZADA ============================
@@ -1175,7 +1466,7 @@ def editar_laudo_ad(processo):
         # 1. Campo de texto "Resultado do exame físico realizado"
         st.text_area(
             "Resultado do exame físico realizado",
-            key="resultado_exame_fisico",
+            key=chave("exame_fisico"),
             height=150
         )
         # 2. Selectbox de modelos logo abaixo (sem o subtítulo "Escolha um modelo")
@@ -1185,46 +1476,56 @@ def editar_laudo_ad(processo):
             "Artrose de joelho": "Paciente deambula com claudicação leve. Dor à palpação em interlinha articular medial de joelho direito, com crepitação e limitação na extensão. Sem sinais flogísticos."
         }
         opcoes_modelos = [*modelos_exame_clinico.keys(), "+Novo modelo"]
-        indice_modelo = 0  # Padrão: primeiro modelo
-        # Se já selecionado, manter seleção
-        if "modelo_exame_fisico" in st.session_state and st.session_state.modelo_exame_fisico in opcoes_modelos:
-            indice_modelo = opcoes_modelos.index(st.session_state.modelo_exame_fisico)
-        modelo_selecionado = st.selectbox(
+        # O texto do modelo escolhido vai para o campo acima; a troca acontece no callback,
+        # antes de o campo ser recriado (o Streamlit não permite alterar um widget já criado)
+        def aplicar_modelo_exame_fisico():
+            modelo = st.session_state[chave("modelo_exame_fisico")]
+            st.session_state[chave("exame_fisico")] = modelos_exame_clinico.get(modelo, "")
+
+        st.selectbox(
             "Escolha um modelo",
             opcoes_modelos,
-            index=indice_modelo,
-            key="modelo_exame_fisico",
-            label_visibility="visible"
+            key=chave("modelo_exame_fisico"),
+            label_visibility="visible",
+            on_change=aplicar_modelo_exame_fisico
         )
-        # Nova lógica para atualizar resultado_exame_fisico conforme instrução
-        if modelo_selecionado and modelo_selecionado != "+Novo modelo":
-            st.session_state.resultado_exame_fisico = modelos_exame_clinico[modelo_selecionado]
-        elif modelo_selecionado == "+Novo modelo":
-            st.session_state.resultado_exame_fisico = ""
         # ============================ FIM SEÇÃO EXAME FÍSICO REORGANIZADA ============================
 
         # === NOVA SEÇÃO DE PATOLOGIA - BLOCO ATUALIZADO ===
-        # Inicializa a lista de patologias, se ainda não existir
-        if "patologias_identificadas" not in st.session_state:
-            st.session_state.patologias_identificadas = []
-
-        # Carrega base de patologias pré-cadastradas
-        with open("data/patologias.json", "r", encoding="utf-8") as f:
-            base_patologias = json.load(f)
+        from catalogo_patologias import obter_catalogo_patologias
+        from cid10 import obter_indice_cid10, tabela_cid10_completa
+        # Catálogo de patologias pré-cadastradas (carregado uma vez por processo, recarregado se o arquivo mudar)
+        catalogo_patologias = obter_catalogo_patologias()
 
         # Exibir lista de patologias já inseridas
         st.markdown("### 🧬 Patologia")
-        for idx, pat in enumerate(st.session_state.patologias_identificadas):
+        for idx, pat in enumerate(patologias_identificadas):
             col1, col2 = st.columns([0.9, 0.1])
             with col1:
                 st.write(f"- {pat}")
             with col2:
                 if st.button("❌", key=f"del_pat_{idx}"):
-                    st.session_state.patologias_identificadas.pop(idx)
+                    patologias_identificadas.pop(idx)
                     st.experimental_rerun()
 
         # Opção de adicionar nova
-        patologias_disponiveis = [f"{p['nome']} (CID {p['cid']})" for p in base_patologias]
+        busca_patologia = st.text_input("Buscar patologia (nome ou CID)", key="busca_patologia")
+        if not tabela_cid10_completa():
+            st.warning(
+                f"⚠️ Tabela CID-10 incompleta ({len(obter_indice_cid10())} códigos): a busca não encontra a maioria dos CIDs. "
+                "Rode `python cid10.py` no servidor para baixar a tabela do DATASUS."
+            )
+        patologias_disponiveis = [f"{p['nome']} (CID {p['cid']})" for p in catalogo_patologias.buscar(busca_patologia)]
+        if busca_patologia:
+            # Complementa com a CID-10 completa (autocompletar pelo índice em memória)
+            inicio_busca = time.perf_counter()
+            resultados_cid = obter_indice_cid10().buscar(busca_patologia, limite=15)
+            duracao_busca = (time.perf_counter() - inicio_busca) * 1000
+            for codigo, descricao in resultados_cid:
+                opcao = f"{descricao} (CID {codigo})"
+                if opcao not in patologias_disponiveis:
+                    patologias_disponiveis.append(opcao)
+            st.caption(f"CID-10: {len(resultados_cid)} resultado(s) em {duracao_busca:.2f} ms")
         patologias_disponiveis.append("+ Incluir nova patologia")
         nova_patologia_selecionada = st.selectbox("Adicionar nova patologia", patologias_disponiveis)
 
@@ -1235,94 +1536,144 @@ def editar_laudo_ad(processo):
                 definicao = st.text_area("Definição técnica (não será exibida na interface)")
                 submitted = st.form_submit_button("Salvar")
                 if submitted:
-                    nova = {
-                        "nome": nome,
-                        "cid": cid,
-                        "definicao": definicao
-                    }
-                    base_patologias.append(nova)
-                    with open("data/patologias.json", "w", encoding="utf-8") as f:
-                        json.dump(base_patologias, f, ensure_ascii=False, indent=2)
-                    st.session_state.patologias_identificadas.append(f"{nome} (CID {cid})")
+                    # Gravação em lote e atômica no arquivo do catálogo
+                    catalogo_patologias.adicionar(nome, cid, definicao)
+                    patologias_identificadas.append(f"{nome.strip()} (CID {cid.strip().upper()})")
                     st.success("Patologia adicionada com sucesso.")
                     st.experimental_rerun()
         else:
             if st.button("Adicionar Patologia"):
-                if nova_patologia_selecionada not in st.session_state.patologias_identificadas:
-                    st.session_state.patologias_identificadas.append(nova_patologia_selecionada)
+                if nova_patologia_selecionada not in patologias_identificadas:
+                    patologias_identificadas.append(nova_patologia_selecionada)
                     st.experimental_rerun()
         # === FIM DA SEÇÃO DE PATOLOGIA ===
 
         st.markdown("### 📆 Incapacidade")
-        incapacidade_opcoes = ["Sim", "Não", "Parcial", "Permanente"]
-        st.selectbox("Houve incapacidade laboral?", incapacidade_opcoes, key="incapacidade", index=incapacidade_opcoes.index(incapacidade) if incapacidade in incapacidade_opcoes else 0)
-        # Ajustar datas
-        def parse_date_field(field):
-            if isinstance(field, date):
-                return field
-            elif isinstance(field, str) and field:
-                try:
-                    return datetime.strptime(field, "%Y-%m-%d").date()
-                except Exception:
-                    try:
-                        return datetime.strptime(field, "%d-%m-%Y").date()
-                    except Exception:
-                        return None
-            return None
-        data_inicio_dt = parse_date_field(data_inicio)
-        data_fim_dt = parse_date_field(data_fim)
+        st.selectbox("Houve incapacidade laboral?", incapacidade_opcoes, key=chave("incapacidade"))
         col1, col2 = st.columns(2)
         with col1:
-            st.date_input("Data de início da incapacidade (se houver)", data_inicio_dt, key="data_inicio")
+            st.date_input("Data de início da incapacidade (se houver)", key=chave("data_inicio"))
         with col2:
-            st.date_input("Data provável de término (se houver)", data_fim_dt, key="data_fim")
+            st.date_input("Data provável de término (se houver)", key=chave("data_fim"))
 
         st.markdown("### ✉️ Resposta aos Quesitos")
         st.text_area(
             "Transcreva ou cole aqui as respostas aos quesitos",
-            quesitos or "", height=80, key="quesitos"
+            height=80, key=chave("quesitos")
         )
 
         st.markdown("### 📝 Conclusão")
         st.text_area(
             "Conclusão do perito com base nos dados acima",
-            conclusao or "", height=80, key="conclusao"
+            height=80, key=chave("conclusao")
         )
 
+        # Campos do laudo como estão no formulário (gravados no processo e usados no PDF)
+        campos_laudo = {campo: st.session_state[chave(campo)] for campo in valores_iniciais}
+        campos_laudo["patologias"] = list(patologias_identificadas)
+        for campo in ("data_inicio", "data_fim"):
+            campos_laudo[campo] = campos_laudo[campo].isoformat() if campos_laudo[campo] else None
+
         col1, col2, col3 = st.columns([1,1,2])
         with col1:
-            st.button("🔙 Voltar")
+            if st.button("🔙 Voltar"):
+                st.session_state.view = "processos"
+                st.rerun()
         with col2:
-            st.button("💾 Salvar e continuar depois")
+            if st.button("💾 Salvar e continuar depois"):
+                if processo.get("id") is not None:
+                    get_repositorio().atualizar_processo(processo["id"], campos_laudo)
+                processo.update(campos_laudo)
+                st.success("✅ Laudo salvo.")
         with col3:
-            st.button("🧾 Finalizar e Gerar Laudo")
-
-
-if __name__ == "__main__":
-    main()
-
-
-# ======= CONTEÚDO DO ARQUIVO laudos_ad.py INCORPORADO ABAIXO =======
+            if st.button("🧾 Finalizar e Gerar Laudo"):
+                from laudo_pdf import renderizar_laudo
+                # PDF no modelo da vara do processo
+                inicio_laudo = time.perf_counter()
+                with medir("renderizar_laudo"):
+                    pdf_laudo = renderizar_laudo({**processo, **campos_laudo, "idade": idade})
+                duracao_laudo = (time.perf_counter() - inicio_laudo) * 1000
+                campos = {**campos_laudo, "situacao": "Concluído"}
+                campos["laudo_handle"] = gravar_upload(io.BytesIO(pdf_laudo))["pdf_handle"]
+                if processo.get("id") is not None:
+                    get_repositorio().atualizar_processo(processo["id"], campos)
+                processo.update(campos)
+                st.session_state.laudo_pdf = (processo.get("id"), pdf_laudo)
+                st.success(f"✅ Laudo gerado em {duracao_laudo:.0f} ms.")
+
+        laudo_pdf = st.session_state.get("laudo_pdf")
+        if laudo_pdf and laudo_pdf[0] == processo.get("id"):
+            st.download_button(
+                "⬇️ Baixar laudo (PDF)",
+                data=laudo_pdf[1],
+                file_name=f"laudo_{processo.get('numero_processo', '')}.pdf",
+                mime="application/pdf",
+            )
 
-import os
-from datetime import datetime
-from PyPDF2 import PdfReader
-import streamlit as st
 
-def gerar_laudo_ad(processo):
-    """
-    Função exemplo para geração de laudo AD.
-    Adapte a lógica conforme necessário.
-    """
-    st.write("Gerando laudo AD para o processo:", processo.get("numero_processo", "N/A"))
-    # Aqui você pode adicionar o processamento real, gerar PDF, etc.
-    processo["anexo_status"] = "Pronto"
-    return True
+@medido()
+def mostrar_painel_desempenho():
+    """Tempos p50/p95 por tela e ação, registrados a cada execução, e captura de perfil de uma execução"""
+    import pandas as pd
+    from instrumentacao import CAMINHO_REGISTRO, ler_registros, resumo_envio, resumo_por_trecho
 
-# ======= FIM DO ARQUIVO laudos_ad.py =======
+    st.markdown("### ⏱️ Desempenho")
+    registros = ler_registros()
+    if not registros:
+        st.info(f"Nenhuma execução registrada ainda em {CAMINHO_REGISTRO}.")
+    else:
+        st.caption(f"Últimas {len(registros)} execuções, de {registros[0]['momento']} a {registros[-1]['momento']}")
+        envio = resumo_envio(registros)
+        col1, col2, col3 = st.columns(3)
+        total = resumo_por_trecho(registros)["(execução inteira)"]
+        col1.metric("Execução (p50 / p95)", f"{total['p50']:.0f} / {total['p95']:.0f} ms")
+        if "widgets" in envio:
+            col2.metric("Widgets por execução (p50 / p95)", f"{envio['widgets']['p50']:.0f} / {envio['widgets']['p95']:.0f}")
+        if "bytes" in envio:
+            col3.metric("Enviado ao navegador (p50 / p95)",
+                        f"{envio['bytes']['p50'] / 1024:.0f} / {envio['bytes']['p95'] / 1024:.0f} KB")
+        tabela = pd.DataFrame([
+            {"Trecho": trecho, "Execuções": medida["execucoes"], "p50 (ms)": medida["p50"],
+             "p95 (ms)": medida["p95"], "Máximo (ms)": medida["maximo"]}
+            for trecho, medida in resumo_por_trecho(registros).items()
+        ])
+        st.dataframe(tabela, hide_index=True, use_container_width=True)
+
+    # Erros das tarefas em segundo plano (fila de pré-laudos), que não aparecem em nenhuma tela
+    erros = ler_registros(limite=50, tipo="erro")
+    if erros:
+        st.markdown("#### ⚠️ Erros em segundo plano")
+        st.dataframe(
+            [{"Momento": erro["momento"], "Origem": erro["origem"], "Mensagem": erro["mensagem"], "Erro": erro.get("erro")}
+             for erro in reversed(erros)],
+            hide_index=True, use_container_width=True
+        )
 
-# ======= FIM DO ARQUIVO laudos_ad.py =======
+    # O perfil é da próxima interação (a execução que ela dispara), não desta tela
+    st.markdown("#### 🔬 Perfil de uma execução")
+    if st.session_state.get("capturar_perfil"):
+        st.info("O perfil será capturado na próxima interação (ex.: abrir um local ou um dia).")
+    elif st.button("Capturar perfil da próxima interação"):
+        st.session_state.capturar_perfil = True
+        st.info("O perfil será capturado na próxima interação (ex.: abrir um local ou um dia).")
+    perfil = st.session_state.get("perfil_execucao")
+    if perfil:
+        st.caption(f"Capturado em {perfil['momento']}; abra o .prof com pstats ou snakeviz.")
+        st.download_button(
+            "⬇️ Baixar perfil (.prof)",
+            data=perfil["prof"],
+            file_name=f"perfil_{perfil['momento'].replace(':', '')}.prof",
+            mime="application/octet-stream",
+        )
+        with st.expander("Funções mais demoradas (tempo acumulado)"):
+            st.code(perfil["texto"])
 
 
+def guardar_perfil(perfil):
+    st.session_state.perfil_execucao = perfil
 
 
+if __name__ == "__main__":
+    # Cada execução (rerun) grava os tempos das telas e ações no registro de instrumentação
+    with execucao_medida(perfilar=st.session_state.pop("capturar_perfil", False), ao_perfilar=guardar_perfil):
+        main()
@@ -0,0 +1,796 @@
+import json
+import os
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from datetime import date, datetime
+
+# Caminho padrão do banco (pode ser sobrescrito pela variável de ambiente)
+CAMINHO_BANCO = os.environ.get("LAUDOS_DB_PATH", os.path.join("data", "laudos.db"))
+
+# Usuário criado na primeira execução (mesmo padrão da antiga sessão em memória)
+USUARIO_ADMIN_PADRAO = {
+    "password": "admin123",
+    "role": "administrador",
+    "name": "Dr. Hyttallo",
+    "permissoes": {}
+}
+
+# Colunas fixas da tabela de processos; os demais campos vão para "dados" (JSON)
+COLUNAS_PROCESSO = (
+    "numero_processo", "nome_parte", "horario", "tipo", "situacao",
+    "criado_por", "criado_em"
+)
+
+# Campos de "dados" com o handle de um PDF no diretório de blobs (compartilhado entre processos com o mesmo arquivo)
+CAMPOS_BLOB = ("pdf_handle", "laudo_handle")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS usuarios (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    role TEXT NOT NULL,
+    name TEXT NOT NULL,
+    permissoes TEXT NOT NULL DEFAULT '{}'
+);
+
+CREATE TABLE IF NOT EXISTS locais_estaduais (
+    nome TEXT PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS pericias (
+    data TEXT NOT NULL,
+    local TEXT NOT NULL,
+    observacoes TEXT NOT NULL DEFAULT '',
+    criado_por TEXT,
+    criado_em TEXT,
+    PRIMARY KEY (data, local)
+);
+CREATE INDEX IF NOT EXISTS idx_pericias_data ON pericias (data);
+CREATE INDEX IF NOT EXISTS idx_pericias_local ON pericias (local, data);
+
+CREATE TABLE IF NOT EXISTS processos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT NOT NULL,
+    local TEXT NOT NULL,
+    numero_processo TEXT NOT NULL,
+    nome_parte TEXT NOT NULL,
+    horario TEXT NOT NULL,
+    tipo TEXT,
+    situacao TEXT,
+    criado_por TEXT,
+    criado_em TEXT,
+    dados TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_processos_data ON processos (data);
+CREATE INDEX IF NOT EXISTS idx_processos_local ON processos (local);
+CREATE INDEX IF NOT EXISTS idx_processos_data_local ON processos (data, local, horario);
+CREATE INDEX IF NOT EXISTS idx_processos_numero ON processos (numero_processo);
+-- Índice de cobertura da exportação do histórico: lê as colunas fixas sem percorrer o JSON de dados
+CREATE INDEX IF NOT EXISTS idx_processos_historico ON processos (
+    id, data, local, numero_processo, horario, tipo, situacao, criado_por, criado_em
+);
+
+-- Índice de texto completo das páginas dos PDFs (rowid = processo_id * PAGINAS_POR_PROCESSO + página)
+CREATE VIRTUAL TABLE IF NOT EXISTS busca_paginas USING fts5(
+    texto,
+    tokenize = "unicode61 remove_diacritics 2"
+);
+CREATE TABLE IF NOT EXISTS processos_indexados (
+    processo_id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+
+-- Fila persistente de tarefas em segundo plano (chave única torna o enfileiramento idempotente)
+CREATE TABLE IF NOT EXISTS tarefas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tipo TEXT NOT NULL,
+    processo_id INTEGER NOT NULL,
+    chave TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    erro TEXT,
+    criada_em TEXT NOT NULL,
+    atualizada_em TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tarefas_status ON tarefas (tipo, status, id);
+CREATE INDEX IF NOT EXISTS idx_tarefas_processo ON tarefas (processo_id, id);
+"""
+
+# Colunas do histórico exportado (lotes_historico): uma linha por processo e uma por perícia sem processos
+COLUNAS_HISTORICO = (
+    "data", "local", "processo_id", "numero_processo", "horario", "tipo", "situacao",
+    "criado_por", "criado_em", "pericia_criado_por", "pericia_criado_em"
+)
+
+# Situações de uma tarefa da fila
+TAREFA_NA_FILA = "na_fila"
+TAREFA_EXECUTANDO = "executando"
+TAREFA_CONCLUIDA = "concluida"
+TAREFA_FALHOU = "falhou"
+
+# Faixa de rowids do índice de busca reservada para cada processo
+PAGINAS_POR_PROCESSO = 100000
+
+
+class IndicePericias:
+    """Índices em memória das perícias: local -> datas ordenadas e ano-mês -> perícias.
+
+    Carregados uma vez do banco e atualizados a cada inclusão/exclusão, com as datas já convertidas.
+    """
+
+    def __init__(self, pericias=()):
+        self.por_chave = {}        # (data_iso, local) -> perícia
+        self.datas_por_local = {}  # local -> [date] em ordem crescente
+        self.por_mes = {}          # "AAAA-MM" -> [(data_iso, local)] em ordem
+        for pericia in pericias:
+            self.adicionar(pericia)
+
+    def adicionar(self, pericia):
+        chave = (pericia["data"], pericia["local"])
+        if chave in self.por_chave:
+            return
+        pericia["data_obj"] = date.fromisoformat(pericia["data"])
+        self.por_chave[chave] = pericia
+        insort(self.datas_por_local.setdefault(pericia["local"], []), pericia["data_obj"])
+        insort(self.por_mes.setdefault(pericia["data"][:7], []), chave)
+
+    def remover(self, data_iso, local):
+        pericia = self.por_chave.pop((data_iso, local), None)
+        if pericia is None:
+            return
+        datas = self.datas_por_local[local]
+        del datas[bisect_left(datas, pericia["data_obj"])]
+        chaves = self.por_mes[data_iso[:7]]
+        del chaves[bisect_left(chaves, (data_iso, local))]
+
+    def do_local(self, local, hoje):
+        """(futuras em ordem crescente, passadas em ordem decrescente) de um local"""
+        datas = self.datas_por_local.get(local, [])
+        corte = bisect_left(datas, hoje)
+        futuras = [self.por_chave[(d.isoformat(), local)] for d in datas[corte:]]
+        passadas = [self.por_chave[(d.isoformat(), local)] for d in reversed(datas[:corte])]
+        return futuras, passadas
+
+    def do_mes(self, ano, mes):
+        """{data_iso: [locais]} de um mês"""
+        por_dia = {}
+        for data_iso, local in self.por_mes.get(f"{ano}-{mes:02d}", []):
+            por_dia.setdefault(data_iso, []).append(local)
+        return por_dia
+
+
+class ProcessosDoDia:
+    """Processos de uma data/local indexados pelo id e pelo horário"""
+
+    def __init__(self, processos=()):
+        self.por_id = {}       # id -> processo
+        self.por_horario = {}  # "HH:MM" -> id
+        for processo in processos:
+            self.por_id[processo["id"]] = processo
+            # Dados antigos podem ter dois processos no mesmo horário; vale o primeiro
+            self.por_horario.setdefault(processo["horario"], processo["id"])
+
+    def __len__(self):
+        return len(self.por_id)
+
+    def __iter__(self):
+        return iter(self.por_id.values())
+
+    def __contains__(self, processo_id):
+        return processo_id in self.por_id
+
+    def obter(self, processo_id):
+        return self.por_id.get(processo_id)
+
+    def no_horario(self, horario):
+        processo_id = self.por_horario.get(horario)
+        return self.por_id[processo_id] if processo_id is not None else None
+
+    def horario_ocupado(self, horario, ignorar_id=None):
+        """Indica se outro processo (diferente de ignorar_id) já ocupa o horário"""
+        processo_id = self.por_horario.get(horario)
+        return processo_id is not None and processo_id != ignorar_id
+
+    def ordenados(self):
+        """Processos em ordem de horário"""
+        return sorted(self.por_id.values(), key=lambda processo: processo["horario"])
+
+
+class Repositorio:
+    """Acesso persistente a usuários, locais, perícias e processos (SQLite/WAL)"""
+
+    def __init__(self, caminho=CAMINHO_BANCO):
+        self.caminho = caminho
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        # Uma única conexão compartilhada entre as threads do Streamlit, serializada pelo lock
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self._indice_pericias = None
+        # Incrementada quando perícias ou processos são incluídos/excluídos (invalida resumos em cache)
+        self.versao_agenda = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(ESQUEMA)
+            if self._conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 0:
+                self.salvar_usuario("admin", USUARIO_ADMIN_PADRAO)
+
+    @contextmanager
+    def transacao(self):
+        """Executa um bloco de escrita numa transação única"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._conn.execute("COMMIT")
+
+    def _consultar(self, sql, parametros=()):
+        with self._lock:
+            return self._conn.execute(sql, parametros).fetchall()
+
+    def _consultar_tuplas(self, sql, parametros=()):
+        """Como _consultar, mas com tuplas simples (mais leves que sqlite3.Row em leituras grandes)"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.row_factory = None
+            return cursor.execute(sql, parametros).fetchall()
+
+    # ---------------------------------------------------------------- usuários
+
+    @staticmethod
+    def _linha_para_usuario(linha):
+        return {
+            "password": linha["password"],
+            "role": linha["role"],
+            "name": linha["name"],
+            "permissoes": json.loads(linha["permissoes"] or "{}")
+        }
+
+    def obter_usuario(self, username):
+        """Retorna o usuário ou None"""
+        linhas = self._consultar("SELECT * FROM usuarios WHERE username = ?", (username,))
+        return self._linha_para_usuario(linhas[0]) if linhas else None
+
+    def listar_usuarios(self):
+        """Retorna {username: info} em ordem alfabética"""
+        linhas = self._consultar("SELECT * FROM usuarios ORDER BY username")
+        return {linha["username"]: self._linha_para_usuario(linha) for linha in linhas}
+
+    def salvar_usuario(self, username, info):
+        """Cria ou substitui um usuário"""
+        with self.transacao() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO usuarios (username, password, role, name, permissoes) VALUES (?, ?, ?, ?, ?)",
+                (username, info["password"], info["role"], info["name"],
+                 json.dumps(info.get("permissoes", {}), ensure_ascii=False))
+            )
+
+    def alterar_senha(self, username, nova_senha):
+        with self.transacao() as conn:
+            conn.execute("UPDATE usuarios SET password = ? WHERE username = ?", (nova_senha, username))
+
+    def remover_usuario(self, username):
+        with self.transacao() as conn:
+            conn.execute("DELETE FROM usuarios WHERE username = ?", (username,))
+
+    # ------------------------------------------------------- locais estaduais
+
+    def listar_locais_estaduais(self):
+        """Retorna os locais estaduais em ordem alfabética"""
+        return [linha["nome"] for linha in self._consultar("SELECT nome FROM locais_estaduais ORDER BY nome")]
+
+    def adicionar_local_estadual(self, nome):
+        """Adiciona um local estadual; retorna False se já existir"""
+        with self.transacao() as conn:
+            cursor = conn.execute("INSERT OR IGNORE INTO locais_estaduais (nome) VALUES (?)", (nome,))
+            return cursor.rowcount == 1
+
+    def remover_local_estadual(self, nome):
+        with self.transacao() as conn:
+            conn.execute("DELETE FROM locais_estaduais WHERE nome = ?", (nome,))
+
+    # --------------------------------------------------------------- perícias
+
+    @property
+    def indice_pericias(self):
+        """Índices em memória das perícias, montados na primeira consulta"""
+        with self._lock:
+            if self._indice_pericias is None:
+                self._indice_pericias = IndicePericias(
+                    dict(linha) for linha in self._conn.execute("SELECT * FROM pericias")
+                )
+            return self._indice_pericias
+
+    def adicionar_pericia(self, data_iso, local, criado_por, observacoes=""):
+        """Vincula um local a uma data; retorna False se o vínculo já existir"""
+        pericia = {
+            "data": data_iso,
+            "local": local,
+            "observacoes": observacoes,
+            "criado_por": criado_por,
+            "criado_em": datetime.now().isoformat()
+        }
+        with self.transacao() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO pericias (data, local, observacoes, criado_por, criado_em) VALUES (?, ?, ?, ?, ?)",
+                (data_iso, local, observacoes, criado_por, pericia["criado_em"])
+            )
+            if cursor.rowcount != 1:
+                return False
+            if self._indice_pericias is not None:
+                self._indice_pericias.adicionar(pericia)
+            self.versao_agenda += 1
+        return True
+
+    def remover_pericia(self, data_iso, local):
+        """Remove o vínculo data/local e os processos dele"""
+        with self.transacao() as conn:
+            handles = self._handles_blob(conn, "data = ? AND local = ?", (data_iso, local))
+            for (processo_id,) in conn.execute(
+                "SELECT id FROM processos WHERE data = ? AND local = ?", (data_iso, local)
+            ).fetchall():
+                self._remover_indice_busca(conn, processo_id)
+            # Tarefas da fila dos processos removidos não podem ser reivindicadas depois
+            conn.execute(
+                "DELETE FROM tarefas WHERE processo_id IN (SELECT id FROM processos WHERE data = ? AND local = ?)",
+                (data_iso, local)
+            )
+            conn.execute("DELETE FROM processos WHERE data = ? AND local = ?", (data_iso, local))
+            conn.execute("DELETE FROM pericias WHERE data = ? AND local = ?", (data_iso, local))
+            if self._indice_pericias is not None:
+                self._indice_pericias.remover(data_iso, local)
+            self.versao_agenda += 1
+        self._remover_blobs_sem_uso(handles)
+
+    def locais_do_dia(self, data_iso):
+        """Locais com perícia numa data, na ordem em que foram vinculados"""
+        linhas = self._consultar("SELECT local FROM pericias WHERE data = ? ORDER BY rowid", (data_iso,))
+        return [linha["local"] for linha in linhas]
+
+    def pericias_do_periodo(self, data_inicio, data_fim):
+        """Retorna {data_iso: [locais]} entre as datas (inclusive)"""
+        linhas = self._consultar(
+            "SELECT data, local FROM pericias WHERE data BETWEEN ? AND ? ORDER BY data, rowid",
+            (data_inicio, data_fim)
+        )
+        por_dia = {}
+        for linha in linhas:
+            por_dia.setdefault(linha["data"], []).append(linha["local"])
+        return por_dia
+
+    def pericias_do_mes(self, ano, mes):
+        """Retorna {data_iso: [locais]} do mês, a partir do índice em memória"""
+        with self._lock:
+            return self.indice_pericias.do_mes(ano, mes)
+
+    def pericias_do_local(self, local, hoje):
+        """(futuras em ordem crescente, passadas em ordem decrescente) de um local, pelo índice em memória"""
+        with self._lock:
+            return self.indice_pericias.do_local(local, hoje)
+
+    def total_dias_do_local(self, local):
+        with self._lock:
+            return len(self.indice_pericias.datas_por_local.get(local, []))
+
+    def contar_processos_do_mes(self, ano, mes):
+        """Retorna {data_iso: número de processos} de todos os locais no mês"""
+        linhas = self._consultar(
+            "SELECT data, COUNT(*) FROM processos WHERE data BETWEEN ? AND ? GROUP BY data",
+            (f"{ano}-{mes:02d}-01", f"{ano}-{mes:02d}-31")
+        )
+        return dict(linhas)
+
+    def contar_processos_por_data(self, local, data_inicio=None):
+        """Retorna {data_iso: número de processos} de um local (a partir de data_inicio, se informada)"""
+        linhas = self._consultar(
+            "SELECT data, COUNT(*) FROM processos WHERE local = ? AND data >= ? GROUP BY data",
+            (local, data_inicio or "")
+        )
+        return dict(linhas)
+
+    # -------------------------------------------------------------- processos
+
+    @staticmethod
+    def _linha_para_processo(linha):
+        processo = json.loads(linha["dados"] or "{}")
+        for coluna in COLUNAS_PROCESSO:
+            processo[coluna] = linha[coluna]
+        processo["id"] = linha["id"]
+        processo["data"] = linha["data"]
+        processo["local"] = linha["local"]
+        processo["key_processos"] = f"{linha['data']}_{linha['local']}"
+        # O PDF fica no diretório de blobs; o processo guarda apenas o handle e o hash
+        processo["tem_pdf"] = bool(processo.get("pdf_handle"))
+        return processo
+
+    @staticmethod
+    def _separar_campos(processo):
+        """Divide o dicionário do processo entre colunas fixas e o JSON de dados extras"""
+        ignorar = set(COLUNAS_PROCESSO) | {"id", "data", "local", "key_processos", "tem_pdf"}
+        extras = {k: v for k, v in processo.items() if k not in ignorar}
+        return [processo.get(coluna) for coluna in COLUNAS_PROCESSO], json.dumps(extras, ensure_ascii=False, default=str)
+
+    def listar_processos(self, data_iso, local):
+        """Processos de uma data/local ordenados por horário"""
+        linhas = self._consultar(
+            f"""
+            SELECT id, data, local, {', '.join(COLUNAS_PROCESSO)}, dados
+            FROM processos
+            WHERE data = ? AND local = ?
+            ORDER BY horario
+            """,
+            (data_iso, local)
+        )
+        return [self._linha_para_processo(linha) for linha in linhas]
+
+    def processos_do_dia(self, data_iso, local):
+        """Processos de uma data/local indexados por id e horário"""
+        return ProcessosDoDia(self.listar_processos(data_iso, local))
+
+    def _horario_ocupado(self, conn, data_iso, local, horario, ignorar_id=None):
+        linha = conn.execute(
+            "SELECT id FROM processos WHERE data = ? AND local = ? AND horario = ? AND id != ? LIMIT 1",
+            (data_iso, local, horario, ignorar_id if ignorar_id is not None else -1)
+        ).fetchone()
+        return linha is not None
+
+    def contar_processos(self, data_iso, local):
+        linhas = self._consultar("SELECT COUNT(*) FROM processos WHERE data = ? AND local = ?", (data_iso, local))
+        return linhas[0][0]
+
+    def buscar_processos_por_numero(self, numero_processo):
+        """Todas as ocorrências de um número de processo na agenda"""
+        linhas = self._consultar(
+            f"""
+            SELECT id, data, local, {', '.join(COLUNAS_PROCESSO)}, dados
+            FROM processos
+            WHERE numero_processo = ?
+            ORDER BY data, horario
+            """,
+            (numero_processo,)
+        )
+        return [self._linha_para_processo(linha) for linha in linhas]
+
+    def processos_por_situacao(self, situacao, data_inicio, data_fim=None, local=None):
+        """Processos numa situação entre as datas (inclusive), de todos os locais ou de um só"""
+        condicoes = "situacao = ? AND data BETWEEN ? AND ?"
+        parametros = [situacao, data_inicio, data_fim or data_inicio]
+        if local is not None:
+            condicoes += " AND local = ?"
+            parametros.append(local)
+        linhas = self._consultar(
+            f"""
+            SELECT id, data, local, {', '.join(COLUNAS_PROCESSO)}, dados
+            FROM processos
+            WHERE {condicoes}
+            ORDER BY data, local, horario
+            """,
+            parametros
+        )
+        return [self._linha_para_processo(linha) for linha in linhas]
+
+    def lotes_historico(self, tamanho_lote=5000):
+        """Histórico completo em lotes de tuplas (COLUNAS_HISTORICO), sem carregar tudo em memória.
+
+        Primeiro os processos (com os dados da perícia do dia), depois as perícias sem processos.
+        Cada lote é uma consulta própria a partir da última chave lida, então o lock do banco
+        fica livre entre um lote e outro.
+        """
+        ultimo_id = 0
+        while True:
+            linhas = self._consultar_tuplas(
+                """
+                SELECT pr.data, pr.local, pr.id, pr.numero_processo, pr.horario, pr.tipo, pr.situacao,
+                       pr.criado_por, pr.criado_em, pe.criado_por, pe.criado_em
+                FROM processos pr
+                LEFT JOIN pericias pe ON pe.data = pr.data AND pe.local = pr.local
+                WHERE pr.id > ?
+                ORDER BY pr.id
+                LIMIT ?
+                """,
+                (ultimo_id, tamanho_lote)
+            )
+            if not linhas:
+                break
+            ultimo_id = linhas[-1][2]
+            yield linhas
+        ultimo_rowid = 0
+        while True:
+            linhas = self._consultar_tuplas(
+                """
+                SELECT pe.rowid, pe.data, pe.local, pe.criado_por, pe.criado_em
+                FROM pericias pe
+                WHERE pe.rowid > ?
+                  AND NOT EXISTS (SELECT 1 FROM processos pr WHERE pr.data = pe.data AND pr.local = pe.local)
+                ORDER BY pe.rowid
+                LIMIT ?
+                """,
+                (ultimo_rowid, tamanho_lote)
+            )
+            if not linhas:
+                break
+            ultimo_rowid = linhas[-1][0]
+            yield [
+                (data, local, None, None, None, None, None, None, None, criado_por, criado_em)
+                for _, data, local, criado_por, criado_em in linhas
+            ]
+
+    def obter_processo(self, processo_id):
+        linhas = self._consultar(
+            f"""
+            SELECT id, data, local, {', '.join(COLUNAS_PROCESSO)}, dados
+            FROM processos
+            WHERE id = ?
+            """,
+            (processo_id,)
+        )
+        return self._linha_para_processo(linhas[0]) if linhas else None
+
+    def adicionar_processo(self, data_iso, local, processo):
+        """Insere um processo na data/local e retorna o id gerado (None se o horário já estiver ocupado)"""
+        valores, dados = self._separar_campos(processo)
+        with self.transacao() as conn:
+            if self._horario_ocupado(conn, data_iso, local, processo.get("horario")):
+                return None
+            cursor = conn.execute(
+                f"""
+                INSERT INTO processos (data, local, {', '.join(COLUNAS_PROCESSO)}, dados)
+                VALUES (?, ?, {', '.join('?' for _ in COLUNAS_PROCESSO)}, ?)
+                """,
+                (data_iso, local, *valores, dados)
+            )
+            self.versao_agenda += 1
+            return cursor.lastrowid
+
+    def adicionar_processos(self, data_iso, local, processos):
+        """Insere vários processos na data/local numa única transação.
+
+        Retorna os ids na ordem recebida (None para o processo cujo horário já estava ocupado).
+        """
+        with self.transacao() as conn:
+            ocupados = {
+                linha[0] for linha in
+                conn.execute("SELECT horario FROM processos WHERE data = ? AND local = ?", (data_iso, local))
+            }
+            ids = []
+            for processo in processos:
+                if processo.get("horario") in ocupados:
+                    ids.append(None)
+                    continue
+                valores, dados = self._separar_campos(processo)
+                cursor = conn.execute(
+                    f"""
+                    INSERT INTO processos (data, local, {', '.join(COLUNAS_PROCESSO)}, dados)
+                    VALUES (?, ?, {', '.join('?' for _ in COLUNAS_PROCESSO)}, ?)
+                    """,
+                    (data_iso, local, *valores, dados)
+                )
+                ocupados.add(processo.get("horario"))
+                ids.append(cursor.lastrowid)
+            if any(processo_id is not None for processo_id in ids):
+                self.versao_agenda += 1
+            return ids
+
+    def blob_em_uso(self, handle):
+        """Indica se algum processo referencia o blob (como PDF do processo ou do laudo)"""
+        linhas = self._consultar(
+            """
+            SELECT 1 FROM processos
+            WHERE json_extract(dados, '$.pdf_handle') = ? OR json_extract(dados, '$.laudo_handle') = ?
+            LIMIT 1
+            """,
+            (handle, handle)
+        )
+        return bool(linhas)
+
+    def atualizar_processo(self, processo_id, campos):
+        """Mescla os campos informados no processo, preservando os demais.
+
+        Retorna False se o processo não existir ou se o novo horário já estiver ocupado.
+        """
+        substituidos = []
+        with self.transacao() as conn:
+            if any(campo in campos for campo in CAMPOS_BLOB):
+                anterior = self.obter_processo(processo_id) or {}
+                substituidos = [
+                    anterior.get(campo) for campo in CAMPOS_BLOB
+                    if campo in campos and anterior.get(campo) != campos[campo]
+                ]
+            atualizado = self._mesclar_processo(conn, processo_id, campos)
+        if atualizado:
+            # Ex.: o laudo gerado de novo substitui o PDF anterior
+            self._remover_blobs_sem_uso(substituidos)
+        return atualizado
+
+    def _mesclar_processo(self, conn, processo_id, campos):
+        atual = self.obter_processo(processo_id)
+        if atual is None:
+            return False
+        atual.update(campos)
+        if "horario" in campos and self._horario_ocupado(
+            conn, atual["data"], atual["local"], atual["horario"], ignorar_id=processo_id
+        ):
+            return False
+        valores, dados = self._separar_campos(atual)
+        atribuicoes = ", ".join(f"{coluna} = ?" for coluna in COLUNAS_PROCESSO)
+        conn.execute(
+            f"UPDATE processos SET {atribuicoes}, dados = ? WHERE id = ?",
+            (*valores, dados, processo_id)
+        )
+        return True
+
+    def remover_processo(self, processo_id):
+        with self.transacao() as conn:
+            handles = self._handles_blob(conn, "id = ?", (processo_id,))
+            self._remover_indice_busca(conn, processo_id)
+            conn.execute("DELETE FROM tarefas WHERE processo_id = ?", (processo_id,))
+            conn.execute("DELETE FROM processos WHERE id = ?", (processo_id,))
+            self.versao_agenda += 1
+        self._remover_blobs_sem_uso(handles)
+
+    @staticmethod
+    def _handles_blob(conn, condicao, parametros):
+        """Handles dos PDFs (processo e laudo) dos processos que atendem à condição"""
+        colunas = ", ".join(f"json_extract(dados, '$.{campo}')" for campo in CAMPOS_BLOB)
+        linhas = conn.execute(f"SELECT {colunas} FROM processos WHERE {condicao}", parametros).fetchall()
+        return {handle for linha in linhas for handle in tuple(linha) if handle}
+
+    def _remover_blobs_sem_uso(self, handles):
+        """Apaga do disco, depois da transação, os PDFs que nenhum processo restante referencia"""
+        from arquivos_processo import remover_blob
+
+        for handle in handles:
+            if handle and not self.blob_em_uso(handle):
+                remover_blob(handle)
+
+    # ------------------------------------------------------- busca de texto
+
+    @staticmethod
+    def _remover_indice_busca(conn, processo_id):
+        inicio = processo_id * PAGINAS_POR_PROCESSO
+        conn.execute(
+            "DELETE FROM busca_paginas WHERE rowid BETWEEN ? AND ?",
+            (inicio, inicio + PAGINAS_POR_PROCESSO - 1)
+        )
+        conn.execute("DELETE FROM processos_indexados WHERE processo_id = ?", (processo_id,))
+
+    def texto_indexado(self, processo_id, sha256):
+        """Indica se o texto desta versão do PDF já está no índice de busca"""
+        linhas = self._consultar(
+            "SELECT 1 FROM processos_indexados WHERE processo_id = ? AND sha256 = ?", (processo_id, sha256)
+        )
+        return bool(linhas)
+
+    def indexar_texto_processo(self, processo_id, sha256, paginas):
+        """Indexa o texto de cada página do PDF do processo, substituindo a versão anterior"""
+        inicio = processo_id * PAGINAS_POR_PROCESSO
+        with self.transacao() as conn:
+            self._remover_indice_busca(conn, processo_id)
+            conn.executemany(
+                "INSERT INTO busca_paginas (rowid, texto) VALUES (?, ?)",
+                ((inicio + numero, texto) for numero, texto in enumerate(paginas[:PAGINAS_POR_PROCESSO]) if texto.strip())
+            )
+            conn.execute(
+                "INSERT INTO processos_indexados (processo_id, sha256) VALUES (?, ?)", (processo_id, sha256)
+            )
+
+    def buscar_texto(self, consulta, limite=30):
+        """Páginas que contêm todos os termos da consulta, das mais relevantes (BM25) para as menos"""
+        termos = ['"' + termo.replace('"', '""') + '"' for termo in consulta.split()]
+        if not termos:
+            return []
+        linhas = self._consultar(
+            f"""
+            SELECT b.rowid AS rowid_busca,
+                   snippet(busca_paginas, 0, '**', '**', '…', 12) AS trecho,
+                   p.id, p.data, p.local, p.numero_processo, p.nome_parte
+            FROM busca_paginas b
+            JOIN processos p ON p.id = b.rowid / {PAGINAS_POR_PROCESSO}
+            WHERE busca_paginas MATCH ?
+            ORDER BY bm25(busca_paginas)
+            LIMIT ?
+            """,
+            (" ".join(termos), limite)
+        )
+        return [
+            {
+                "processo_id": linha["id"],
+                "pagina": linha["rowid_busca"] % PAGINAS_POR_PROCESSO + 1,
+                "data": linha["data"],
+                "local": linha["local"],
+                "numero_processo": linha["numero_processo"],
+                "nome_parte": linha["nome_parte"],
+                "trecho": linha["trecho"],
+            }
+            for linha in linhas
+        ]
+
+    # ---------------------------------------------------------------- tarefas
+
+    def enfileirar_tarefa(self, tipo, processo_id, chave):
+        """Coloca a tarefa na fila, a menos que a mesma chave já esteja na fila, em execução ou concluída.
+
+        Tarefas que falharam voltam para a fila. Retorna True se a tarefa foi (re)enfileirada.
+        """
+        agora = datetime.now().isoformat()
+        with self.transacao() as conn:
+            linha = conn.execute("SELECT id, status FROM tarefas WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                conn.execute(
+                    """
+                    INSERT INTO tarefas (tipo, processo_id, chave, status, criada_em, atualizada_em)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (tipo, processo_id, chave, TAREFA_NA_FILA, agora, agora)
+                )
+                return True
+            if linha["status"] == TAREFA_FALHOU:
+                conn.execute(
+                    "UPDATE tarefas SET status = ?, erro = NULL, atualizada_em = ? WHERE id = ?",
+                    (TAREFA_NA_FILA, agora, linha["id"])
+                )
+                return True
+            return False
+
+    def reivindicar_tarefa(self, tipo):
+        """Marca a tarefa mais antiga da fila como em execução e a retorna (ou None se a fila estiver vazia)"""
+        with self.transacao() as conn:
+            linha = conn.execute(
+                "SELECT id, processo_id, chave FROM tarefas WHERE tipo = ? AND status = ? ORDER BY id LIMIT 1",
+                (tipo, TAREFA_NA_FILA)
+            ).fetchone()
+            if linha is None:
+                return None
+            conn.execute(
+                "UPDATE tarefas SET status = ?, tentativas = tentativas + 1, atualizada_em = ? WHERE id = ?",
+                (TAREFA_EXECUTANDO, datetime.now().isoformat(), linha["id"])
+            )
+            return dict(linha)
+
+    def concluir_tarefa(self, tarefa_id, processo_id, campos):
+        """Grava o resultado no processo e conclui a tarefa na mesma transação"""
+        with self.transacao() as conn:
+            self._mesclar_processo(conn, processo_id, campos)
+            conn.execute(
+                "UPDATE tarefas SET status = ?, erro = NULL, atualizada_em = ? WHERE id = ?",
+                (TAREFA_CONCLUIDA, datetime.now().isoformat(), tarefa_id)
+            )
+
+    def falhar_tarefa(self, tarefa_id, erro):
+        with self.transacao() as conn:
+            conn.execute(
+                "UPDATE tarefas SET status = ?, erro = ?, atualizada_em = ? WHERE id = ?",
+                (TAREFA_FALHOU, str(erro), datetime.now().isoformat(), tarefa_id)
+            )
+
+    def retomar_tarefas(self, tipo):
+        """Devolve à fila as tarefas que estavam em execução quando o servidor parou"""
+        with self.transacao() as conn:
+            cursor = conn.execute(
+                "UPDATE tarefas SET status = ?, atualizada_em = ? WHERE tipo = ? AND status = ?",
+                (TAREFA_NA_FILA, datetime.now().isoformat(), tipo, TAREFA_EXECUTANDO)
+            )
+            return cursor.rowcount
+
+    def situacao_tarefas(self, tipo, processo_ids):
+        """{processo_id: {"status", "erro"}} da tarefa mais recente de cada processo"""
+        processo_ids = list(processo_ids)
+        if not processo_ids:
+            return {}
+        linhas = self._consultar(
+            f"""
+            SELECT processo_id, status, erro FROM tarefas
+            WHERE tipo = ? AND processo_id IN ({', '.join('?' for _ in processo_ids)})
+            ORDER BY id
+            """,
+            (tipo, *processo_ids)
+        )
+        return {linha["processo_id"]: {"status": linha["status"], "erro": linha["erro"]} for linha in linhas}
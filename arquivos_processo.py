@@ -0,0 +1,69 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Diretório dos PDFs de processos enviados (configurável por variável de ambiente)
+DIRETORIO_BLOBS = os.environ.get("LAUDOS_BLOBS_DIR", os.path.join("data", "blobs"))
+
+# Soma máxima (MB) dos arquivos enviados que uma sessão mantém na memória do servidor; o limite por
+# arquivo é o server.maxUploadSize do .streamlit/config.toml
+LIMITE_UPLOAD_SESSAO_MB = int(os.environ.get("LAUDOS_LIMITE_UPLOAD_SESSAO_MB", "400"))
+
+TAMANHO_BLOCO = 1024 * 1024
+
+
+def caminho_blob(handle):
+    """Caminho em disco de um PDF armazenado"""
+    return os.path.join(DIRETORIO_BLOBS, os.path.basename(handle))
+
+
+def gravar_upload(arquivo):
+    """Copia o arquivo enviado para o diretório de blobs em blocos, calculando o SHA-256.
+
+    Retorna os campos que o processo guarda no lugar do conteúdo do PDF.
+    Arquivos idênticos compartilham o mesmo blob.
+    """
+    os.makedirs(DIRETORIO_BLOBS, exist_ok=True)
+    sha = hashlib.sha256()
+    tamanho = 0
+    arquivo.seek(0)
+    descritor, temporario = tempfile.mkstemp(dir=DIRETORIO_BLOBS, suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "wb") as destino:
+            for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO), b""):
+                sha.update(bloco)
+                destino.write(bloco)
+                tamanho += len(bloco)
+        sha256 = sha.hexdigest()
+        handle = f"{sha256}.pdf"
+        if os.path.exists(caminho_blob(handle)):
+            os.remove(temporario)
+        else:
+            os.replace(temporario, caminho_blob(handle))
+    except Exception:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return {"pdf_handle": handle, "pdf_sha256": sha256, "pdf_tamanho": tamanho}
+
+
+def remover_blob(handle):
+    """Apaga um PDF armazenado (quem chama confere antes que nenhum processo o usa)"""
+    try:
+        os.remove(caminho_blob(handle))
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def abrir_blob(handle):
+    """Mapeia o PDF armazenado em memória (somente leitura) e fornece um memoryview"""
+    with open(caminho_blob(handle), "rb") as arquivo:
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            buffer = memoryview(mapa)
+            try:
+                yield buffer
+            finally:
+                buffer.release()
@@ -0,0 +1 @@
+"""Benchmarks do sistema de laudos (suite.py, com geradores em dados_sinteticos.py, e scripts bench_*.py)"""
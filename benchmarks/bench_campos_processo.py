@@ -0,0 +1,63 @@
+"""Benchmark do extrator de campos estruturados num processo sintético de 1.500 páginas.
+
+Uso: python benchmarks/bench_campos_processo.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campos_processo import extrair_campos
+
+PAGINAS = 1500
+LIMITE_SEGUNDOS = 1.0
+
+QUALIFICACAO = (
+    "EXCELENTÍSSIMO SENHOR JUIZ FEDERAL DA 17ª VARA FEDERAL\n"
+    "MARIA DA SILVA, brasileira, casada, profissão: agricultora, nascida em 12/03/1970, "
+    "portadora do RG nº 1.234.567 SSP/PB, inscrita no CPF sob o nº 123.456.789-09, "
+    "vem propor a presente ação em face do INSS, tendo requerido o benefício NB 612.345.678-9 "
+    "com DER em 05/02/2023, indeferido administrativamente.\n"
+)
+PARAGRAFO = (
+    "O Instituto Nacional do Seguro Social apresentou contestação alegando que a parte autora não "
+    "comprovou a incapacidade laboral no período de carência, requerendo a improcedência do pedido. "
+    "Juntada de documentos médicos, extratos do CNIS e processo administrativo em 12/05/2023.\n"
+)
+
+
+def gerar_paginas(com_campos=True):
+    """Páginas de ~3.000 caracteres; com_campos=False é o pior caso (nenhum campo encontrado)"""
+    corpo = PARAGRAFO * 12
+    for numero in range(PAGINAS):
+        texto = corpo
+        if com_campos and numero == 0:
+            texto = QUALIFICACAO + corpo
+        elif com_campos and numero % 250 == 0:
+            texto = corpo + f"Atestado médico: CID M54.{numero % 10} - lombalgia.\n"
+        yield numero, texto
+
+
+def medir(com_campos):
+    paginas = list(gerar_paginas(com_campos))
+    caracteres = sum(len(texto) for _, texto in paginas)
+    inicio = time.perf_counter()
+    campos = extrair_campos(paginas)
+    return time.perf_counter() - inicio, caracteres, campos
+
+
+def main():
+    falhou = False
+    for nome, com_campos in (("processo típico", True), ("pior caso (sem campos)", False)):
+        duracao, caracteres, campos = medir(com_campos)
+        print(f"{nome}: {PAGINAS} páginas, {caracteres / 1e6:.1f} M caracteres, "
+              f"{duracao * 1000:.1f} ms, {len(campos)} campos")
+        falhou = falhou or duracao > LIMITE_SEGUNDOS
+    if falhou:
+        print(f"ACIMA DO LIMITE de {LIMITE_SEGUNDOS:.1f} s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark das certidões de ausência: 100 certidões uma a uma (arquivo em temp/) e em lote, em memória.
+
+Uso: python benchmarks/bench_certidoes.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utilidades import gerar_certidao_ausencia, gerar_certidoes_ausencia
+
+CERTIDOES = 100
+LIMITE_SEGUNDOS = 0.5
+
+
+def gerar_processos():
+    for i in range(CERTIDOES):
+        yield {
+            "numero_processo": f"{i:07d}-12.2026.4.05.8102",
+            "nome_parte": f"Maria José da Conceição {i}",
+            "tipo": "AD" if i % 2 else "BPC",
+            "horario": f"{8 + i // 12:02d}:{(i % 12) * 5:02d}",
+            "data": "2026-10-19",
+            "local": "17ª Vara Federal - Juazeiro do Norte",
+        }
+
+
+def main():
+    processos = list(gerar_processos())
+    falhou = False
+
+    # Uma chamada por certidão, gravando em temp/ (num diretório de trabalho descartável)
+    diretorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as diretorio:
+        os.chdir(diretorio)
+        try:
+            inicio = time.perf_counter()
+            for p in processos:
+                gerar_certidao_ausencia(p["numero_processo"], p["nome_parte"], p["tipo"], p["horario"],
+                                        p["data"], p["local"])
+            duracao = time.perf_counter() - inicio
+        finally:
+            os.chdir(diretorio_original)
+    print(f"uma a uma (arquivo): {CERTIDOES} certidões em {duracao * 1000:.1f} ms")
+
+    for nome, mesclar in (("lote, PDF único", True), ("lote, um PDF por processo", False)):
+        inicio = time.perf_counter()
+        resultado = gerar_certidoes_ausencia(processos, mesclar=mesclar)
+        duracao = time.perf_counter() - inicio
+        tamanho = len(resultado) if mesclar else sum(len(pdf) for _, pdf in resultado)
+        print(f"{nome}: {CERTIDOES} certidões em {duracao * 1000:.1f} ms, {tamanho / 1024:.0f} KB")
+        falhou = falhou or duracao > LIMITE_SEGUNDOS
+
+    if falhou:
+        print(f"ACIMA DO LIMITE de {LIMITE_SEGUNDOS:.1f} s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark do autocompletar da CID-10 com uma tabela sintética do tamanho da completa (~14.000 códigos).
+
+Uso: python benchmarks/bench_cid10.py
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cid10 import IndiceCID10
+
+CODIGOS = 14000
+LIMITE_P95_MS = 1.0
+
+PALAVRAS = (
+    "transtorno episódio depressivo ansiedade dor lombar crônica aguda síndrome fratura sequela "
+    "neoplasia maligna benigna doença pulmonar renal cardíaca hipertensão diabetes artrose "
+    "coluna membro superior inferior joelho ombro quadril não especificada outras formas "
+    "com sem complicações sintomas psicóticos lesão traumatismo infecção inflamação"
+).split()
+CONSULTAS = ["m54", "F32.1", "depress", "lombar", "cronica", "síndrome", "joelho", "especificada", "s82", "zzz"]
+
+
+def gerar_tabela(aleatorio):
+    entradas = []
+    for n in range(CODIGOS):
+        letra = "ABCDEFGHIJKLMNOPQRSTVWXYZ"[n % 25]
+        codigo = f"{letra}{(n // 25) % 100:02d}.{n % 10}"
+        descricao = " ".join(aleatorio.choice(PALAVRAS) for _ in range(aleatorio.randint(3, 9))).capitalize()
+        entradas.append((codigo, descricao))
+    return entradas
+
+
+def main():
+    aleatorio = random.Random(42)
+    entradas = gerar_tabela(aleatorio)
+
+    inicio = time.perf_counter()
+    indice = IndiceCID10(entradas)
+    montagem = time.perf_counter() - inicio
+    print(f"índice: {len(indice)} códigos montados em {montagem * 1000:.0f} ms")
+
+    tempos = []
+    for _ in range(50):
+        for consulta in CONSULTAS:
+            inicio = time.perf_counter()
+            indice.buscar(consulta, limite=10)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    p50 = statistics.median(tempos)
+    p95 = tempos[int(len(tempos) * 0.95)]
+    print(f"busca (top 10): {len(tempos)} consultas, p50 {p50:.3f} ms, p95 {p95:.3f} ms, máx {tempos[-1]:.3f} ms")
+    if p95 > LIMITE_P95_MS:
+        print(f"ACIMA DO LIMITE de {LIMITE_P95_MS:.1f} ms (p95)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark da exportação do histórico completo (~54 mil processos em 4 anos de agenda) em CSV e Parquet.
+
+Mede o tempo e o pico de memória do Python (tracemalloc) de cada formato; a memória deve
+ficar na ordem de um lote, não do histórico inteiro.
+
+Uso: python benchmarks/bench_exportacao_historico.py
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from armazenamento import Repositorio
+from benchmarks.dados_sinteticos import gerar_agenda
+from exportacao_historico import formatos_disponiveis, gravar_historico
+
+ANOS = 4
+PROCESSOS_POR_MES = 1200
+LIMITE_SEGUNDOS = 1.5
+LIMITE_MEMORIA_MB = 32
+
+
+def main():
+    falhou = False
+    with tempfile.TemporaryDirectory(prefix="bench_historico_") as diretorio:
+        repo = Repositorio(os.path.join(diretorio, "laudos.db"))
+        inicio = time.perf_counter()
+        pericias, processos = gerar_agenda(repo, anos=ANOS, processos_por_mes=PROCESSOS_POR_MES)
+        print(f"agenda: {pericias} perícias e {processos} processos em {time.perf_counter() - inicio:.1f} s")
+
+        for formato in formatos_disponiveis():
+            gravar_historico(repo, formato, diretorio)  # aquecimento (importação do pyarrow)
+            inicio = time.perf_counter()
+            caminho = gravar_historico(repo, formato, diretorio)
+            duracao = time.perf_counter() - inicio
+            # A memória é medida numa execução à parte (o tracemalloc deixa a gravação bem mais lenta)
+            tracemalloc.start()
+            gravar_historico(repo, formato, diretorio)
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{formato:<8} {duracao:.2f} s ({processos / duracao:,.0f} linhas/s), "
+                  f"{os.path.getsize(caminho) / 1024 / 1024:.1f} MB, pico de memória {pico / 1024 / 1024:.1f} MB")
+            if duracao > LIMITE_SEGUNDOS or pico > LIMITE_MEMORIA_MB * 1024 * 1024:
+                print(f"ACIMA DO LIMITE ({LIMITE_SEGUNDOS} s, {LIMITE_MEMORIA_MB} MB)")
+                falhou = True
+    if falhou:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark da importação de uma pauta completa (60 linhas, algumas com erro) em CSV.
+
+Mede leitura, conferência e gravação numa única transação, com o pandas já importado
+(o custo da importação do módulo fica para o bench_inicializacao).
+
+Uso: python benchmarks/bench_importacao_pauta.py
+"""
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from armazenamento import Repositorio
+from importacao_pauta import importar_pauta
+
+LINHAS = 60
+LINHAS_COM_ERRO = 5
+REPETICOES = 10
+LIMITE_SEGUNDOS = 0.25
+TIPOS = ["Auxílio Doença (AD)", "Auxílio Acidente (AA)", "Benefício de Prestação Continuada (BPC)"]
+
+
+def numero_cnj(sequencial, ano=2026, justica=4, tribunal=5, origem=8102):
+    """Número CNJ com o dígito verificador correto (módulo 97)"""
+    base = int(f"{sequencial:07d}{ano:04d}{justica}{tribunal:02d}{origem:04d}")
+    verificador = 98 - (base * 100) % 97
+    return f"{sequencial:07d}-{verificador:02d}.{ano:04d}.{justica}.{tribunal:02d}.{origem:04d}"
+
+
+def gerar_pauta():
+    linhas = ["Horário;Nº do Processo;Nome da Parte;Tipo de Perícia"]
+    for i in range(LINHAS):
+        minutos = 8 * 60 + i * 7
+        horario = f"{minutos // 60}h{minutos % 60:02d}"
+        numero = numero_cnj(1000 + i)
+        if i < LINHAS_COM_ERRO:
+            numero = numero[:-1]  # número incompleto
+        linhas.append(f"{horario};{numero};Maria José da Conceição {i};{TIPOS[i % 3].split('(')[1].rstrip(')')}")
+    return "\n".join(linhas).encode("latin-1")
+
+
+def main():
+    conteudo = gerar_pauta()
+    tempos = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        repo = Repositorio(os.path.join(diretorio, "laudos.db"))
+        for n in range(REPETICOES):
+            inicio = time.perf_counter()
+            importados, erros = importar_pauta(
+                repo, f"2026-10-{n + 1:02d}", "17ª Vara Federal (Juazeiro do Norte)",
+                io.BytesIO(conteudo), "pauta.csv", "admin", TIPOS, TIPOS[0]
+            )
+            tempos.append(time.perf_counter() - inicio)
+            assert importados == LINHAS - LINHAS_COM_ERRO and len(erros) == LINHAS_COM_ERRO, (importados, erros)
+
+    # A primeira importação inclui a compilação das expressões regulares do pandas
+    print(f"pauta de {LINHAS} linhas: {statistics.median(tempos) * 1000:.1f} ms (mediana), "
+          f"primeira {tempos[0] * 1000:.1f} ms")
+    if max(tempos) > LIMITE_SEGUNDOS:
+        print(f"ACIMA DO LIMITE de {LIMITE_SEGUNDOS * 1000:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
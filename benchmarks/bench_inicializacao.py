@@ -0,0 +1,98 @@
+"""Benchmark da inicialização do app: tempo até o formulário de login e custo de importação por módulo.
+
+Cada medida roda num interpretador novo (importações a frio). Falha se o login passar do limite
+ou se alguma dependência pesada for carregada antes de alguém entrar.
+
+Uso: python benchmarks/bench_inicializacao.py
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LIMITE_LOGIN_SEGUNDOS = 1.5
+REPETICOES = 3
+
+# Não devem ser carregadas para mostrar a tela de login
+DEPENDENCIAS_PESADAS = ("pandas", "fitz", "openai", "reportlab", "fpdf", "PyPDF2", "pdfplumber")
+
+# Módulos do projeto e dependências cujo custo de importação é registrado
+MODULOS = (
+    "streamlit", "pandas", "fitz", "openai", "reportlab.platypus", "fpdf",
+    "armazenamento", "arquivos_processo", "catalogo_patologias", "cid10", "cache_texto", "cache_respostas",
+    "campos_processo", "extracao_pdf", "cliente_ia", "resumo_processo", "redacao_laudos", "laudos_ad",
+    "lote_pre_laudos", "fila_pre_laudos", "utilidades", "laudo_pdf", "exportacao_dia", "importacao_pauta",
+    "exportacao_historico",
+)
+
+SCRIPT_LOGIN = """
+import json, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=60).run()
+duracao = time.perf_counter() - inicio
+textos = [m.value for m in app.markdown]
+print(json.dumps({
+    "segundos": duracao,
+    "login": any("login" in t.lower() for t in textos),
+    "erros": [str(e.value) for e in app.exception],
+    "carregadas": [m for m in %r if m in sys.modules],
+}))
+""" % (DEPENDENCIAS_PESADAS,)
+
+
+def medir_login(ambiente):
+    resultado = subprocess.run(
+        [sys.executable, "-c", SCRIPT_LOGIN], cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def custo_importacao(modulo, ambiente):
+    """Tempo acumulado (ms) de `import modulo` a frio, pelo -X importtime"""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, env=ambiente, capture_output=True, text=True
+    )
+    if resultado.returncode != 0:
+        return None
+    for linha in reversed(resultado.stderr.splitlines()):
+        partes = linha.split("|")
+        if len(partes) == 3 and partes[2].strip() == modulo:
+            return int(partes[1]) / 1000
+    return None
+
+
+def main():
+    with tempfile.TemporaryDirectory() as diretorio:
+        ambiente = {**os.environ, "LAUDOS_DB_PATH": os.path.join(diretorio, "laudos.db"), "PYTHONPATH": RAIZ}
+
+        medidas = [medir_login(ambiente) for _ in range(REPETICOES)]
+        melhor = min(medida["segundos"] for medida in medidas)
+        ultima = medidas[-1]
+        print(f"tempo até o formulário de login: {melhor:.2f} s (melhor de {REPETICOES})")
+
+        print("custo de importação a frio (ms):")
+        for modulo in MODULOS:
+            custo = custo_importacao(modulo, ambiente)
+            print(f"  {modulo:<22} {'-' if custo is None else f'{custo:8.1f}'}")
+
+    falhou = False
+    if ultima["erros"] or not ultima["login"]:
+        print(f"A TELA DE LOGIN NÃO FOI EXIBIDA: {ultima['erros']}")
+        falhou = True
+    if ultima["carregadas"]:
+        print(f"DEPENDÊNCIAS PESADAS CARREGADAS NO LOGIN: {', '.join(ultima['carregadas'])}")
+        falhou = True
+    if melhor > LIMITE_LOGIN_SEGUNDOS:
+        print(f"ACIMA DO LIMITE de {LIMITE_LOGIN_SEGUNDOS:.1f} s")
+        falhou = True
+    if falhou:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark do gerador de laudos em PDF: os laudos de um dia (40 processos) numa chamada em lote.
+
+Mede o tempo da primeira chamada (importações e fontes), o do lote e o tempo por laudo (p50/p95).
+
+Uso: python benchmarks/bench_laudos.py
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from laudo_pdf import MODELOS_VARA, renderizar_laudo, renderizar_laudos
+
+LAUDOS = 40
+LIMITE_MS_POR_LAUDO = 60
+
+ANAMNESE = (
+    "Periciando(a) relata dor lombar de forte intensidade há cerca de três anos, com irradiação para o membro "
+    "inferior esquerdo, piora aos esforços e melhora parcial com analgésicos. Refere afastamento do trabalho "
+    "desde o início do ano e acompanhamento com ortopedista e fisioterapia.\n"
+)
+
+
+def gerar_processos():
+    varas = list(MODELOS_VARA)
+    for i in range(LAUDOS):
+        yield {
+            "numero_processo": f"{i:07d}-12.2026.4.05.8102",
+            "nome_parte": f"Maria José da Conceição {i}",
+            "tipo": "Auxílio Doença (AD)",
+            "data": "2026-10-19",
+            "horario": f"{8 + i // 12:02d}:{(i % 12) * 5:02d}",
+            "local": varas[i % len(varas)],
+            "data_nascimento": "1970-03-12",
+            "idade": 56,
+            "profissao": "agricultora",
+            "escolaridade": "Ensino fundamental incompleto",
+            "der": "2025-02-05",
+            "anamnese": ANAMNESE * (1 + i % 6),
+            "exame_fisico": "Dor à palpação em região lombossacral, Lasègue positivo à esquerda. Marcha antálgica.",
+            "patologias": ["Lombalgia (CID M54.5)", "Transtornos de discos lombares (CID M51.1)"],
+            "incapacidade": "Sim",
+            "data_inicio": "2026-01-10",
+            "data_fim": "2027-01-10",
+            "quesitos": "\n".join(f"{n}) Resposta ao quesito {n}." for n in range(1, 16)),
+            "conclusao": "Há incapacidade total e temporária para a atividade habitual.",
+        }
+
+
+def main():
+    processos = list(gerar_processos())
+
+    # Primeira chamada: inclui o carregamento das fontes pelo reportlab
+    inicio = time.perf_counter()
+    renderizar_laudos(processos)
+    duracao_fria = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    laudos = renderizar_laudos(processos)
+    duracao_lote = time.perf_counter() - inicio
+
+    tempos = []
+    for processo in processos:
+        inicio = time.perf_counter()
+        renderizar_laudo(processo)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    p50 = statistics.median(tempos)
+    p95 = tempos[int(len(tempos) * 0.95)]
+
+    tamanho = sum(len(pdf) for _, pdf in laudos)
+    print(f"primeiro lote: {LAUDOS} laudos em {duracao_fria * 1000:.0f} ms")
+    print(f"lote: {LAUDOS} laudos em {duracao_lote * 1000:.0f} ms, {tamanho / 1024:.0f} KB")
+    print(f"por laudo: p50 {p50:.1f} ms, p95 {p95:.1f} ms")
+    if p95 > LIMITE_MS_POR_LAUDO:
+        print(f"ACIMA DO LIMITE de {LIMITE_MS_POR_LAUDO} ms por laudo")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
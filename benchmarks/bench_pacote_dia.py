@@ -0,0 +1,85 @@
+"""Benchmark do ZIP do dia em fluxo: 30 processos (laudos e certidões) e 200 MB de PDFs anexados.
+
+Mede o tempo até o primeiro bloco, a vazão e o pico de memória (tracemalloc) ao consumir o fluxo.
+
+Uso: python benchmarks/bench_pacote_dia.py
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DIRETORIO = tempfile.mkdtemp(prefix="bench_pacote_")
+os.environ["LAUDOS_BLOBS_DIR"] = DIRETORIO
+
+from exportacao_dia import documentos_do_dia, fluxo_zip
+
+PROCESSOS = 30
+ANEXOS = 4
+TAMANHO_ANEXO_MB = 50
+LIMITE_PRIMEIRO_BLOCO_SEGUNDOS = 0.5
+LIMITE_MEMORIA_MB = 16
+
+
+def gerar_processos():
+    # Anexos grandes com conteúdo aleatório (não comprimível, como um PDF digitalizado)
+    for n in range(ANEXOS):
+        with open(os.path.join(DIRETORIO, f"anexo{n}.pdf"), "wb") as arquivo:
+            for _ in range(TAMANHO_ANEXO_MB):
+                arquivo.write(os.urandom(1024 * 1024))
+    for i in range(PROCESSOS):
+        yield {
+            "numero_processo": f"{i:07d}-12.2026.4.05.8102",
+            "nome_parte": f"Maria José da Conceição {i}",
+            "tipo": "Auxílio Doença (AD)",
+            "data": "2026-10-19",
+            "horario": f"{8 + i // 12:02d}:{(i % 12) * 5:02d}",
+            "local": "17ª Vara Federal (Juazeiro do Norte)",
+            "situacao": "Ausente" if i % 5 == 0 else "Concluído",
+            "anamnese": "Dor lombar há três anos, com irradiação para o membro inferior esquerdo.\n" * 10,
+            "conclusao": "Há incapacidade total e temporária.",
+            "pdf_handle": f"anexo{i}.pdf" if i < ANEXOS else None,
+        }
+
+
+def main():
+    processos = list(gerar_processos())
+    destino = os.path.join(DIRETORIO, "pacote.zip")
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    primeiro_bloco = None
+    total = 0
+    with open(destino, "wb") as arquivo:
+        for bloco in fluxo_zip(documentos_do_dia(processos, incluir_processos=True)):
+            if primeiro_bloco is None:
+                primeiro_bloco = time.perf_counter() - inicio
+            arquivo.write(bloco)
+            total += len(bloco)
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    with zipfile.ZipFile(destino) as arquivo_zip:
+        assert arquivo_zip.testzip() is None
+        nomes = arquivo_zip.namelist()
+
+    print(f"{len(nomes)} arquivos, {total / 1024 / 1024:.0f} MB em {duracao:.2f} s "
+          f"({total / 1024 / 1024 / duracao:.0f} MB/s)")
+    print(f"primeiro bloco em {primeiro_bloco * 1000:.0f} ms, pico de memória {pico / 1024 / 1024:.1f} MB")
+    if primeiro_bloco > LIMITE_PRIMEIRO_BLOCO_SEGUNDOS or pico > LIMITE_MEMORIA_MB * 1024 * 1024:
+        print(f"ACIMA DO LIMITE ({LIMITE_PRIMEIRO_BLOCO_SEGUNDOS} s até o primeiro bloco, {LIMITE_MEMORIA_MB} MB de memória)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        for nome in os.listdir(DIRETORIO):
+            os.remove(os.path.join(DIRETORIO, nome))
+        os.rmdir(DIRETORIO)
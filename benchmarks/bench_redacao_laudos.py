@@ -0,0 +1,159 @@
+"""Benchmark da redação assistida (anamnese, histórico e conclusão) de um lote de 40 processos,
+contra um servidor local que imita a API de chat completions (latência fixa, erros 429/500 e
+respostas lentas ocasionais para exercitar as novas tentativas e o timeout).
+
+O lote roda duas vezes com o cache de respostas: na segunda, com um quarto dos processos
+alterados, só as seções desses processos vão ao servidor. Por fim, um processo de 1.000 páginas
+é resumido por map-reduce, com o custo de cada etapa.
+
+Uso: python benchmarks/bench_redacao_laudos.py
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cliente_ia
+from cache_respostas import CacheRespostas
+from cliente_ia import criar_cliente
+from redacao_laudos import SECOES_REDACAO, redigir_lote
+from resumo_processo import resumir_processo
+
+PROCESSOS = 40
+SIMULTANEAS = 8
+LATENCIA_SERVIDOR = 0.2
+TIMEOUT = 1.0
+PROBABILIDADE_ERRO = 0.05
+PROBABILIDADE_LENTA = 0.02
+PAGINAS_PROCESSO_LONGO = 1000
+
+
+class ServidorStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    aleatorio = random.Random(7)
+    lock = threading.Lock()
+    em_andamento = 0
+    pico = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, codigo, corpo):
+        dados = json.dumps(corpo).encode()
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        try:
+            self.wfile.write(dados)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # o cliente desistiu do pedido (timeout)
+
+    def do_POST(self):
+        pedido = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = type(self)
+        with cls.lock:
+            cls.em_andamento += 1
+            cls.pico = max(cls.pico, cls.em_andamento)
+            sorteio = cls.aleatorio.random()
+        try:
+            if sorteio < PROBABILIDADE_ERRO:
+                self._responder(429 if sorteio < PROBABILIDADE_ERRO / 2 else 500, {"error": {"message": "stub"}})
+                return
+            time.sleep(TIMEOUT * 2 if sorteio > 1 - PROBABILIDADE_LENTA else LATENCIA_SERVIDOR)
+            conteudo = pedido["messages"][-1]["content"]
+            self._responder(200, {
+                "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": pedido["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": f"Minuta: {conteudo[:60]}"}}],
+                "usage": {"prompt_tokens": len(conteudo) // 4, "completion_tokens": 50,
+                          "total_tokens": len(conteudo) // 4 + 50},
+            })
+        finally:
+            with cls.lock:
+                cls.em_andamento -= 1
+
+
+def paginas_processo_longo():
+    """Páginas sintéticas com peças processuais repetitivas entre os documentos médicos"""
+    for numero in range(PAGINAS_PROCESSO_LONGO):
+        if numero % 5 == 0:
+            yield numero, "CERTIDÃO\nCertifico que os autos foram remetidos à contadoria judicial.\n" * 3
+        elif numero % 7 == 0:
+            yield numero, ""
+        else:
+            yield numero, (f"Página {numero}. Atestado médico: paciente com lombalgia crônica (CID M54.5), "
+                           f"em tratamento fisioterápico, afastado do trabalho desde 03/2022.\n") * 15
+
+
+def main():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), ServidorStub)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{servidor.server_address[1]}/v1"
+
+    cliente_ia.ESPERA_INICIAL = 0.05
+    processos = [
+        {"id": n, "nome_parte": f"Periciando {n}", "tipo": "Auxílio Doença (AD)",
+         "texto": "Petição inicial. Lombalgia crônica, CID M54.5, afastamento desde 2022. " * 40}
+        for n in range(PROCESSOS)
+    ]
+    cache = CacheRespostas(diretorio=tempfile.mkdtemp(prefix="cache_ia_"))
+    try:
+        resultados, metricas = redigir_lote(
+            processos, cliente=criar_cliente(api_key="stub", base_url=base_url),
+            max_simultaneas=SIMULTANEAS, timeout=TIMEOUT, cache=cache,
+        )
+        # Segunda geração: o perito alterou o texto de um quarto dos processos
+        for processo in processos[::4]:
+            processo["texto"] += " Novo atestado juntado."
+        _, metricas_cache = redigir_lote(
+            processos, cliente=criar_cliente(api_key="stub", base_url=base_url),
+            max_simultaneas=SIMULTANEAS, timeout=TIMEOUT, cache=cache,
+        )
+        inicio = time.perf_counter()
+        resumo, etapas = resumir_processo(
+            paginas_processo_longo(), cliente=criar_cliente(api_key="stub", base_url=base_url),
+            max_simultaneas=SIMULTANEAS, timeout=TIMEOUT,
+        )
+        duracao_resumo = time.perf_counter() - inicio
+    finally:
+        servidor.shutdown()
+
+    pedidos = PROCESSOS * len(SECOES_REDACAO)
+    sequencial = pedidos * LATENCIA_SERVIDOR
+    print(f"{PROCESSOS} processos, {pedidos} pedidos, até {SIMULTANEAS} simultâneos "
+          f"(pico no servidor, contando pedidos abandonados por timeout: {ServidorStub.pico})")
+    print(f"duração {metricas['duracao']:.2f} s ({metricas['pedidos_por_segundo']:.1f} pedidos/s; "
+          f"sequencial seria ~{sequencial:.0f} s)")
+    print(f"latência do pedido p50 {metricas['latencia_p50'] * 1000:.0f} ms, "
+          f"p95 {metricas['latencia_p95'] * 1000:.0f} ms; com fila e novas tentativas "
+          f"p50 {metricas['tempo_total_p50'] * 1000:.0f} ms, p95 {metricas['tempo_total_p95'] * 1000:.0f} ms")
+    print(f"{metricas['novas_tentativas']} novas tentativas, {metricas['falhas']} falhas")
+    print(f"tokens: {metricas['tokens_entrada']} de entrada, {metricas['tokens_saida']} de saída")
+    estatisticas = cache.estatisticas()
+    print(f"nova geração com cache: {metricas_cache['duracao']:.2f} s, "
+          f"{metricas_cache['acertos_cache']}/{pedidos} seções do cache, "
+          f"{metricas_cache['tokens_entrada'] + metricas_cache['tokens_saida']} tokens "
+          f"(taxa de acerto acumulada {estatisticas['taxa_acerto']:.0%})")
+    divisao, mapa, reducao = etapas["divisao"], etapas["mapa"], etapas["reducao"]
+    print(f"resumo de {divisao['paginas']} páginas ({divisao['descartadas']} descartadas) em {duracao_resumo:.2f} s: "
+          f"divisão {divisao['trechos']} trechos / {divisao['tokens']} tokens em {divisao['duracao'] * 1000:.0f} ms; "
+          f"mapa {mapa['pedidos']} pedidos, {mapa['tokens_entrada']}+{mapa['tokens_saida']} tokens, "
+          f"{mapa['duracao']:.2f} s; redução {reducao['niveis']} nível(is), {reducao['pedidos']} pedidos, "
+          f"{reducao['tokens_entrada']}+{reducao['tokens_saida']} tokens, {reducao['duracao']:.2f} s; "
+          f"resumo final {len(resumo)} caracteres")
+    esperados = pedidos - len(processos[::4]) * len(SECOES_REDACAO)
+    if (metricas["falhas"] or metricas_cache["falhas"] or len(resultados) != PROCESSOS
+            or metricas_cache["acertos_cache"] != esperados):
+        print("FALHOU")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
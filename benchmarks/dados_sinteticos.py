@@ -0,0 +1,141 @@
+"""Geradores de dados sintéticos realistas para os benchmarks: agenda, processos e PDFs de processos.
+
+Todos aceitam uma semente, para que duas execuções gerem exatamente os mesmos dados.
+"""
+import ast
+import os
+import random
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TIPOS = ["Auxílio Doença (AD)", "Auxílio Acidente (AA)", "Benefício de Prestação Continuada (BPC)"]
+SITUACOES = ["Pré-laudo", "Em produção", "Concluído", "Ausente"]
+PESOS_SITUACOES = [3, 2, 4, 1]
+NOMES = ["Maria", "José", "Antônio", "Francisca", "João", "Ana", "Francisco", "Luzia", "Raimundo", "Conceição"]
+SOBRENOMES = ["da Silva", "dos Santos", "de Oliveira", "Pereira", "Alves", "Ferreira", "Rodrigues", "de Sousa"]
+HORARIOS = [f"{hora:02d}:{minuto:02d}" for hora in range(8, 17) for minuto in range(0, 60, 10)]
+
+QUALIFICACAO = (
+    "EXCELENTÍSSIMO SENHOR JUIZ FEDERAL DA {vara}\n"
+    "{nome}, brasileira, casada, profissão: agricultora, nascida em 12/03/1970, "
+    "portadora do RG nº 1.234.567 SSP/PB, inscrita no CPF sob o nº 123.456.789-09, "
+    "vem propor a presente ação em face do INSS, tendo requerido o benefício NB 612.345.678-9 "
+    "com DER em 05/02/2023, indeferido administrativamente.\n"
+)
+PARAGRAFOS_MEDICOS = [
+    "Atestado médico: paciente com lombalgia crônica (CID M54.5), sem condições de exercer atividade laboral "
+    "por 90 dias. Em uso de anti-inflamatórios e fisioterapia.",
+    "Ressonância magnética da coluna lombar: protrusão discal em L4-L5 com compressão radicular à esquerda.",
+    "Relatório psiquiátrico: episódio depressivo grave (CID F32.2), em acompanhamento desde 2021, com "
+    "internação em 2022.",
+    "Laudo do INSS: não constatada incapacidade para o trabalho ou para a atividade habitual.",
+]
+PARAGRAFO_PROCESSUAL = (
+    "O Instituto Nacional do Seguro Social apresentou contestação alegando que a parte autora não "
+    "comprovou a incapacidade laboral no período de carência, requerendo a improcedência do pedido. "
+    "Juntada de documentos médicos, extratos do CNIS e processo administrativo em 12/05/2023."
+)
+
+
+def locais_federais():
+    """LOCAIS_FEDERAIS lido do app.py sem executá-lo (importar o app monta a interface do Streamlit)"""
+    with open(os.path.join(RAIZ, "app.py"), encoding="utf-8") as arquivo:
+        arvore = ast.parse(arquivo.read())
+    for no in arvore.body:
+        if isinstance(no, ast.Assign) and any(getattr(alvo, "id", None) == "LOCAIS_FEDERAIS" for alvo in no.targets):
+            return ast.literal_eval(no.value)
+    raise LookupError("LOCAIS_FEDERAIS não encontrado em app.py")
+
+
+def gerar_processo(aleatorio, numero, data_iso, local, horario):
+    """Dicionário de processo com os campos da agenda e os do editor de laudo"""
+    nome = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)}"
+    return {
+        "numero_processo": f"{numero:07d}-{aleatorio.randint(10, 99)}.{data_iso[:4]}.4.05.8102",
+        "nome_parte": nome,
+        "horario": horario,
+        "tipo": aleatorio.choice(TIPOS),
+        "situacao": aleatorio.choices(SITUACOES, PESOS_SITUACOES)[0],
+        "data": data_iso,
+        "local": local,
+        "criado_por": "admin",
+        "data_nascimento": f"{aleatorio.randint(1950, 2000)}-{aleatorio.randint(1, 12):02d}-15",
+        "profissao": aleatorio.choice(["agricultora", "pedreiro", "doméstica", "motorista", "costureira"]),
+        "anamnese": " ".join(aleatorio.sample(PARAGRAFOS_MEDICOS, 3)) * aleatorio.randint(1, 4),
+        "exame_fisico": "Dor à palpação em região lombossacral, Lasègue positivo à esquerda. Marcha antálgica.",
+        "patologias": ["Lombalgia (CID M54.5)", "Transtornos de discos lombares (CID M51.1)"][:aleatorio.randint(1, 2)],
+        "incapacidade": aleatorio.choice(["Sim", "Não", "Parcial"]),
+        "data_inicio": "2025-01-10",
+        "data_fim": "2026-01-10",
+        "quesitos": "\n".join(f"{n}) Resposta ao quesito {n}." for n in range(1, 16)),
+        "conclusao": "Há incapacidade total e temporária para a atividade habitual.",
+    }
+
+
+def gerar_processos_do_dia(quantidade, data_iso="2026-10-19", local=None, semente=1):
+    """Processos de um dia/local (horários distintos), sem gravar no banco"""
+    aleatorio = random.Random(semente)
+    local = local or locais_federais()[0]
+    return [gerar_processo(aleatorio, i, data_iso, local, HORARIOS[i % len(HORARIOS)]) for i in range(quantidade)]
+
+
+def gerar_agenda(repo, anos=3, processos_por_mes=300, inicio=date(2024, 1, 1), semente=1):
+    """Povoa o repositório com `anos` de perícias nos LOCAIS_FEDERAIS e ~processos_por_mes processos por mês.
+
+    Cada local atende um dia útil da semana; os processos do mês são distribuídos pelos dias de perícia.
+    Retorna (número de perícias, número de processos).
+    """
+    aleatorio = random.Random(semente)
+    locais = locais_federais()
+    fim = date(inicio.year + anos, inicio.month, 1)
+    dias_por_mes = {}
+    dia = inicio
+    while dia < fim:
+        if dia.weekday() < 5:
+            local = locais[dia.weekday() % len(locais)]
+            repo.adicionar_pericia(dia.isoformat(), local, "admin")
+            dias_por_mes.setdefault((dia.year, dia.month), []).append((dia.isoformat(), local))
+        dia += timedelta(days=1)
+
+    numero = 0
+    for dias in dias_por_mes.values():
+        por_dia = max(1, processos_por_mes // len(dias))
+        for data_iso, local in dias:
+            processos = []
+            for horario in aleatorio.sample(HORARIOS, min(por_dia, len(HORARIOS))):
+                numero += 1
+                processos.append(gerar_processo(aleatorio, numero, data_iso, local, horario))
+            repo.adicionar_processos(data_iso, local, processos)
+    return sum(len(dias) for dias in dias_por_mes.values()), numero
+
+
+def gerar_pdf_processo(caminho, paginas, semente=1):
+    """PDF sintético de um processo judicial com `paginas` páginas.
+
+    Mistura petição, documentos médicos, peças processuais, páginas quase vazias (capas e
+    separadores) e páginas repetidas, como nos processos baixados do PJe.
+    """
+    import fitz  # PyMuPDF
+
+    aleatorio = random.Random(semente)
+    vara = locais_federais()[0].upper()
+    documento = fitz.open()
+    try:
+        for numero in range(paginas):
+            if numero == 0:
+                texto = QUALIFICACAO.format(vara=vara, nome="MARIA DA SILVA") + PARAGRAFO_PROCESSUAL
+            elif numero % 50 == 0:
+                texto = "CERTIDÃO\nCertifico que juntei aos autos os documentos que seguem."
+            elif numero % 37 == 0:
+                texto = f"Documento {numero}"
+            elif numero % 10 < 3:
+                texto = "\n".join(aleatorio.sample(PARAGRAFOS_MEDICOS, 2))
+            else:
+                texto = "\n".join([PARAGRAFO_PROCESSUAL] * aleatorio.randint(3, 8))
+            pagina = documento.new_page()
+            pagina.insert_textbox(fitz.Rect(50, 50, 545, 800), texto, fontsize=10)
+        documento.save(caminho, garbage=0, deflate=True)
+    finally:
+        documento.close()
+    return caminho
@@ -0,0 +1,196 @@
+"""Suíte de benchmarks com dados sintéticos e resultados em JSON, comparáveis com uma base gravada.
+
+Mede a extração de texto de PDFs (100 a 2.000 páginas), a agregação do calendário por mês, a
+filtragem da visão por local, as estatísticas por dia, as certidões e os laudos.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.suite                              # mede e mostra
+    python -m benchmarks.suite --saida resultados.json      # grava os resultados
+    python -m benchmarks.suite --gravar-base                # grava benchmarks/base.json
+    python -m benchmarks.suite --base benchmarks/base.json  # compara; sai com 1 se houver regressão
+    python -m benchmarks.suite --rapido                     # dados menores, para conferir a suíte
+
+Os scripts bench_*.py continuam independentes, cada um com o seu limite.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+CAMINHO_BASE = os.path.join(RAIZ, "benchmarks", "base.json")
+
+# Um caso é regressão quando fica mais lento que a base além desta fração (0.25 = 25%)
+TOLERANCIA_PADRAO = 0.25
+# ... e a diferença passa disto (casos de frações de milissegundo oscilam mais que a tolerância)
+DIFERENCA_MINIMA_MS = 1.0
+
+VERSAO_FORMATO = 1
+
+
+def cronometrar(funcao, repeticoes):
+    """Executa a função `repeticoes` vezes e retorna {"mediana", "minimo", "repeticoes"} em segundos.
+
+    Uma execução de aquecimento (importações, compilação de modelos) fica fora da medida.
+    """
+    funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return {"mediana": statistics.median(tempos), "minimo": min(tempos), "repeticoes": repeticoes}
+
+
+class Suite:
+    """Prepara os dados sintéticos num diretório temporário e executa os casos"""
+
+    def __init__(self, diretorio, rapido=False):
+        self.diretorio = diretorio
+        self.rapido = rapido
+        self.resultados = {}
+        # Os módulos leem os diretórios das variáveis de ambiente ao serem importados
+        os.environ["LAUDOS_CACHE_TEXTO_DIR"] = os.path.join(diretorio, "cache_texto")
+        os.environ["LAUDOS_BLOBS_DIR"] = os.path.join(diretorio, "blobs")
+
+    def registrar(self, nome, medida, **extras):
+        self.resultados[nome] = {**medida, **extras}
+        detalhes = ", ".join(f"{chave} {valor}" for chave, valor in extras.items())
+        print(f"  {nome:<36} {medida['mediana'] * 1000:10.1f} ms  {detalhes}")
+
+    # ------------------------------------------------------------ casos
+
+    def extracao_pdf(self):
+        from benchmarks.dados_sinteticos import gerar_pdf_processo
+        from extracao_pdf import extrair_texto_pdf
+
+        for paginas in ((100, 500) if self.rapido else (100, 2000)):
+            caminho = gerar_pdf_processo(os.path.join(self.diretorio, f"processo_{paginas}.pdf"), paginas)
+            medida = cronometrar(lambda: extrair_texto_pdf(caminho, usar_cache=False), 3)
+            self.registrar(f"extracao_pdf_{paginas}_paginas", medida, paginas=paginas,
+                           paginas_por_segundo=round(paginas / medida["mediana"]))
+            # O aquecimento popula o cache
+            medida = cronometrar(lambda: extrair_texto_pdf(caminho), 5)
+            self.registrar(f"extracao_pdf_{paginas}_paginas_cache", medida, paginas=paginas)
+
+    def agenda(self):
+        from armazenamento import Repositorio
+        from benchmarks.dados_sinteticos import gerar_agenda, locais_federais
+
+        anos, por_mes = (1, 100) if self.rapido else (3, 300)
+        repo = Repositorio(os.path.join(self.diretorio, "laudos.db"))
+        inicio = time.perf_counter()
+        pericias, processos = gerar_agenda(repo, anos=anos, processos_por_mes=por_mes)
+        print(f"  (agenda: {pericias} perícias e {processos} processos em {time.perf_counter() - inicio:.1f} s)")
+        meses = [(2024 + m // 12, m % 12 + 1) for m in range(anos * 12)]
+        locais = locais_federais()
+
+        # Calendário: o que resumo_do_mes consulta para cada mês (perícias e contagem de processos)
+        def agregar_meses():
+            for ano, mes in meses:
+                repo.pericias_do_mes(ano, mes)
+                repo.contar_processos_do_mes(ano, mes)
+        self.registrar("calendario_agregacao_mensal", cronometrar(agregar_meses, 5), meses=len(meses))
+
+        # Visão do local: futuras/passadas pelo índice e processos por data
+        hoje = date(2024 + anos // 2, 6, 15)
+
+        def filtrar_locais():
+            for local in locais:
+                repo.pericias_do_local(local, hoje)
+                repo.contar_processos_por_data(local, hoje.isoformat())
+        self.registrar("visao_local_filtragem", cronometrar(filtrar_locais, 5), locais=len(locais))
+
+        # Estatísticas do dia: processos indexados do dia e totais por situação, em 100 dias de perícia
+        dias = list(repo.pericias_do_periodo("2024-01-01", "2024-12-31").items())[:100]
+
+        def estatisticas_dias():
+            for data_iso, locais_do_dia in dias:
+                for local in locais_do_dia:
+                    processos = repo.processos_do_dia(data_iso, local)
+                    totais = {}
+                    for processo in processos:
+                        totais[processo["situacao"]] = totais.get(processo["situacao"], 0) + 1
+        self.registrar("estatisticas_por_dia", cronometrar(estatisticas_dias, 3), dias=len(dias))
+
+    def documentos(self):
+        from benchmarks.dados_sinteticos import gerar_processos_do_dia
+        from laudo_pdf import renderizar_laudos
+        from utilidades import gerar_certidoes_ausencia
+
+        processos = gerar_processos_do_dia(100)
+        self.registrar("certidoes_100", cronometrar(lambda: gerar_certidoes_ausencia(processos), 5), certidoes=100)
+        quantidade = 10 if self.rapido else 40
+        medida = cronometrar(lambda: renderizar_laudos(processos[:quantidade]), 3)
+        self.registrar(f"laudos_{quantidade}", medida, laudos=quantidade,
+                       ms_por_laudo=round(medida["mediana"] * 1000 / quantidade, 1))
+
+    def executar(self):
+        for caso in (self.extracao_pdf, self.agenda, self.documentos):
+            print(f"{caso.__name__}:")
+            caso()
+        return {
+            "versao": VERSAO_FORMATO,
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "rapido": self.rapido,
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "resultados": self.resultados,
+        }
+
+
+def comparar(atual, base, tolerancia=TOLERANCIA_PADRAO):
+    """Compara as medianas com a base; retorna a lista de casos que ficaram mais lentos além da tolerância"""
+    if atual.get("rapido") != base.get("rapido"):
+        print("AVISO: execução e base com tamanhos diferentes (--rapido); a comparação não é válida")
+    regressoes = []
+    print(f"comparação com a base de {base.get('data', '?')} (tolerância {tolerancia:.0%}):")
+    for nome, medida in atual["resultados"].items():
+        anterior = base["resultados"].get(nome)
+        if anterior is None:
+            print(f"  {nome:<36} sem base")
+            continue
+        razao = medida["mediana"] / anterior["mediana"] if anterior["mediana"] else 1.0
+        marca = ""
+        if razao > 1 + tolerancia and (medida["mediana"] - anterior["mediana"]) * 1000 > DIFERENCA_MINIMA_MS:
+            marca = "  REGRESSÃO"
+            regressoes.append(nome)
+        print(f"  {nome:<36} {anterior['mediana'] * 1000:10.1f} -> {medida['mediana'] * 1000:10.1f} ms "
+              f"({razao - 1:+.0%}){marca}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do sistema de laudos com dados sintéticos")
+    parser.add_argument("--saida", help="grava os resultados (JSON) neste arquivo")
+    parser.add_argument("--base", help="compara com os resultados gravados neste arquivo")
+    parser.add_argument("--gravar-base", action="store_true", help=f"grava os resultados em {CAMINHO_BASE}")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO)
+    parser.add_argument("--rapido", action="store_true", help="dados menores")
+    argumentos = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_laudos_") as diretorio:
+        resultados = Suite(diretorio, rapido=argumentos.rapido).executar()
+
+    for caminho in filter(None, (argumentos.saida, CAMINHO_BASE if argumentos.gravar_base else None)):
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+        print(f"resultados gravados em {caminho}")
+
+    if argumentos.base:
+        with open(argumentos.base, encoding="utf-8") as arquivo:
+            regressoes = comparar(resultados, json.load(arquivo), argumentos.tolerancia)
+        if regressoes:
+            print(f"REGRESSÃO em {', '.join(regressoes)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
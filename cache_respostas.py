@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Diretório, validade e tamanho máximo do cache de respostas da IA (configuráveis por variável de ambiente)
+DIRETORIO_CACHE_RESPOSTAS = os.environ.get("LAUDOS_CACHE_IA_DIR", os.path.join("data", "cache_ia"))
+VALIDADE_CACHE_RESPOSTAS_HORAS = float(os.environ.get("LAUDOS_CACHE_IA_TTL_HORAS", str(24 * 30)))
+LIMITE_CACHE_RESPOSTAS_MB = int(os.environ.get("LAUDOS_CACHE_IA_MB", "64"))
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS respostas (
+    chave TEXT PRIMARY KEY,
+    resposta TEXT NOT NULL,
+    tamanho INTEGER NOT NULL,
+    criada_em REAL NOT NULL,
+    ultimo_acesso REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (ultimo_acesso);
+CREATE INDEX IF NOT EXISTS idx_respostas_criacao ON respostas (criada_em);
+
+CREATE TABLE IF NOT EXISTS contadores (
+    nome TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO contadores (nome, valor) VALUES ('acertos', 0), ('falhas', 0);
+"""
+
+
+def chave_resposta(modelo, versao_prompt, mensagens):
+    """SHA-256 de (modelo, versão do template, mensagens enviadas): entradas iguais, mesma chave"""
+    conteudo = json.dumps([modelo, versao_prompt, mensagens], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+class CacheRespostas:
+    """Cache persistente das respostas do modelo, com validade (TTL) e remoção LRU por tamanho"""
+
+    def __init__(self, diretorio=DIRETORIO_CACHE_RESPOSTAS, validade_horas=VALIDADE_CACHE_RESPOSTAS_HORAS,
+                 limite_bytes=LIMITE_CACHE_RESPOSTAS_MB * 1024 * 1024):
+        self.validade_segundos = validade_horas * 3600
+        self.limite_bytes = limite_bytes
+        os.makedirs(diretorio, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(diretorio, "respostas.db"), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(ESQUEMA)
+
+    def _contar(self, nome):
+        self._conn.execute("UPDATE contadores SET valor = valor + 1 WHERE nome = ?", (nome,))
+
+    def obter(self, chave):
+        """Resposta guardada (dentro da validade) ou None"""
+        agora = time.time()
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT resposta FROM respostas WHERE chave = ? AND criada_em >= ?",
+                (chave, agora - self.validade_segundos)
+            ).fetchone()
+            if linha is None:
+                self._contar("falhas")
+                return None
+            self._conn.execute("UPDATE respostas SET ultimo_acesso = ? WHERE chave = ?", (agora, chave))
+            self._contar("acertos")
+            return linha[0]
+
+    def guardar(self, chave, resposta):
+        agora = time.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO respostas (chave, resposta, tamanho, criada_em, ultimo_acesso)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (chave, resposta, len(resposta.encode("utf-8")), agora, agora)
+            )
+            self._remover_excedente(agora)
+
+    def _remover_excedente(self, agora):
+        """Remove as respostas vencidas e, se ainda passar do limite, as menos usadas recentemente"""
+        self._conn.execute("DELETE FROM respostas WHERE criada_em < ?", (agora - self.validade_segundos,))
+        total = self._conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total <= self.limite_bytes:
+            return
+        for chave, tamanho in self._conn.execute(
+            "SELECT chave, tamanho FROM respostas ORDER BY ultimo_acesso"
+        ).fetchall():
+            if total <= self.limite_bytes:
+                break
+            self._conn.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+            total -= tamanho
+
+    def estatisticas(self):
+        """Acertos, falhas, taxa de acerto, número de respostas e bytes ocupados"""
+        with self._lock:
+            contadores = dict(self._conn.execute("SELECT nome, valor FROM contadores").fetchall())
+            entradas, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM respostas"
+            ).fetchone()
+        consultas = contadores["acertos"] + contadores["falhas"]
+        return {
+            "acertos": contadores["acertos"],
+            "falhas": contadores["falhas"],
+            "taxa_acerto": contadores["acertos"] / consultas if consultas else 0.0,
+            "entradas": entradas,
+            "bytes": total,
+        }
+
+
+_cache_respostas = None
+_lock_cache = threading.Lock()
+
+
+def obter_cache_respostas():
+    """Instância única do cache por processo"""
+    global _cache_respostas
+    with _lock_cache:
+        if _cache_respostas is None:
+            _cache_respostas = CacheRespostas()
+        return _cache_respostas
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+
+# Diretório e tamanho máximo do cache de texto extraído (configuráveis por variável de ambiente)
+DIRETORIO_CACHE_TEXTO = os.environ.get("LAUDOS_CACHE_TEXTO_DIR", os.path.join("data", "cache_texto"))
+LIMITE_CACHE_TEXTO_MB = int(os.environ.get("LAUDOS_CACHE_TEXTO_MB", "512"))
+
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    sha256 TEXT PRIMARY KEY,
+    tamanho INTEGER NOT NULL,
+    offsets TEXT NOT NULL,
+    ultimo_acesso REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entradas_acesso ON entradas (ultimo_acesso);
+
+CREATE TABLE IF NOT EXISTS contadores (
+    nome TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO contadores (nome, valor) VALUES ('acertos', 0), ('falhas', 0), ('incrementais', 0);
+"""
+
+# Colunas acrescentadas depois da primeira versão do índice
+COLUNAS_ADICIONAIS = {
+    "hashes_paginas": "TEXT",
+    "primeira_pagina": "TEXT",
+    "campos": "TEXT",
+}
+
+
+def hash_pdf(origem):
+    """SHA-256 do conteúdo do PDF (caminho, buffer ou arquivo enviado), sem copiá-lo para a memória"""
+    sha = hashlib.sha256()
+    if isinstance(origem, (str, os.PathLike)):
+        with open(origem, "rb") as arquivo:
+            for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_HASH), b""):
+                sha.update(bloco)
+    elif hasattr(origem, "getbuffer"):
+        with origem.getbuffer() as buffer:
+            sha.update(buffer)
+    elif hasattr(origem, "fileno"):
+        with mmap.mmap(origem.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            sha.update(mapa)
+    else:
+        sha.update(origem)
+    return sha.hexdigest()
+
+
+class CacheTexto:
+    """Cache em disco do texto extraído de PDFs, endereçado pelo SHA-256 do arquivo (LRU por tamanho)"""
+
+    def __init__(self, diretorio=DIRETORIO_CACHE_TEXTO, limite_bytes=LIMITE_CACHE_TEXTO_MB * 1024 * 1024):
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        os.makedirs(diretorio, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(diretorio, "indice.db"), check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(ESQUEMA)
+            existentes = {linha[1] for linha in self._conn.execute("PRAGMA table_info(entradas)")}
+            for coluna, tipo in COLUNAS_ADICIONAIS.items():
+                if coluna not in existentes:
+                    self._conn.execute(f"ALTER TABLE entradas ADD COLUMN {coluna} {tipo}")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entradas_primeira ON entradas (primeira_pagina)")
+
+    def _caminho(self, sha256):
+        return os.path.join(self.diretorio, f"{sha256}.txt")
+
+    def _contar(self, nome):
+        self._conn.execute("UPDATE contadores SET valor = valor + 1 WHERE nome = ?", (nome,))
+
+    def contem(self, sha256):
+        """Indica se o documento está no cache, sem ler o texto nem contar acerto ou falha"""
+        with self._lock:
+            linha = self._conn.execute("SELECT 1 FROM entradas WHERE sha256 = ?", (sha256,)).fetchone()
+        return linha is not None and os.path.exists(self._caminho(sha256))
+
+    def obter(self, sha256):
+        """Retorna (texto, offsets) ou None; offsets[i] é a posição onde começa a página i"""
+        with self._lock:
+            linha = self._conn.execute("SELECT offsets FROM entradas WHERE sha256 = ?", (sha256,)).fetchone()
+            texto = None
+            if linha is not None:
+                try:
+                    with open(self._caminho(sha256), "r", encoding="utf-8", newline="") as arquivo:
+                        texto = arquivo.read()
+                except FileNotFoundError:
+                    self._conn.execute("DELETE FROM entradas WHERE sha256 = ?", (sha256,))
+            if texto is None:
+                self._contar("falhas")
+                return None
+            self._conn.execute("UPDATE entradas SET ultimo_acesso = ? WHERE sha256 = ?", (time.time(), sha256))
+            self._contar("acertos")
+            return texto, json.loads(linha[0])
+
+    def buscar_prefixo(self, hashes_paginas):
+        """Procura a versão em cache que compartilha o maior prefixo de páginas com o documento.
+
+        Retorna (texto, offsets, páginas em comum, campos estruturados ou None) ou None.
+        """
+        if not hashes_paginas:
+            return None
+        with self._lock:
+            candidatos = self._conn.execute(
+                "SELECT sha256, offsets, hashes_paginas, campos FROM entradas WHERE primeira_pagina = ?",
+                (hashes_paginas[0],)
+            ).fetchall()
+            melhor = None
+            for sha256, offsets, hashes_anteriores, campos in candidatos:
+                comuns = 0
+                for atual, anterior in zip(hashes_paginas, json.loads(hashes_anteriores)):
+                    if atual != anterior:
+                        break
+                    comuns += 1
+                if melhor is None or comuns > melhor[2]:
+                    melhor = (sha256, offsets, comuns, campos)
+            if melhor is None:
+                return None
+            try:
+                with open(self._caminho(melhor[0]), "r", encoding="utf-8", newline="") as arquivo:
+                    texto = arquivo.read()
+            except FileNotFoundError:
+                return None
+            self._contar("incrementais")
+            return texto, json.loads(melhor[1]), melhor[2], json.loads(melhor[3]) if melhor[3] else None
+
+    def obter_campos(self, sha256):
+        """Campos estruturados já extraídos do documento, ou None"""
+        with self._lock:
+            linha = self._conn.execute("SELECT campos FROM entradas WHERE sha256 = ?", (sha256,)).fetchone()
+        return json.loads(linha[0]) if linha and linha[0] else None
+
+    def guardar_campos(self, sha256, campos):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entradas SET campos = ? WHERE sha256 = ?",
+                (json.dumps(campos, ensure_ascii=False), sha256)
+            )
+
+    def guardar(self, sha256, paginas, hashes_paginas=None, campos=None):
+        """Grava o texto das páginas (com a impressão digital de cada uma e os campos) e retorna (texto, offsets)"""
+        offsets = [0]
+        for pagina in paginas:
+            offsets.append(offsets[-1] + len(pagina))
+        texto = "".join(paginas)
+
+        # Grava num arquivo temporário e renomeia, para que leitores nunca vejam um arquivo parcial
+        caminho = self._caminho(sha256)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, "w", encoding="utf-8", newline="") as arquivo:
+            arquivo.write(texto)
+        os.replace(temporario, caminho)
+
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO entradas
+                    (sha256, tamanho, offsets, ultimo_acesso, hashes_paginas, primeira_pagina, campos)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (sha256, os.path.getsize(caminho), json.dumps(offsets), time.time(),
+                 json.dumps(hashes_paginas) if hashes_paginas else None,
+                 hashes_paginas[0] if hashes_paginas else None,
+                 json.dumps(campos, ensure_ascii=False) if campos is not None else None)
+            )
+            self._remover_excedente()
+        return texto, offsets
+
+    def _remover_excedente(self):
+        """Remove as entradas menos usadas recentemente até caber no limite"""
+        total = self._conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()[0]
+        if total <= self.limite_bytes:
+            return
+        for sha256, tamanho in self._conn.execute(
+            "SELECT sha256, tamanho FROM entradas ORDER BY ultimo_acesso"
+        ).fetchall():
+            if total <= self.limite_bytes:
+                break
+            self._conn.execute("DELETE FROM entradas WHERE sha256 = ?", (sha256,))
+            try:
+                os.remove(self._caminho(sha256))
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+
+    def estatisticas(self):
+        """Acertos, falhas, extrações incrementais, taxa de acerto, número de entradas e bytes ocupados"""
+        with self._lock:
+            contadores = dict(self._conn.execute("SELECT nome, valor FROM contadores").fetchall())
+            entradas, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM entradas"
+            ).fetchone()
+        consultas = contadores["acertos"] + contadores["falhas"]
+        return {
+            "acertos": contadores["acertos"],
+            "falhas": contadores["falhas"],
+            "incrementais": contadores["incrementais"],
+            "taxa_acerto": contadores["acertos"] / consultas if consultas else 0.0,
+            "entradas": entradas,
+            "bytes": total,
+        }
+
+
+_cache_texto = None
+_lock_cache = threading.Lock()
+
+
+def obter_cache_texto():
+    """Instância única do cache por processo"""
+    global _cache_texto
+    with _lock_cache:
+        if _cache_texto is None:
+            _cache_texto = CacheTexto()
+        return _cache_texto
@@ -0,0 +1,129 @@
+import re
+
+# Padrões por campo, aplicados ao texto da página em minúsculas. Cada padrão tem um grupo
+# de captura (o valor) e começa por um literal, o que deixa o re buscar direto pela palavra-chave;
+# o limite de palavra antes dela é conferido em _ocorrencias.
+DATA = r"(\d{2}[/.-]\d{2}[/.-]\d{4})"
+PADROES_CAMPOS = {
+    "cpf": [
+        r"(\d{3}\.\d{3}\.\d{3}-\d{2})\b",
+    ],
+    "nb": [
+        r"nb\b\s*(?:n[º°o]\.?)?\s*[:\-]?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d)\b",
+        r"benef[ií]cio\s+(?:n[º°o]\.?|n[úu]mero)\s*[:\-]?\s*(\d{3}\.?\d{3}\.?\d{3}-?\d)\b",
+    ],
+    "der": [
+        r"der\b\s*(?:em|:|-|=)?\s*" + DATA,
+        r"data\s+de\s+entrada\s+do\s+requerimento\s*(?:em|:|-)?\s*" + DATA,
+    ],
+    "rg": [
+        r"rg\b\s*(?:n[º°o]\.?)?\s*[:\-]?\s*(\d[\d.\-]{4,14}\d)\b",
+        r"carteira\s+de\s+identidade\s*(?:n[º°o]\.?)?\s*[:\-]?\s*(\d[\d.\-]{4,14}\d)\b",
+    ],
+    "data_nascimento": [
+        r"nascid[oa]\s+em\s*:?\s*" + DATA,
+        r"data\s+de\s+nascimento\s*:?\s*" + DATA,
+        r"dn\s*:\s*" + DATA,
+    ],
+    "cid": [
+        r"cid(?:[\s-]?10)?\s*[:\-]?\s*([a-tv-z]\d{2}(?:\.\d{1,2})?)\b",
+    ],
+    "profissao": [
+        r"profiss[ãa]o\s*:\s*([^\W\d_][^\n,;:.]{2,40}?)\s*(?=[\n,;.]|$)",
+    ],
+}
+
+# Campos que acumulam todas as ocorrências distintas (os demais guardam a primeira)
+CAMPOS_MULTIPLOS = {"cid"}
+
+# Limite de ocorrências acumuladas por campo múltiplo
+MAX_OCORRENCIAS = 20
+
+EXPRESSOES_CAMPOS = {
+    campo: [re.compile(padrao, re.MULTILINE) for padrao in padroes]
+    for campo, padroes in PADROES_CAMPOS.items()
+}
+
+
+def _ocorrencias(expressao, texto):
+    """Ocorrências do padrão que começam no início de uma palavra ("der" não casa em "poder")"""
+    for ocorrencia in expressao.finditer(texto):
+        inicio = ocorrencia.start()
+        if inicio == 0 or not texto[inicio - 1].isalnum():
+            yield ocorrencia
+
+
+def _normalizar(campo, valor):
+    valor = valor.strip()
+    if campo in ("der", "data_nascimento"):
+        dia, mes, ano = re.split(r"[/.-]", valor)
+        return f"{ano}-{mes}-{dia}"
+    if campo == "cid":
+        return valor.upper()
+    if campo == "profissao":
+        return valor.strip().capitalize()
+    return valor
+
+
+class ExtratorCampos:
+    """Acumula os campos estruturados do processo página a página (número da página a partir de 0)"""
+
+    def __init__(self, campos_anteriores=None, ate_pagina=None):
+        # campos_anteriores: resultado de uma versão anterior do mesmo PDF; só valem as
+        # ocorrências nas páginas antes de ate_pagina (prefixo comum)
+        self.campos = {}
+        for campo, valor in (campos_anteriores or {}).items():
+            if campo in CAMPOS_MULTIPLOS:
+                mantidos = [item for item in valor if ate_pagina is None or item["pagina"] < ate_pagina]
+                if mantidos:
+                    self.campos[campo] = mantidos
+            elif ate_pagina is None or valor["pagina"] < ate_pagina:
+                self.campos[campo] = valor
+
+    def processar_pagina(self, numero, texto):
+        baixo = texto.lower()
+        for campo, expressoes in EXPRESSOES_CAMPOS.items():
+            if campo in CAMPOS_MULTIPLOS:
+                lista = self.campos.setdefault(campo, [])
+                for expressao in expressoes:
+                    for ocorrencia in _ocorrencias(expressao, baixo):
+                        valor = _normalizar(campo, ocorrencia.group(1))
+                        if len(lista) < MAX_OCORRENCIAS and all(item["valor"] != valor for item in lista):
+                            lista.append({"valor": valor, "pagina": numero})
+                if not lista:
+                    del self.campos[campo]
+            elif campo not in self.campos:
+                # Campo já encontrado não é mais procurado; entre os padrões, vale o que aparece primeiro
+                primeira = None
+                for expressao in expressoes:
+                    ocorrencia = next(_ocorrencias(expressao, baixo), None)
+                    if ocorrencia is not None and (primeira is None or ocorrencia.start() < primeira.start()):
+                        primeira = ocorrencia
+                if primeira is not None:
+                    self.campos[campo] = {"valor": _normalizar(campo, primeira.group(1)), "pagina": numero}
+
+
+def extrair_campos(paginas, campos_anteriores=None, ate_pagina=None):
+    """Percorre (número, texto) das páginas uma vez e retorna os campos com a página de origem"""
+    extrator = ExtratorCampos(campos_anteriores, ate_pagina)
+    for numero, texto in paginas:
+        extrator.processar_pagina(numero, texto)
+    return extrator.campos
+
+
+def campos_para_processo(campos):
+    """Converte o resultado da extração nos campos usados pelo processo e pelas telas de laudo.
+
+    campos_fonte registra a página (a partir de 1) de onde veio cada valor.
+    """
+    processo = {}
+    fontes = {}
+    for campo, valor in campos.items():
+        if campo in CAMPOS_MULTIPLOS:
+            processo[campo] = ", ".join(item["valor"] for item in valor)
+            fontes[campo] = [item["pagina"] + 1 for item in valor]
+        else:
+            processo[campo] = valor["valor"]
+            fontes[campo] = valor["pagina"] + 1
+    processo["campos_fonte"] = fontes
+    return processo
@@ -0,0 +1,210 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import unicodedata
+from bisect import bisect_left
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock entre threads do mesmo processo
+    fcntl = None
+
+# Arquivo do catálogo de patologias (configurável por variável de ambiente)
+CAMINHO_PATOLOGIAS = os.environ.get("LAUDOS_PATOLOGIAS_PATH", os.path.join("data", "patologias.json"))
+
+# Tempo (s) que as inclusões esperam antes de serem gravadas juntas no arquivo
+ATRASO_GRAVACAO = float(os.environ.get("LAUDOS_PATOLOGIAS_ATRASO", "1.0"))
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos, para comparação na busca"""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).lower().strip()
+
+
+def trigramas(texto):
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _chave(patologia):
+    return (normalizar(patologia.get("nome")), normalizar(patologia.get("cid")))
+
+
+class CatalogoPatologias:
+    """Catálogo de patologias carregado uma vez por processo e recarregado quando o arquivo muda.
+
+    A busca usa um índice de prefixos (nome e CID) e de trigramas do nome. As inclusões ficam
+    pendentes em memória e são gravadas em lote, de forma atômica e com lock do arquivo.
+    """
+
+    def __init__(self, caminho=CAMINHO_PATOLOGIAS, atraso_gravacao=ATRASO_GRAVACAO):
+        self.caminho = caminho
+        self.atraso_gravacao = atraso_gravacao
+        self._lock = threading.RLock()
+        self._carregado = False
+        self._assinatura = None
+        self._patologias = []
+        self._pendentes = []
+        self._temporizador = None
+        self._indexar([])
+
+    # ------------------------------------------------------------ leitura
+
+    def _assinatura_arquivo(self):
+        try:
+            info = os.stat(self.caminho)
+        except FileNotFoundError:
+            return None
+        return info.st_mtime_ns, info.st_size
+
+    def _ler_arquivo(self):
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as arquivo:
+                return json.load(arquivo)
+        except FileNotFoundError:
+            return []
+
+    def _atualizar(self):
+        """Recarrega o arquivo se a data de modificação ou o tamanho mudaram desde a última leitura"""
+        assinatura = self._assinatura_arquivo()
+        if self._carregado and assinatura == self._assinatura:
+            return
+        patologias = self._ler_arquivo()
+        self._carregado = True
+        self._assinatura = assinatura
+        self._indexar(self._mesclar(patologias, self._pendentes))
+
+    @staticmethod
+    def _mesclar(patologias, novas):
+        chaves = {_chave(p) for p in patologias}
+        mescladas = list(patologias)
+        for patologia in novas:
+            if _chave(patologia) not in chaves:
+                chaves.add(_chave(patologia))
+                mescladas.append(patologia)
+        return mescladas
+
+    def _indexar(self, patologias):
+        self._patologias = patologias
+        # Listas ordenadas de (termo normalizado, posição) para busca por prefixo com bisect
+        self._nomes = sorted((normalizar(p.get("nome")), i) for i, p in enumerate(patologias))
+        self._cids = sorted((normalizar(p.get("cid")), i) for i, p in enumerate(patologias))
+        self._trigramas = {}
+        for i, patologia in enumerate(patologias):
+            for trigrama in trigramas(normalizar(patologia.get("nome"))):
+                self._trigramas.setdefault(trigrama, []).append(i)
+
+    def listar(self):
+        with self._lock:
+            self._atualizar()
+            return list(self._patologias)
+
+    @staticmethod
+    def _prefixo(ordenados, termo):
+        inicio = bisect_left(ordenados, (termo,))
+        for chave, i in ordenados[inicio:]:
+            if not chave.startswith(termo):
+                break
+            yield i
+
+    def buscar(self, consulta, limite=20):
+        """Patologias cujo nome ou CID começa pela consulta, seguidas das mais parecidas por trigramas"""
+        termo = normalizar(consulta)
+        with self._lock:
+            self._atualizar()
+            if not termo:
+                return self._patologias[:limite]
+            encontrados = []
+            vistos = set()
+            for ordenados in (self._cids, self._nomes):
+                for i in self._prefixo(ordenados, termo):
+                    if i not in vistos:
+                        vistos.add(i)
+                        encontrados.append(i)
+            if len(encontrados) < limite and len(termo) >= 3:
+                consulta_trigramas = trigramas(termo)
+                pontos = {}
+                for trigrama in consulta_trigramas:
+                    for i in self._trigramas.get(trigrama, ()):
+                        if i not in vistos:
+                            pontos[i] = pontos.get(i, 0) + 1
+                # Exige ao menos metade dos trigramas da consulta em comum
+                minimo = max(1, len(consulta_trigramas) // 2)
+                semelhantes = sorted(
+                    (i for i, n in pontos.items() if n >= minimo),
+                    key=lambda i: (-pontos[i], normalizar(self._patologias[i].get("nome")))
+                )
+                encontrados.extend(semelhantes)
+            return [self._patologias[i] for i in encontrados[:limite]]
+
+    # ------------------------------------------------------------ escrita
+
+    def adicionar(self, nome, cid, definicao=""):
+        """Inclui a patologia no catálogo; a gravação em disco acontece em lote logo depois"""
+        patologia = {"nome": nome.strip(), "cid": cid.strip().upper(), "definicao": definicao}
+        with self._lock:
+            self._atualizar()
+            if any(_chave(p) == _chave(patologia) for p in self._patologias):
+                return False
+            self._pendentes.append(patologia)
+            self._indexar(self._patologias + [patologia])
+            if self._temporizador is None:
+                self._temporizador = threading.Timer(self.atraso_gravacao, self.gravar_pendentes)
+                self._temporizador.daemon = True
+                self._temporizador.start()
+        return True
+
+    @contextmanager
+    def _lock_arquivo(self):
+        """Lock exclusivo entre processos (arquivo .lock ao lado do catálogo)"""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.caminho}.lock", "a") as arquivo:
+            fcntl.flock(arquivo, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+    def gravar_pendentes(self):
+        """Relê o arquivo, acrescenta as inclusões pendentes e grava tudo num arquivo temporário + rename"""
+        with self._lock:
+            self._temporizador = None
+            if not self._pendentes:
+                return
+            diretorio = os.path.dirname(os.path.abspath(self.caminho))
+            os.makedirs(diretorio, exist_ok=True)
+            with self._lock_arquivo():
+                # Outra sessão pode ter gravado depois da nossa última leitura
+                patologias = self._mesclar(self._ler_arquivo(), self._pendentes)
+                descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+                try:
+                    with os.fdopen(descritor, "w", encoding="utf-8") as arquivo:
+                        json.dump(patologias, arquivo, ensure_ascii=False, indent=2)
+                    os.replace(temporario, self.caminho)
+                except Exception:
+                    if os.path.exists(temporario):
+                        os.remove(temporario)
+                    raise
+            self._pendentes = []
+            self._assinatura = self._assinatura_arquivo()
+            self._indexar(patologias)
+
+
+_catalogo = None
+_lock_catalogo = threading.Lock()
+
+
+def obter_catalogo_patologias():
+    """Instância única do catálogo por processo (as pendências são gravadas ao encerrar)"""
+    global _catalogo
+    with _lock_catalogo:
+        if _catalogo is None:
+            _catalogo = CatalogoPatologias()
+            atexit.register(_catalogo.gravar_pendentes)
+        return _catalogo
@@ -0,0 +1,188 @@
+import csv
+import io
+import logging
+import os
+import threading
+import zipfile
+from array import array
+from bisect import bisect_left, bisect_right
+
+from catalogo_patologias import normalizar
+
+# Tabela CID-10 (formato do DATASUS: CID-10-SUBCATEGORIAS.CSV, separador ";", colunas SUBCAT e DESCRICAO)
+CAMINHO_CID10 = os.environ.get("LAUDOS_CID10_PATH", os.path.join("data", "cid10.csv"))
+
+# Pacote oficial da CID-10 no DATASUS (CSVs de categorias e subcategorias, em Latin-1)
+URL_CID10_DATASUS = os.environ.get("LAUDOS_CID10_URL", "http://www2.datasus.gov.br/cid10/V2008/downloads/CID10CSV.zip")
+ARQUIVOS_CID10_DATASUS = ("CID-10-CATEGORIAS.CSV", "CID-10-SUBCATEGORIAS.CSV")
+
+# A tabela completa tem ~14.500 códigos (categorias e subcategorias); menos que isso é uma tabela parcial,
+# em que a busca deixa de achar a maior parte dos códigos reais
+MINIMO_CODIGOS_CID10 = int(os.environ.get("LAUDOS_CID10_MINIMO", "14000"))
+
+
+def formatar_codigo(codigo):
+    """'M545' -> 'M54.5' (categorias de três caracteres ficam como estão)"""
+    codigo = codigo.strip().upper().replace(".", "")
+    return f"{codigo[:3]}.{codigo[3:]}" if len(codigo) > 3 else codigo
+
+
+def _ler_csv_cid10(bruto):
+    """(código, descrição) de um CSV da CID-10 (colunas SUBCAT ou CAT e DESCRICAO), em UTF-8 ou Latin-1"""
+    try:
+        conteudo = bruto.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        conteudo = bruto.decode("latin-1")
+    leitor = csv.reader(io.StringIO(conteudo), delimiter=";")
+    cabecalho = [coluna.strip().upper() for coluna in next(leitor, [])]
+    coluna_codigo = next((cabecalho.index(nome) for nome in ("SUBCAT", "CAT") if nome in cabecalho), 0)
+    coluna_descricao = cabecalho.index("DESCRICAO") if "DESCRICAO" in cabecalho else 1
+    for linha in leitor:
+        if len(linha) > max(coluna_codigo, coluna_descricao) and linha[coluna_codigo].strip():
+            yield formatar_codigo(linha[coluna_codigo]), linha[coluna_descricao].strip()
+
+
+def ler_tabela_cid10(caminho=CAMINHO_CID10):
+    """Lê (código, descrição) da tabela; aceita UTF-8 ou Latin-1 (arquivos do DATASUS)"""
+    with open(caminho, "rb") as arquivo:
+        yield from _ler_csv_cid10(arquivo.read())
+
+
+def baixar_tabela_cid10(destino=CAMINHO_CID10, url=URL_CID10_DATASUS):
+    """Baixa a CID-10 do DATASUS e grava categorias e subcategorias num único CSV (SUBCAT;DESCRICAO, UTF-8).
+
+    Retorna a quantidade de códigos; uma tabela abaixo de MINIMO_CODIGOS_CID10 não é gravada.
+    """
+    from urllib.request import urlopen
+
+    with urlopen(url, timeout=60) as resposta:
+        pacote = zipfile.ZipFile(io.BytesIO(resposta.read()))
+    # Os nomes dentro do ZIP variam de maiúsculas entre as versões publicadas
+    nomes = {nome.rsplit("/", 1)[-1].upper(): nome for nome in pacote.namelist()}
+    entradas = {}
+    for arquivo in ARQUIVOS_CID10_DATASUS:
+        entradas.update(_ler_csv_cid10(pacote.read(nomes[arquivo])))
+    if len(entradas) < MINIMO_CODIGOS_CID10:
+        raise ValueError(f"Tabela CID-10 baixada tem só {len(entradas)} códigos (mínimo {MINIMO_CODIGOS_CID10})")
+    temporario = destino + ".tmp"
+    with open(temporario, "w", encoding="utf-8", newline="") as arquivo:
+        escritor = csv.writer(arquivo, delimiter=";")
+        escritor.writerow(("SUBCAT", "DESCRICAO"))
+        escritor.writerows((codigo.replace(".", ""), descricao) for codigo, descricao in sorted(entradas.items()))
+    os.replace(temporario, destino)
+    return len(entradas)
+
+
+class IndiceCID10:
+    """Índice compacto da CID-10 para autocompletar, montado sobre listas e arrays ordenados.
+
+    - códigos ordenados (sem ponto) para busca por prefixo de código com bisect;
+    - palavras das descrições (sem acento) ordenadas, com a entrada de cada uma num array;
+    - todas as descrições normalizadas numa única string, com o início de cada uma num array,
+      para a busca por trecho (str.find) sem percorrer objeto por objeto.
+    """
+
+    def __init__(self, entradas):
+        entradas = sorted(entradas)
+        self.codigos = [codigo for codigo, _ in entradas]
+        self.descricoes = [descricao for _, descricao in entradas]
+        self._codigos_busca = [codigo.replace(".", "").lower() for codigo in self.codigos]
+
+        palavras = sorted(
+            (palavra, i)
+            for i, descricao in enumerate(self.descricoes)
+            for palavra in set(normalizar(descricao).split())
+        )
+        self._palavras = [palavra for palavra, _ in palavras]
+        self._palavras_entrada = array("I", (i for _, i in palavras))
+
+        normalizadas = [normalizar(descricao) for descricao in self.descricoes]
+        self._inicios = array("I")
+        posicao = 0
+        for texto in normalizadas:
+            self._inicios.append(posicao)
+            posicao += len(texto) + 1
+        self._texto = "\n".join(normalizadas)
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def _por_codigo(self, termo):
+        termo = termo.replace(".", "")
+        inicio = bisect_left(self._codigos_busca, termo)
+        for i in range(inicio, len(self._codigos_busca)):
+            if not self._codigos_busca[i].startswith(termo):
+                break
+            yield i
+
+    def _por_palavra(self, termo):
+        inicio = bisect_left(self._palavras, termo)
+        fim = bisect_right(self._palavras, termo + "\uffff")
+        # Em ordem de palavra e depois de código; sem copiar a faixa do array
+        return (self._palavras_entrada[j] for j in range(inicio, fim))
+
+    def _por_trecho(self, termo):
+        posicao = self._texto.find(termo)
+        while posicao != -1:
+            i = bisect_right(self._inicios, posicao) - 1
+            yield i
+            # Continua a partir da próxima descrição
+            proxima = self._inicios[i + 1] if i + 1 < len(self._inicios) else len(self._texto)
+            posicao = self._texto.find(termo, proxima)
+
+    def buscar(self, consulta, limite=10):
+        """Até `limite` entradas (código, descrição), sem distinção de acentos.
+
+        Ordem: prefixo do código, palavras da descrição que começam pela consulta e, por fim,
+        descrições que contêm a consulta.
+        """
+        termo = normalizar(consulta)
+        if not termo:
+            return []
+        fontes = [self._por_codigo(termo)]
+        if " " not in termo:
+            fontes.append(self._por_palavra(termo))
+        if len(termo) >= 3:
+            fontes.append(self._por_trecho(termo))
+        encontrados = {}  # dict preserva a ordem de inclusão
+        for fonte in fontes:
+            for i in fonte:
+                encontrados.setdefault(i, None)
+                if len(encontrados) >= limite:
+                    break
+            if len(encontrados) >= limite:
+                break
+        return [(self.codigos[i], self.descricoes[i]) for i in encontrados]
+
+
+_indice = None
+_lock_indice = threading.Lock()
+
+
+def obter_indice_cid10():
+    """Índice da CID-10 montado uma vez por processo (vazio se a tabela não existir).
+
+    Uma tabela com menos de MINIMO_CODIGOS_CID10 códigos é registrada como erro ao carregar;
+    use tabela_cid10_completa() para avisar na tela.
+    """
+    global _indice
+    with _lock_indice:
+        if _indice is None:
+            try:
+                _indice = IndiceCID10(ler_tabela_cid10())
+            except FileNotFoundError:
+                _indice = IndiceCID10([])
+            if len(_indice) < MINIMO_CODIGOS_CID10:
+                logging.getLogger("laudos.cid10").error(
+                    "Tabela CID-10 incompleta em %s: %d códigos (mínimo %d); rode `python cid10.py` para baixar a do DATASUS",
+                    CAMINHO_CID10, len(_indice), MINIMO_CODIGOS_CID10
+                )
+        return _indice
+
+
+def tabela_cid10_completa():
+    return len(obter_indice_cid10()) >= MINIMO_CODIGOS_CID10
+
+
+if __name__ == "__main__":
+    print(f"{baixar_tabela_cid10()} códigos gravados em {CAMINHO_CID10}")
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import random
+import time
+from functools import lru_cache
+
+from cache_respostas import chave_resposta
+
+# Modelo e limites dos pedidos ao modelo de linguagem (configuráveis por variável de ambiente)
+MODELO_REDACAO = os.environ.get("LAUDOS_MODELO_LLM", "gpt-4o-mini")
+MAX_REQUISICOES_SIMULTANEAS = int(os.environ.get("LAUDOS_LLM_SIMULTANEAS", "8"))
+TIMEOUT_REQUISICAO = float(os.environ.get("LAUDOS_LLM_TIMEOUT", "60"))
+MAX_TENTATIVAS = int(os.environ.get("LAUDOS_LLM_TENTATIVAS", "4"))
+ESPERA_INICIAL = 1.0  # segundos; dobra a cada nova tentativa
+
+
+class RespostaVazia(ValueError):
+    """O modelo respondeu sem texto (ex.: conteúdo filtrado); repetir o mesmo pedido não adianta"""
+
+
+@lru_cache(maxsize=None)
+def erros_transitorios():
+    """Erros transitórios que justificam nova tentativa (o openai só é importado quando há pedidos ao modelo)"""
+    import openai
+    return (
+        asyncio.TimeoutError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+
+def criar_cliente(api_key=None, base_url=None):
+    """Cliente assíncrono único: o pool de conexões HTTP é reaproveitado por todos os pedidos do lote.
+
+    As novas tentativas são feitas por completar, por isso o cliente não repete pedidos.
+    """
+    import openai
+    return openai.AsyncOpenAI(
+        api_key=api_key or os.environ.get("OPENAI_API_KEY"),
+        base_url=base_url or os.environ.get("OPENAI_BASE_URL"),
+        timeout=TIMEOUT_REQUISICAO,
+        max_retries=0,
+    )
+
+
+async def completar(cliente, semaforo, mensagens, modelo=MODELO_REDACAO, timeout=TIMEOUT_REQUISICAO,
+                    max_tentativas=MAX_TENTATIVAS, cache=None, versao_prompt=None, max_tokens=None):
+    """Envia as mensagens ao modelo e retorna (texto, métricas).
+
+    Com cache, mensagens iguais (mesmo modelo e versão do template) voltam sem chamar o modelo.
+    Erros transitórios são repetidos com espera exponencial; o semáforo limita quantos pedidos
+    ficam em andamento ao mesmo tempo.
+    """
+    inicio = time.perf_counter()
+    chave = chave_resposta(modelo, versao_prompt, mensagens) if cache is not None else None
+    if chave is not None:
+        resposta = cache.obter(chave)
+        if resposta is not None:
+            duracao = time.perf_counter() - inicio
+            return resposta, {"latencia": duracao, "tempo_total": duracao, "tentativas": 1, "cache": True,
+                              "tokens_entrada": 0, "tokens_saida": 0}
+    opcoes = {"max_tokens": max_tokens} if max_tokens else {}
+    for tentativa in range(1, max_tentativas + 1):
+        try:
+            async with semaforo:
+                inicio_pedido = time.perf_counter()
+                resposta = await asyncio.wait_for(
+                    cliente.chat.completions.create(model=modelo, messages=mensagens, **opcoes),
+                    timeout=timeout,
+                )
+            fim = time.perf_counter()
+            uso = getattr(resposta, "usage", None)
+            escolha = resposta.choices[0] if resposta.choices else None
+            conteudo = escolha.message.content if escolha is not None else None
+            if not conteudo or not conteudo.strip():
+                # Falha definitiva: fica fora das novas tentativas e do cache
+                motivo = escolha.finish_reason if escolha is not None else "sem escolhas"
+                raise RespostaVazia(f"o modelo não retornou texto (finish_reason: {motivo})")
+            texto = conteudo.strip()
+            if chave is not None:
+                cache.guardar(chave, texto)
+            # latencia: só o pedido bem-sucedido; tempo_total: inclui a espera por vaga e as novas tentativas
+            return texto, {
+                "latencia": fim - inicio_pedido,
+                "tempo_total": fim - inicio,
+                "tentativas": tentativa,
+                "cache": False,
+                "tokens_entrada": getattr(uso, "prompt_tokens", 0) or 0,
+                "tokens_saida": getattr(uso, "completion_tokens", 0) or 0,
+            }
+        except erros_transitorios():
+            if tentativa == max_tentativas:
+                raise
+            # Espera fora do semáforo, para não segurar a vaga de outro pedido
+            await asyncio.sleep(ESPERA_INICIAL * 2 ** (tentativa - 1) * random.uniform(0.5, 1.5))
@@ -0,0 +1,54 @@
+import html
+import os
+import secrets
+import shutil
+import time
+from urllib.parse import quote
+
+# Pasta servida pelo Streamlit em app/static/ (server.enableStaticServing); os downloads ficam numa subpasta
+DIRETORIO_ESTATICO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIRETORIO_DOWNLOADS = os.path.join(DIRETORIO_ESTATICO, "downloads")
+
+# Tempo (min) que um arquivo publicado continua disponível antes de ser apagado
+VALIDADE_DOWNLOAD_MIN = int(os.environ.get("LAUDOS_DOWNLOAD_VALIDADE_MIN", "30"))
+
+# Maior arquivo que a rota estática do Streamlit aceita servir (MAX_APP_STATIC_FILE_SIZE)
+TAMANHO_MAXIMO_DOWNLOAD_MB = 200
+
+
+class DownloadGrandeDemais(ValueError):
+    """Arquivo maior do que a rota estática serve"""
+
+
+def limpar_downloads(validade_min=VALIDADE_DOWNLOAD_MIN):
+    """Apaga as pastas de download publicadas há mais tempo que a validade"""
+    if not os.path.isdir(DIRETORIO_DOWNLOADS):
+        return
+    corte = time.time() - validade_min * 60
+    for entrada in os.scandir(DIRETORIO_DOWNLOADS):
+        if entrada.is_dir() and entrada.stat().st_mtime < corte:
+            shutil.rmtree(entrada.path, ignore_errors=True)
+
+
+def reservar_diretorio_download():
+    """Cria uma pasta de nome secreto para um novo download (e aproveita para limpar as vencidas)"""
+    limpar_downloads()
+    diretorio = os.path.join(DIRETORIO_DOWNLOADS, secrets.token_urlsafe(16))
+    os.makedirs(diretorio)
+    return diretorio
+
+
+def link_download(caminho, nome_arquivo, rotulo):
+    """Link HTML para o arquivo publicado, baixado pela rota estática em blocos (sem passar pela sessão).
+
+    A rota serve tipos que não são imagem como text/plain; o atributo download faz o navegador salvar
+    o arquivo com o nome dado.
+    """
+    if os.path.getsize(caminho) > TAMANHO_MAXIMO_DOWNLOAD_MB * 1024 * 1024:
+        shutil.rmtree(os.path.dirname(caminho), ignore_errors=True)
+        raise DownloadGrandeDemais(f"O arquivo passa de {TAMANHO_MAXIMO_DOWNLOAD_MB} MB e não pode ser baixado pelo navegador.")
+    relativo = os.path.relpath(caminho, DIRETORIO_ESTATICO).replace(os.sep, "/")
+    return (
+        f'<a href="app/static/{quote(relativo)}" download="{html.escape(nome_arquivo)}" target="_self">'
+        f"{html.escape(rotulo)}</a>"
+    )
@@ -0,0 +1,104 @@
+import os
+import re
+import tempfile
+import time
+import zipfile
+
+from arquivos_processo import TAMANHO_BLOCO, caminho_blob
+from laudo_pdf import renderizar_laudo
+from utilidades import gerar_certidoes_ausencia
+
+# Arquivos maiores que isso vão para o ZIP sem compressão (PDFs já são comprimidos; assim a cópia é direta)
+LIMITE_COMPRESSAO_MB = float(os.environ.get("LAUDOS_ZIP_COMPRIMIR_ATE_MB", "4"))
+
+
+def _nome_seguro(texto):
+    return re.sub(r"[^\w.-]+", "_", str(texto or "")).strip("_") or "sem_numero"
+
+
+def documentos_do_dia(processos, incluir_processos=False):
+    """Documentos de um dia/local a exportar, gerados um por vez: (nome no ZIP, bytes ou caminho em disco).
+
+    - laudo de cada processo concluído (o PDF gravado ao finalizar ou, se não houver, renderizado agora);
+    - certidão de cada processo ausente;
+    - com incluir_processos, o PDF do processo anexado.
+    """
+    for processo in processos:
+        numero = _nome_seguro(processo.get("numero_processo"))
+        prefixo = f"{_nome_seguro(processo.get('horario'))}_{numero}"
+        if processo.get("situacao") == "Concluído":
+            if processo.get("laudo_handle") and os.path.exists(caminho_blob(processo["laudo_handle"])):
+                yield f"laudos/{prefixo}_laudo.pdf", caminho_blob(processo["laudo_handle"])
+            else:
+                yield f"laudos/{prefixo}_laudo.pdf", renderizar_laudo(processo)
+        elif processo.get("situacao") == "Ausente":
+            (_, certidao), = gerar_certidoes_ausencia([processo], mesclar=False)
+            yield f"certidoes/{prefixo}_certidao_ausencia.pdf", certidao
+        if incluir_processos and processo.get("pdf_handle") and os.path.exists(caminho_blob(processo["pdf_handle"])):
+            yield f"processos/{prefixo}_processo.pdf", caminho_blob(processo["pdf_handle"])
+
+
+class _Saida:
+    """Destino sem seek do ZipFile: guarda só o que foi escrito desde o último esvaziar()"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def pendente(self):
+        """Entrega (uma vez) o que foi escrito desde a última chamada"""
+        if self._partes:
+            dados = b"".join(self._partes)
+            self._partes = []
+            yield dados
+
+
+def fluxo_zip(documentos, limite_compressao=LIMITE_COMPRESSAO_MB * 1024 * 1024, tamanho_bloco=TAMANHO_BLOCO):
+    """Gera o ZIP em blocos de bytes à medida que os documentos são lidos.
+
+    documentos: (nome, bytes ou caminho) como em documentos_do_dia. A memória usada fica em torno de
+    um bloco (mais o documento gerado em memória da vez), qualquer que seja o tamanho total.
+    """
+    saida = _Saida()
+    data_hora = time.localtime()[:6]
+    with zipfile.ZipFile(saida, "w") as arquivo_zip:
+        for nome, conteudo in documentos:
+            tamanho = len(conteudo) if isinstance(conteudo, bytes) else os.path.getsize(conteudo)
+            info = zipfile.ZipInfo(nome, date_time=data_hora)
+            info.file_size = tamanho
+            info.compress_type = zipfile.ZIP_STORED if tamanho > limite_compressao else zipfile.ZIP_DEFLATED
+            with arquivo_zip.open(info, "w") as destino:
+                if isinstance(conteudo, bytes):
+                    destino.write(conteudo)
+                else:
+                    with open(conteudo, "rb") as origem:
+                        for bloco in iter(lambda: origem.read(tamanho_bloco), b""):
+                            destino.write(bloco)
+                            yield from saida.pendente()
+            yield from saida.pendente()
+    # Diretório central, escrito ao fechar o ZIP
+    yield from saida.pendente()
+
+
+def gravar_pacote_dia(processos, incluir_processos=False, diretorio="temp"):
+    """Grava o ZIP do dia num arquivo próprio (nome único) em blocos e retorna o caminho.
+
+    O ZIP fica pronto no disco antes do download (que começa ao fim da montagem) e é servido em blocos
+    pela rota estática (entrega_arquivos); em nenhum momento o pacote inteiro fica em memória.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, caminho = tempfile.mkstemp(dir=diretorio, prefix="pacote_dia_", suffix=".zip")
+    try:
+        with os.fdopen(descritor, "wb") as destino:
+            for bloco in fluxo_zip(documentos_do_dia(processos, incluir_processos)):
+                destino.write(bloco)
+    except Exception:
+        os.remove(caminho)
+        raise
+    return caminho
@@ -0,0 +1,74 @@
+import csv
+import importlib.util
+import io
+import os
+import tempfile
+
+from armazenamento import COLUNAS_HISTORICO
+
+# Linhas lidas do banco e gravadas por vez (a memória usada é a de um lote, qualquer que seja o histórico)
+TAMANHO_LOTE = int(os.environ.get("LAUDOS_HISTORICO_LOTE", "5000"))
+
+# Formato -> (extensão, tipo MIME)
+FORMATOS = {
+    "csv": (".csv", "text/csv"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def formatos_disponiveis():
+    """CSV sempre; Parquet quando o pyarrow está instalado"""
+    # Só procura o pacote, sem importá-lo (o pyarrow é carregado ao gravar)
+    if importlib.util.find_spec("pyarrow") is None:
+        return ["csv"]
+    return list(FORMATOS)
+
+
+def gravar_csv(lotes, destino):
+    """CSV com ponto e vírgula e BOM (abre direto no Excel em português), escrito lote a lote"""
+    texto = io.TextIOWrapper(destino, encoding="utf-8-sig", newline="")
+    escritor = csv.writer(texto, delimiter=";")
+    escritor.writerow(COLUNAS_HISTORICO)
+    for lote in lotes:
+        escritor.writerows(lote)
+    texto.flush()
+    texto.detach()  # o arquivo de destino é fechado por quem o abriu
+
+
+def _esquema_parquet():
+    import pyarrow as pa
+
+    tipos = {"data": pa.date32(), "processo_id": pa.int64()}
+    return pa.schema([(coluna, tipos.get(coluna, pa.string())) for coluna in COLUNAS_HISTORICO])
+
+
+def gravar_parquet(lotes, destino):
+    """Parquet com um grupo de linhas por lote (colunas montadas direto dos lotes, sem pandas)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = _esquema_parquet()
+    with pq.ParquetWriter(destino, esquema, compression="zstd") as escritor:
+        for lote in lotes:
+            # Transpõe o lote (linhas -> colunas); as datas ISO são convertidas pelo próprio pyarrow
+            colunas = [
+                pa.array(valores, pa.string()).cast(campo.type) if campo.type == pa.date32()
+                else pa.array(valores, campo.type)
+                for valores, campo in zip(zip(*lote), esquema)
+            ]
+            escritor.write_batch(pa.RecordBatch.from_arrays(colunas, schema=esquema))
+
+
+def gravar_historico(repo, formato="csv", diretorio="temp", tamanho_lote=TAMANHO_LOTE):
+    """Grava o histórico completo de perícias e processos num arquivo próprio (nome único) e retorna o caminho"""
+    extensao, _ = FORMATOS[formato]
+    gravar = gravar_parquet if formato == "parquet" else gravar_csv
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, caminho = tempfile.mkstemp(dir=diretorio, prefix="historico_", suffix=extensao)
+    try:
+        with os.fdopen(descritor, "wb") as destino:
+            gravar(repo.lotes_historico(tamanho_lote), destino)
+    except Exception:
+        os.remove(caminho)
+        raise
+    return caminho
@@ -0,0 +1,171 @@
+import hashlib
+import mmap
+import os
+from contextlib import contextmanager
+
+from cache_texto import hash_pdf, obter_cache_texto
+from campos_processo import ExtratorCampos
+
+# Quantidade de páginas lidas quando só interessa a petição inicial
+PAGINAS_PETICAO_INICIAL = 10
+
+# Caracteres da petição inicial mostrados na tela do laudo
+LIMITE_CARACTERES_PETICAO = 20000
+
+
+@contextmanager
+def abrir_pdf(origem):
+    """Abre o PDF a partir de um caminho, buffer ou arquivo enviado, sem copiar o conteúdo"""
+    import fitz  # PyMuPDF, importado só quando um PDF é de fato aberto
+    if isinstance(origem, (str, os.PathLike)):
+        # Aberto pelo caminho, o PyMuPDF lê as páginas do disco sob demanda
+        doc = fitz.open(origem)
+        try:
+            yield doc
+        finally:
+            doc.close()
+        return
+
+    mapa = None
+    if hasattr(origem, "getbuffer"):
+        # UploadedFile do Streamlit / BytesIO: usa o buffer interno em vez de .read()
+        buffer = origem.getbuffer()
+    elif hasattr(origem, "fileno"):
+        mapa = mmap.mmap(origem.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(mapa)
+    else:
+        buffer = memoryview(origem)
+
+    doc = fitz.open(stream=buffer, filetype="pdf")
+    try:
+        yield doc
+    finally:
+        doc.close()
+        buffer.release()
+        if mapa is not None:
+            mapa.close()
+
+
+def iterar_paginas(origem, pagina_inicial=0, pagina_final=None, limite_caracteres=None):
+    """Gera (número da página, texto) do PDF, parando no fim do intervalo ou do limite de caracteres.
+
+    As páginas são numeradas a partir de 0 e pagina_final é exclusiva.
+    """
+    restante = limite_caracteres
+    with abrir_pdf(origem) as doc:
+        fim = doc.page_count if pagina_final is None else min(pagina_final, doc.page_count)
+        for numero in range(max(pagina_inicial, 0), fim):
+            texto = doc.load_page(numero).get_text()
+            if restante is not None:
+                if len(texto) >= restante:
+                    yield numero, texto[:restante]
+                    return
+                restante -= len(texto)
+            yield numero, texto
+
+
+def hashes_paginas(doc):
+    """Impressão digital de cada página: conteúdo bruto da página e das imagens que ela usa.
+
+    Não decodifica texto nem imagens, então é bem mais barata que a extração.
+    """
+    hashes = []
+    for pagina in doc:
+        sha = hashlib.sha256(pagina.read_contents())
+        for imagem in pagina.get_images(full=False):
+            sha.update(doc.xref_stream_raw(imagem[0]) or b"")
+        hashes.append(sha.hexdigest())
+    return hashes
+
+
+def _extrair_documento(origem, cache, sha256):
+    """Extrai o documento inteiro para o cache, reaproveitando as páginas iniciais de uma versão anterior.
+
+    Processos baixados de novo costumam ter só juntadas novas no final; as páginas
+    em comum são identificadas pela impressão digital e copiadas do texto já em cache,
+    junto com os campos estruturados encontrados nelas. Retorna (texto, offsets, campos).
+    """
+    with abrir_pdf(origem) as doc:
+        hashes = hashes_paginas(doc)
+        paginas = []
+        extrator = ExtratorCampos()
+        anterior = cache.buscar_prefixo(hashes)
+        if anterior is not None:
+            texto, offsets, comuns, campos_anteriores = anterior
+            paginas = [texto[offsets[i]:offsets[i + 1]] for i in range(comuns)]
+            if campos_anteriores is not None:
+                extrator = ExtratorCampos(campos_anteriores, ate_pagina=comuns)
+            else:
+                for numero, pagina in enumerate(paginas):
+                    extrator.processar_pagina(numero, pagina)
+        for numero in range(len(paginas), doc.page_count):
+            paginas.append(doc.load_page(numero).get_text())
+            extrator.processar_pagina(numero, paginas[-1])
+    texto, offsets = cache.guardar(sha256, paginas, hashes, extrator.campos)
+    return texto, offsets, extrator.campos
+
+
+def extrair_texto_pdf(origem, pagina_inicial=0, pagina_final=None, limite_caracteres=None, usar_cache=True,
+                      sha256=None):
+    """Retorna o texto do PDF (ou do intervalo de páginas pedido) numa única string.
+
+    O texto completo fica no cache endereçado pelo SHA-256 do arquivo. Com o documento
+    em cache, intervalos são recortados pelos offsets das páginas; sem ele, um pedido
+    parcial lê só as páginas necessárias e não popula o cache. Quem já conhece o hash
+    do arquivo (ex.: PDFs no diretório de blobs) pode informá-lo em sha256.
+    """
+    parcial = pagina_inicial > 0 or pagina_final is not None or limite_caracteres is not None
+    if usar_cache:
+        cache = obter_cache_texto()
+        sha256 = sha256 or hash_pdf(origem)
+        entrada = cache.obter(sha256)
+        if entrada is None and not parcial:
+            entrada = _extrair_documento(origem, cache, sha256)[:2]
+        if entrada is not None:
+            texto, offsets = entrada
+            total_paginas = len(offsets) - 1
+            fim = total_paginas if pagina_final is None else min(pagina_final, total_paginas)
+            inicio = min(max(pagina_inicial, 0), fim)
+            trecho = texto[offsets[inicio]:offsets[fim]]
+            return trecho if limite_caracteres is None else trecho[:limite_caracteres]
+
+    return "".join(
+        texto for _, texto in iterar_paginas(origem, pagina_inicial, pagina_final, limite_caracteres)
+    )
+
+
+def paginas_em_cache(sha256):
+    """Texto de cada página de um documento já extraído, ou None se não estiver no cache"""
+    entrada = obter_cache_texto().obter(sha256)
+    if entrada is None:
+        return None
+    texto, offsets = entrada
+    return [texto[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+def extrair_peticao_inicial(origem, paginas=PAGINAS_PETICAO_INICIAL, limite_caracteres=LIMITE_CARACTERES_PETICAO,
+                            sha256=None):
+    """Lê apenas as primeiras páginas do processo, onde fica a petição inicial"""
+    return extrair_texto_pdf(origem, pagina_final=paginas, limite_caracteres=limite_caracteres, sha256=sha256)
+
+
+def extrair_campos_pdf(origem, sha256=None):
+    """Campos estruturados (NB, DER, CPF, RG, CID, nascimento, profissão) com a página de origem.
+
+    São calculados na mesma passada da extração do texto e guardados com ele no cache.
+    """
+    cache = obter_cache_texto()
+    sha256 = sha256 or hash_pdf(origem)
+    campos = cache.obter_campos(sha256)
+    if campos is not None:
+        return campos
+    entrada = cache.obter(sha256)
+    if entrada is None:
+        return _extrair_documento(origem, cache, sha256)[2]
+    # Documento em cache antes da extração de campos: percorre o texto já extraído
+    texto, offsets = entrada
+    extrator = ExtratorCampos()
+    for numero in range(len(offsets) - 1):
+        extrator.processar_pagina(numero, texto[offsets[numero]:offsets[numero + 1]])
+    cache.guardar_campos(sha256, extrator.campos)
+    return extrator.campos
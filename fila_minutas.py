@@ -0,0 +1,157 @@
+import asyncio
+import os
+import threading
+
+from armazenamento import TAREFA_CONCLUIDA, TAREFA_EXECUTANDO, TAREFA_FALHOU, TAREFA_NA_FILA
+from cliente_ia import MAX_REQUISICOES_SIMULTANEAS, criar_cliente
+from extracao_pdf import paginas_em_cache
+from instrumentacao import registrar_erro
+from lote_pre_laudos import GERADORES_PRE_LAUDO, sigla_tipo
+from redacao_laudos import SECOES_REDACAO, VERSAO_PROMPTS, _redigir_processo
+
+TIPO_TAREFA = "minutas"
+
+# Processos redigidos ao mesmo tempo; só eles têm as páginas carregadas em memória
+# (os pedidos ao modelo continuam limitados por LAUDOS_LLM_SIMULTANEAS)
+MAX_PROCESSOS_SIMULTANEOS = int(os.environ.get("LAUDOS_MINUTAS_SIMULTANEAS", "4"))
+
+# Intervalo (s) entre consultas à fila quando não há tarefa nova sinalizada
+INTERVALO_CONSULTA = 2.0
+
+# Rótulos das situações mostrados no resumo do lote
+ROTULOS_SITUACAO = {
+    TAREFA_NA_FILA: "🕒 Na fila",
+    TAREFA_EXECUTANDO: "✍️ Redigindo",
+    TAREFA_CONCLUIDA: "✅ Redigidas",
+    TAREFA_FALHOU: "❌ Falhou",
+}
+
+
+def chave_tarefa(processo):
+    """Chave de idempotência: o mesmo PDF com os mesmos templates é redigido uma única vez"""
+    return f"{TIPO_TAREFA}:{processo['id']}:{processo.get('pdf_sha256')}:v{VERSAO_PROMPTS}"
+
+
+def campos_das_minutas(processo, resultado):
+    """Campos a gravar no processo a partir das seções redigidas.
+
+    As minutas só preenchem campos ainda vazios; o texto do perito nunca é sobrescrito.
+    """
+    secoes = resultado["secoes"]
+    # Seções que falharam desta vez mantêm a minuta de uma redação anterior
+    campos = {"minutas_ia": {**(processo.get("minutas_ia") or {}), **secoes}}
+    if resultado.get("resumo"):
+        campos["resumo_processo"] = resultado["resumo"]
+        gerador = GERADORES_PRE_LAUDO.get(sigla_tipo(processo.get("tipo", "")))
+        if gerador is not None:
+            campos["pre_laudo"] = gerador(resultado["resumo"], processo["nome_parte"])
+    for campo in ("anamnese", "conclusao"):
+        if secoes.get(campo) and not processo.get(campo):
+            campos[campo] = secoes[campo]
+    if secoes.get("historico") and not processo.get("historico_beneficios"):
+        campos["historico_beneficios"] = [secoes["historico"]]
+    return campos
+
+
+class FilaMinutas:
+    """Fila de redação das minutas com IA em segundo plano, persistida na tabela de tarefas.
+
+    Uma thread roda um laço de eventos com um único cliente (pool de conexões) para todos os
+    processos. Cada processo lê as páginas do cache de texto só quando sai da fila, então no
+    máximo max_processos documentos ficam em memória ao mesmo tempo.
+    """
+
+    def __init__(self, repo, api_key=None, cache=None, max_processos=MAX_PROCESSOS_SIMULTANEOS,
+                 max_simultaneas=MAX_REQUISICOES_SIMULTANEAS):
+        self.repo = repo
+        self.api_key = api_key
+        self.cache = cache
+        self.max_processos = max(1, max_processos)
+        self.max_simultaneas = max_simultaneas
+        self._laco = asyncio.new_event_loop()
+        self._sinal = asyncio.Event()
+        self.repo.retomar_tarefas(TIPO_TAREFA)
+        self._despachante = threading.Thread(
+            target=self._laco.run_until_complete, args=(self._despachar(),), name="fila-minutas", daemon=True
+        )
+        self._despachante.start()
+
+    def enfileirar(self, processos):
+        """Enfileira os processos e retorna quantas tarefas novas foram criadas"""
+        novas = sum(
+            self.repo.enfileirar_tarefa(TIPO_TAREFA, processo["id"], chave_tarefa(processo))
+            for processo in processos
+        )
+        if novas:
+            self._laco.call_soon_threadsafe(self._sinal.set)
+        return novas
+
+    def situacao(self, processo_ids):
+        return self.repo.situacao_tarefas(TIPO_TAREFA, processo_ids)
+
+    async def _aguardar_sinal(self):
+        try:
+            await asyncio.wait_for(self._sinal.wait(), INTERVALO_CONSULTA)
+        except asyncio.TimeoutError:
+            pass
+        self._sinal.clear()
+
+    async def _despachar(self):
+        cliente = criar_cliente(api_key=self.api_key)
+        semaforo = asyncio.Semaphore(self.max_simultaneas)
+        vagas = asyncio.Semaphore(self.max_processos)
+        # Referências às redações em andamento (o laço de eventos só guarda referências fracas)
+        execucoes = set()
+        while True:
+            await vagas.acquire()
+            try:
+                tarefa = self.repo.reivindicar_tarefa(TIPO_TAREFA)
+            except Exception as e:
+                # O laço não pode morrer: espera e tenta de novo (ex.: banco indisponível)
+                registrar_erro("minutas", "Erro ao consultar a fila de minutas", e)
+                tarefa = None
+            if tarefa is None:
+                vagas.release()
+                await self._aguardar_sinal()
+                continue
+            execucao = asyncio.ensure_future(self._redigir(cliente, semaforo, tarefa))
+            execucoes.add(execucao)
+            execucao.add_done_callback(execucoes.discard)
+            execucao.add_done_callback(lambda _: vagas.release())
+
+    async def _redigir(self, cliente, semaforo, tarefa):
+        try:
+            processo = self.repo.obter_processo(tarefa["processo_id"])
+            if processo is None:
+                self.repo.falhar_tarefa(tarefa["id"], "Processo excluído")
+                return
+            # As páginas deste processo são lidas agora, fora do laço de eventos, e soltas ao terminar
+            sha256 = processo.get("pdf_sha256")
+            paginas = await asyncio.to_thread(paginas_em_cache, sha256) if sha256 else None
+            if paginas is None:
+                self.repo.falhar_tarefa(tarefa["id"], "Texto do processo fora do cache; gere o pré-laudo de novo")
+                return
+            resultado = await _redigir_processo(
+                cliente, semaforo, {**processo, "paginas": list(enumerate(paginas))}, tuple(SECOES_REDACAO),
+                cache=self.cache
+            )
+            # Relê o processo: campos preenchidos durante a redação não são sobrescritos
+            processo = self.repo.obter_processo(tarefa["processo_id"])
+            if processo is None:
+                return
+            campos = campos_das_minutas(processo, resultado)
+            if resultado["erros"]:
+                # As seções prontas ficam gravadas (e no cache de respostas); a tarefa falha para poder
+                # ser enfileirada de novo
+                if resultado["secoes"]:
+                    self.repo.atualizar_processo(processo["id"], campos)
+                erros = "; ".join(f"{secao}: {erro}" for secao, erro in resultado["erros"].items())
+                self.repo.falhar_tarefa(tarefa["id"], erros)
+            else:
+                self.repo.concluir_tarefa(tarefa["id"], processo["id"], campos)
+        except Exception as e:
+            registrar_erro("minutas", "Erro ao redigir as minutas do processo", e, tarefa=tarefa["id"])
+            try:
+                self.repo.falhar_tarefa(tarefa["id"], e)
+            except Exception as erro:
+                registrar_erro("minutas", "Erro ao registrar a falha da tarefa", erro, tarefa=tarefa["id"])
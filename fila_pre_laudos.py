@@ -0,0 +1,152 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+from armazenamento import TAREFA_CONCLUIDA, TAREFA_EXECUTANDO, TAREFA_FALHOU, TAREFA_NA_FILA
+from extracao_pdf import paginas_em_cache
+from instrumentacao import registrar_erro
+from lote_pre_laudos import MAX_WORKERS_LOTE, _gerar_pre_laudo, campos_do_resultado
+
+TIPO_TAREFA = "pre_laudo"
+
+# Intervalo (s) entre consultas à fila quando não há tarefa nova sinalizada
+INTERVALO_CONSULTA = 2.0
+
+# Rótulos das situações mostrados na lista de processos
+ROTULOS_SITUACAO = {
+    TAREFA_NA_FILA: "🕒 Na fila",
+    TAREFA_EXECUTANDO: "⚙️ Gerando",
+    TAREFA_CONCLUIDA: "✅ Pronto",
+    TAREFA_FALHOU: "❌ Falhou",
+}
+
+
+def chave_tarefa(processo):
+    """Chave de idempotência: o mesmo processo com o mesmo PDF gera o pré-laudo uma única vez"""
+    return f"{TIPO_TAREFA}:{processo['id']}:{processo.get('pdf_sha256') or 'sem_pdf'}"
+
+
+class FilaPreLaudos:
+    """Fila de geração de pré-laudos em segundo plano, persistida na tabela de tarefas.
+
+    Uma thread despachante reivindica as tarefas da fila e as envia a um pool de processos;
+    o resultado é gravado no processo na mesma transação que conclui a tarefa. Tarefas que
+    estavam em execução quando o servidor parou voltam para a fila ao iniciar.
+    """
+
+    def __init__(self, repo, max_workers=MAX_WORKERS_LOTE):
+        self.repo = repo
+        self.max_workers = max(1, max_workers)
+        self._vagas = threading.BoundedSemaphore(self.max_workers)
+        self._sinal = threading.Event()
+        self._executor = None
+        self.repo.retomar_tarefas(TIPO_TAREFA)
+        self._despachante = threading.Thread(target=self._despachar, name="fila-pre-laudos", daemon=True)
+        self._despachante.start()
+
+    def enfileirar(self, processos):
+        """Enfileira os processos e retorna quantas tarefas novas foram criadas"""
+        novas = sum(
+            self.repo.enfileirar_tarefa(TIPO_TAREFA, processo["id"], chave_tarefa(processo))
+            for processo in processos
+        )
+        if novas:
+            self._sinal.set()
+        return novas
+
+    def situacao(self, processo_ids):
+        return self.repo.situacao_tarefas(TIPO_TAREFA, processo_ids)
+
+    def _obter_executor(self):
+        if self._executor is None:
+            # "spawn" evita herdar por fork as threads do servidor do Streamlit
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _descartar_executor(self):
+        """Abandona o pool quebrado (um worker encerrado à força); o próximo envio cria outro"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _enviar(self, processo):
+        try:
+            return self._obter_executor().submit(_gerar_pre_laudo, processo)
+        except BrokenExecutor:
+            # Um worker encerrado à força (ex.: falta de memória) inutiliza o pool inteiro
+            self._descartar_executor()
+            return self._obter_executor().submit(_gerar_pre_laudo, processo)
+
+    def _despachar(self):
+        while True:
+            self._vagas.acquire()
+            tarefa = None
+            try:
+                tarefa = self.repo.reivindicar_tarefa(TIPO_TAREFA)
+                if tarefa is None:
+                    self._vagas.release()
+                    self._sinal.wait(INTERVALO_CONSULTA)
+                    self._sinal.clear()
+                    continue
+                processo = self.repo.obter_processo(tarefa["processo_id"])
+                if processo is None:
+                    self.repo.falhar_tarefa(tarefa["id"], "Processo excluído")
+                    self._vagas.release()
+                    continue
+                futuro = self._enviar(processo)
+            except Exception as e:
+                # A thread despachante não pode morrer: a tarefa falha, a vaga volta e, se o pool
+                # quebrou, ele é recriado no próximo envio
+                registrar_erro("fila", "Erro no despachante da fila de pré-laudos", e,
+                               tarefa=tarefa["id"] if tarefa is not None else None)
+                if isinstance(e, BrokenExecutor):
+                    self._descartar_executor()
+                if tarefa is not None:
+                    try:
+                        self.repo.falhar_tarefa(tarefa["id"], e)
+                    except Exception as erro:
+                        registrar_erro("fila", "Erro ao registrar a falha da tarefa", erro, tarefa=tarefa["id"])
+                self._vagas.release()
+                # Evita repetir sem pausa se o erro persistir (ex.: banco indisponível)
+                self._sinal.wait(INTERVALO_CONSULTA)
+                self._sinal.clear()
+                continue
+            futuro.add_done_callback(
+                lambda futuro, tarefa=tarefa: self._finalizar(tarefa, futuro)
+            )
+
+    def _finalizar(self, tarefa, futuro):
+        try:
+            resultado = futuro.result()
+            # Relê o processo: campos preenchidos durante a geração não são sobrescritos
+            processo = self.repo.obter_processo(tarefa["processo_id"])
+            if processo is None:
+                return
+            campos = campos_do_resultado(processo, resultado)
+            if "arquivo_path" in processo and os.path.exists(processo["arquivo_path"]):
+                os.remove(processo["arquivo_path"])
+                campos["arquivo_path"] = ""
+            self.repo.concluir_tarefa(tarefa["id"], processo["id"], campos)
+        except Exception as e:
+            try:
+                self.repo.falhar_tarefa(tarefa["id"], e)
+            except Exception as erro:
+                registrar_erro("fila", "Erro ao registrar a falha da tarefa", erro, tarefa=tarefa["id"])
+            return
+        finally:
+            self._vagas.release()
+
+        # Atualiza o índice de busca com o texto extraído pelo worker (já no cache); se falhar,
+        # o processo continua pronto e será indexado na próxima geração
+        sha256 = processo.get("pdf_sha256")
+        try:
+            if sha256 and not self.repo.texto_indexado(processo["id"], sha256):
+                paginas = paginas_em_cache(sha256)
+                if paginas is not None:
+                    self.repo.indexar_texto_processo(processo["id"], sha256, paginas)
+        except Exception as e:
+            registrar_erro("fila", "Erro ao indexar o texto do processo", e, processo=processo["id"])
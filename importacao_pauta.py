@@ -0,0 +1,186 @@
+import io
+import os
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Faixa de horários permitida (mesma regra do formulário de inclusão), em minutos desde 00:00
+HORARIO_MINIMO = 8 * 60
+HORARIO_MAXIMO = 16 * 60 + 45
+
+# Situação dos processos importados
+SITUACAO_IMPORTADA = "Pré-laudo"
+
+# Cabeçalho da planilha (sem acentos, minúsculo, só letras) -> campo; o primeiro trecho encontrado vence.
+# "tipo" vem antes de "processo" para que "Tipo do processo" não seja lido como o número.
+CABECALHOS = (
+    ("horario", ("horario", "hora")),
+    ("tipo", ("tipo", "beneficio", "assunto", "especie")),
+    ("numero_processo", ("processo", "cnj", "numero", "autos")),
+    ("nome_parte", ("parte", "nome", "autor", "periciand", "requerente")),
+)
+
+
+class PautaInvalida(ValueError):
+    """Planilha que não pode ser importada (formato, colunas obrigatórias)"""
+
+
+def _sem_acentos(texto):
+    return unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode().lower()
+
+
+def _serie_sem_acentos(serie):
+    return serie.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii").str.lower().str.strip()
+
+
+def ler_pauta(arquivo, nome_arquivo):
+    """Lê a pauta (CSV com vírgula ou ponto e vírgula, ou XLSX) como texto, com as colunas renomeadas para os campos"""
+    extensao = os.path.splitext(nome_arquivo)[1].lower()
+    if extensao in (".xlsx", ".xlsm"):
+        tabela = pd.read_excel(arquivo, dtype=str)
+    elif extensao == ".csv":
+        conteudo = arquivo.read()
+        try:
+            texto = conteudo.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            texto = conteudo.decode("latin-1")  # planilhas exportadas pelo Excel em português
+        # Linhas em branco são mantidas (e descartadas abaixo) para o índice seguir a numeração do arquivo
+        tabela = pd.read_csv(io.StringIO(texto), dtype=str, sep=None, engine="python", skip_blank_lines=False)
+    else:
+        raise PautaInvalida(f"Formato não suportado: {extensao or nome_arquivo} (use CSV ou XLSX)")
+
+    colunas = {}
+    for coluna in tabela.columns:
+        cabecalho = "".join(letra for letra in _sem_acentos(coluna) if letra.isalpha())
+        for campo, trechos in CABECALHOS:
+            if campo not in colunas.values() and any(trecho in cabecalho for trecho in trechos):
+                colunas[coluna] = campo
+                break
+    faltando = [campo for campo in ("numero_processo", "nome_parte", "horario") if campo not in colunas.values()]
+    if faltando:
+        raise PautaInvalida(f"Colunas não encontradas na planilha: {', '.join(faltando)}")
+    tabela = tabela[list(colunas)].rename(columns=colunas)
+    if "tipo" not in tabela:
+        tabela["tipo"] = np.nan
+    # Linhas totalmente vazias (rodapés, separadores) não contam como erro
+    return tabela.dropna(how="all").fillna("")
+
+
+def normalizar_cnj(serie):
+    """Números no formato CNJ (NNNNNNN-DD.AAAA.J.TR.OOOO) e a máscara dos que têm 20 dígitos e DV válido.
+
+    O dígito verificador é conferido pelo módulo 97 (Resolução CNJ 65/2008), em três partes para
+    caber em inteiros de 64 bits.
+    """
+    digitos = serie.str.replace(r"\D", "", regex=True)
+    completos = digitos.str.len() == 20
+    partes = digitos.where(completos, "0" * 20)
+    sequencial = partes.str[:7].astype(np.int64)
+    verificador = partes.str[7:9].astype(np.int64)
+    ano_justica = partes.str[9:16].astype(np.int64)
+    origem = partes.str[16:20].astype(np.int64)
+    resto = sequencial % 97
+    resto = (resto * 10 ** 7 + ano_justica) % 97
+    resto = (resto * 10 ** 6 + origem * 100 + verificador) % 97
+    formatados = digitos.str.replace(
+        r"^(\d{7})(\d{2})(\d{4})(\d)(\d{2})(\d{4})$", r"\1-\2.\3.\4.\5.\6", regex=True
+    )
+    return formatados, completos, completos & (resto == 1)
+
+
+def normalizar_horarios(serie):
+    """Horários como HH:MM e os minutos desde 00:00 (NaN quando não reconhecido).
+
+    Aceita "9:00", "09h00", "9h", "09.30" e "09:00:00" (células de hora do Excel).
+    """
+    partes = serie.str.strip().str.extract(r"^(\d{1,2})\s*[:hH.]?\s*(\d{2})?(?::\d{2})?\s*(?:h|hs)?$")
+    horas = pd.to_numeric(partes[0], errors="coerce")
+    minutos = pd.to_numeric(partes[1], errors="coerce").fillna(0)
+    minutos_do_dia = (horas * 60 + minutos).where((horas < 24) & (minutos < 60))
+    texto = (
+        horas.fillna(0).astype(int).astype(str).str.zfill(2) + ":"
+        + minutos.astype(int).astype(str).str.zfill(2)
+    )
+    return texto.where(minutos_do_dia.notna(), ""), minutos_do_dia
+
+
+def normalizar_tipos(serie, tipos, tipo_padrao):
+    """Tipo de perícia pelo nome completo ou pela sigla entre parênteses (ex.: "AD"); vazio vira tipo_padrao"""
+    por_chave = {}
+    for tipo in tipos:
+        por_chave[_sem_acentos(tipo)] = tipo
+        if "(" in tipo:
+            por_chave[_sem_acentos(tipo.split("(")[0]).strip()] = tipo
+            por_chave[_sem_acentos(tipo.rsplit("(", 1)[1].rstrip(")"))] = tipo
+    chaves = _serie_sem_acentos(serie)
+    siglas = chaves.str.extract(r"\(\s*([a-z]{2,6})\s*\)\s*$")[0]
+    resultado = chaves.map(por_chave).fillna(siglas.map(por_chave))
+    return resultado.where(chaves != "", tipo_padrao)
+
+
+def validar_pauta(tabela, horarios_ocupados, tipos, tipo_padrao):
+    """Confere a pauta inteira de uma vez (sem laço por linha nas regras).
+
+    Retorna (processos válidos, erros), onde cada processo é um dicionário com os campos do
+    formulário e "linha" (linha da planilha, contando o cabeçalho), e cada erro é {"linha", "erro"}.
+    """
+    numeros, completos, dv_valido = normalizar_cnj(tabela["numero_processo"])
+    horarios, minutos = normalizar_horarios(tabela["horario"])
+    nomes = tabela["nome_parte"].str.strip().str.replace(r"\s+", " ", regex=True)
+    tipos_normalizados = normalizar_tipos(tabela["tipo"], tipos, tipo_padrao)
+
+    validos_ate_aqui = pd.Series(True, index=tabela.index)
+    regras = [
+        (~completos, "número do processo sem os 20 dígitos do padrão CNJ"),
+        (completos & ~dv_valido, "dígito verificador do número do processo inválido"),
+        (nomes == "", "nome da parte vazio"),
+        (minutos.isna(), "horário não reconhecido"),
+        (minutos.notna() & ((minutos < HORARIO_MINIMO) | (minutos > HORARIO_MAXIMO)),
+         "horário fora do intervalo 08:00–16:45"),
+        (horarios.isin(horarios_ocupados) & (horarios != ""), "horário já ocupado nesta data/local"),
+        (tipos_normalizados.isna(), "tipo de perícia desconhecido"),
+    ]
+    mensagens = pd.Series("", index=tabela.index)
+    for mascara, mensagem in regras:
+        mensagens = mensagens.where(~mascara, mensagens + "; " + mensagem)
+        validos_ate_aqui &= ~mascara
+    # Horário repetido na própria planilha: vale a primeira linha válida com ele
+    repetidos = validos_ate_aqui & horarios.where(validos_ate_aqui).duplicated(keep="first")
+    mensagens = mensagens.where(~repetidos, mensagens + "; horário repetido na planilha")
+    validos = validos_ate_aqui & ~repetidos
+
+    linhas = tabela.index.to_numpy() + 2
+    erros = [
+        {"linha": int(linha), "erro": mensagem.lstrip("; ")}
+        for linha, mensagem in zip(linhas[~validos.to_numpy()], mensagens[~validos])
+    ]
+    processos = pd.DataFrame({
+        "linha": linhas,
+        "numero_processo": numeros,
+        "nome_parte": nomes,
+        "horario": horarios,
+        "tipo": tipos_normalizados,
+    })[validos.to_numpy()]
+    return processos.to_dict("records"), erros
+
+
+def importar_pauta(repo, data_iso, local, arquivo, nome_arquivo, criado_por, tipos, tipo_padrao):
+    """Lê, confere e grava a pauta numa única transação.
+
+    Retorna (quantidade importada, erros por linha). Uma linha cujo horário foi ocupado por
+    outra sessão entre a conferência e a gravação também volta como erro.
+    """
+    tabela = ler_pauta(arquivo, nome_arquivo)
+    ocupados = {processo["horario"] for processo in repo.listar_processos(data_iso, local)}
+    processos, erros = validar_pauta(tabela, ocupados, tipos, tipo_padrao)
+    criado_em = pd.Timestamp.now().isoformat()
+    linhas = [processo.pop("linha") for processo in processos]
+    for processo in processos:
+        processo.update(situacao=SITUACAO_IMPORTADA, criado_por=criado_por, criado_em=criado_em)
+    ids = repo.adicionar_processos(data_iso, local, processos)
+    for linha, processo_id in zip(linhas, ids):
+        if processo_id is None:
+            erros.append({"linha": linha, "erro": "horário já ocupado nesta data/local"})
+    erros.sort(key=lambda erro: erro["linha"])
+    return sum(processo_id is not None for processo_id in ids), erros
@@ -0,0 +1,223 @@
+import cProfile
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+# Registro das execuções (um JSON por linha), com rotação por tamanho (configurável por variável de ambiente)
+CAMINHO_REGISTRO = os.environ.get("LAUDOS_INSTRUMENTACAO_LOG", os.path.join("data", "instrumentacao.jsonl"))
+LIMITE_REGISTRO_KB = int(os.environ.get("LAUDOS_INSTRUMENTACAO_KB", "2048"))
+ARQUIVOS_ANTERIORES = 1
+
+# LAUDOS_INSTRUMENTACAO=0 desliga a medição (os trechos medidos passam a não fazer nada)
+INSTRUMENTACAO_ATIVA = os.environ.get("LAUDOS_INSTRUMENTACAO", "1") != "0"
+
+# Linhas do perfil mostradas no painel
+LINHAS_PERFIL = 30
+
+_local = threading.local()
+
+
+class Execucao:
+    """Medidas de uma execução do script (rerun): trechos, widgets e mensagens enviadas ao navegador"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.trechos = {}
+        self.mensagens = 0
+        self.bytes = 0
+
+    def registrar(self, nome, duracao):
+        # Um trecho executado mais de uma vez na mesma execução soma as durações
+        self.trechos[nome] = self.trechos.get(nome, 0.0) + duracao
+
+    def contar(self, mensagem):
+        self.mensagens += 1
+        self.bytes += mensagem.ByteSize()
+
+
+@contextmanager
+def medir(nome):
+    """Mede a duração do bloco dentro da execução atual (sem execução em andamento, não faz nada)"""
+    execucao = getattr(_local, "execucao", None)
+    if execucao is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        execucao.registrar(nome, time.perf_counter() - inicio)
+
+
+def medido(nome=None):
+    """Decorador: mede cada chamada da função como o trecho `nome` (padrão: nome da função)"""
+    def decorador(funcao):
+        @wraps(funcao)
+        def medida(*args, **kwargs):
+            with medir(nome or funcao.__name__):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorador
+
+
+_registro = None
+_lock_registro = threading.Lock()
+
+
+def obter_registro():
+    """Logger do registro das execuções, criado uma vez por processo"""
+    global _registro
+    with _lock_registro:
+        if _registro is None:
+            os.makedirs(os.path.dirname(os.path.abspath(CAMINHO_REGISTRO)), exist_ok=True)
+            handler = RotatingFileHandler(
+                CAMINHO_REGISTRO, maxBytes=LIMITE_REGISTRO_KB * 1024, backupCount=ARQUIVOS_ANTERIORES,
+                encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _registro = logging.getLogger("laudos.instrumentacao")
+            _registro.setLevel(logging.INFO)
+            _registro.propagate = False
+            _registro.addHandler(handler)
+        return _registro
+
+
+def _perfil_em_bytes(perfil):
+    """Perfil no formato do pstats (.prof) e o resumo em texto das funções mais demoradas"""
+    perfil.create_stats()
+    texto = io.StringIO()
+    pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(LINHAS_PERFIL)
+    return marshal.dumps(perfil.stats), texto.getvalue()
+
+
+@contextmanager
+def execucao_medida(nome="execucao", perfilar=False, ao_perfilar=None):
+    """Mede uma execução inteira do script e grava uma linha no registro ao final (mesmo com st.rerun/st.stop).
+
+    Conta os widgets da execução e as mensagens/bytes enviados ao navegador pelo contexto do
+    Streamlit. Com perfilar, a execução roda sob o cProfile e ao_perfilar recebe
+    {"momento", "prof" (bytes do .prof), "texto"}.
+    """
+    if not INSTRUMENTACAO_ATIVA:
+        yield None
+        return
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    contexto = get_script_run_ctx()
+    execucao = Execucao()
+    _local.execucao = execucao
+    enviar = getattr(contexto, "_enqueue", None)
+    if enviar is not None:
+        def enviar_contando(mensagem):
+            execucao.contar(mensagem)
+            enviar(mensagem)
+        contexto._enqueue = enviar_contando
+    perfil = cProfile.Profile() if perfilar else None
+    if perfil is not None:
+        perfil.enable()
+    try:
+        yield execucao
+    finally:
+        if perfil is not None:
+            perfil.disable()
+        duracao = time.perf_counter() - execucao.inicio
+        _local.execucao = None
+        if enviar is not None:
+            contexto._enqueue = enviar
+        obter_registro().info(json.dumps({
+            "momento": datetime.now().isoformat(timespec="seconds"),
+            "tipo": "execucao",
+            "nome": nome,
+            "duracao_ms": round(duracao * 1000, 2),
+            "widgets": len(contexto.widget_ids_this_run) if contexto is not None else None,
+            "mensagens": execucao.mensagens,
+            "bytes": execucao.bytes,
+            "trechos": {trecho: round(valor * 1000, 2) for trecho, valor in execucao.trechos.items()},
+        }, ensure_ascii=False))
+        if perfil is not None and ao_perfilar is not None:
+            prof, texto = _perfil_em_bytes(perfil)
+            ao_perfilar({"momento": datetime.now().isoformat(timespec="seconds"), "prof": prof, "texto": texto})
+
+
+def registrar_erro(origem, mensagem, erro=None, **detalhes):
+    """Erro de código em segundo plano (fora de uma execução do script): vai para o log e para o registro.
+
+    origem nomeia o logger ("laudos.<origem>"); detalhes (ex.: tarefa, processo) vão junto na linha do registro.
+    """
+    logging.getLogger(f"laudos.{origem}").error(
+        "%s%s", mensagem, f": {erro}" if erro is not None else "",
+        exc_info=(type(erro), erro, erro.__traceback__) if isinstance(erro, BaseException) else None
+    )
+    if not INSTRUMENTACAO_ATIVA:
+        return
+    obter_registro().info(json.dumps({
+        "momento": datetime.now().isoformat(timespec="seconds"),
+        "tipo": "erro",
+        "origem": origem,
+        "mensagem": mensagem,
+        "erro": f"{type(erro).__name__}: {erro}" if isinstance(erro, BaseException) else erro,
+        **detalhes,
+    }, ensure_ascii=False, default=str))
+
+
+def ler_registros(limite=2000, tipo="execucao"):
+    """Os últimos `limite` registros do tipo (execuções ou erros), do arquivo anterior da rotação e do atual"""
+    obter_registro()  # garante que o arquivo atual já foi liberado pelo handler
+    registros = deque(maxlen=limite)
+    caminhos = [f"{CAMINHO_REGISTRO}.{n}" for n in range(ARQUIVOS_ANTERIORES, 0, -1)] + [CAMINHO_REGISTRO]
+    for caminho in caminhos:
+        try:
+            with open(caminho, encoding="utf-8") as arquivo:
+                for linha in arquivo:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue  # linha cortada por uma gravação interrompida
+                    # Linhas sem tipo são execuções (formato anterior aos erros no registro)
+                    if registro.get("tipo", "execucao") == tipo:
+                        registros.append(registro)
+        except FileNotFoundError:
+            continue
+    return list(registros)
+
+
+def _percentis(valores):
+    valores = sorted(valores)
+    return {
+        "execucoes": len(valores),
+        "p50": statistics.median(valores),
+        "p95": valores[min(len(valores) - 1, int(len(valores) * 0.95))],
+        "maximo": valores[-1],
+    }
+
+
+def resumo_por_trecho(registros):
+    """p50/p95/máximo (ms) da execução inteira e de cada trecho medido, do mais lento (p95) ao mais rápido"""
+    por_trecho = {}
+    for registro in registros:
+        por_trecho.setdefault("(execução inteira)", []).append(registro["duracao_ms"])
+        for trecho, duracao in registro["trechos"].items():
+            por_trecho.setdefault(trecho, []).append(duracao)
+    resumo = {trecho: _percentis(valores) for trecho, valores in por_trecho.items()}
+    return dict(sorted(resumo.items(), key=lambda item: -item[1]["p95"]))
+
+
+def resumo_envio(registros):
+    """p50/p95 dos widgets e dos bytes enviados por execução"""
+    resumo = {}
+    for campo in ("widgets", "bytes"):
+        valores = [registro[campo] for registro in registros if registro.get(campo) is not None]
+        if valores:
+            resumo[campo] = _percentis(valores)
+    return resumo
@@ -0,0 +1,207 @@
+import io
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.platypus import CondPageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# Seções do laudo, na ordem padrão: seção -> título
+SECOES_LAUDO = {
+    "identificacao": "1. IDENTIFICAÇÃO",
+    "anamnese": "2. ANAMNESE",
+    "exame_fisico": "3. EXAME FÍSICO",
+    "patologias": "4. PATOLOGIAS IDENTIFICADAS",
+    "incapacidade": "5. INCAPACIDADE",
+    "quesitos": "6. RESPOSTA AOS QUESITOS",
+    "conclusao": "7. CONCLUSÃO",
+}
+
+MODELO_PADRAO = {
+    "cabecalho": ["PODER JUDICIÁRIO"],
+    "titulo": "LAUDO MÉDICO PERICIAL",
+    "secoes": SECOES_LAUDO,
+    "fonte": "Helvetica",
+    "tamanho_fonte": 10,
+}
+
+# Ajustes de cada vara sobre o modelo padrão (o que não estiver aqui vem do MODELO_PADRAO)
+MODELOS_VARA = {
+    "15ª Vara Federal (Sousa)": {
+        "cabecalho": ["PODER JUDICIÁRIO", "JUSTIÇA FEDERAL - SEÇÃO JUDICIÁRIA DA PARAÍBA", "15ª VARA FEDERAL - SOUSA/PB"],
+    },
+    "17ª Vara Federal (Juazeiro do Norte)": {
+        "cabecalho": ["PODER JUDICIÁRIO", "JUSTIÇA FEDERAL - SEÇÃO JUDICIÁRIA DO CEARÁ",
+                      "17ª VARA FEDERAL - JUAZEIRO DO NORTE/CE"],
+    },
+    "20ª Vara Federal (Salgueiro)": {
+        "cabecalho": ["PODER JUDICIÁRIO", "JUSTIÇA FEDERAL - SEÇÃO JUDICIÁRIA DE PERNAMBUCO",
+                      "20ª VARA FEDERAL - SALGUEIRO/PE"],
+    },
+    "25ª Vara Federal (Iguatu)": {
+        "cabecalho": ["PODER JUDICIÁRIO", "JUSTIÇA FEDERAL - SEÇÃO JUDICIÁRIA DO CEARÁ", "25ª VARA FEDERAL - IGUATU/CE"],
+    },
+    "27ª Vara Federal (Ouricuri)": {
+        "cabecalho": ["PODER JUDICIÁRIO", "JUSTIÇA FEDERAL - SEÇÃO JUDICIÁRIA DE PERNAMBUCO",
+                      "27ª VARA FEDERAL - OURICURI/PE"],
+        "secoes": {**SECOES_LAUDO, "quesitos": "6. RESPOSTA AOS QUESITOS DO JUÍZO E DAS PARTES"},
+    },
+}
+
+
+def formatar_data(valor):
+    """date, datetime ou texto ISO -> dd/mm/aaaa ("-" se vazio)"""
+    if not valor:
+        return "-"
+    if isinstance(valor, (date, datetime)):
+        return valor.strftime("%d/%m/%Y")
+    try:
+        return datetime.strptime(str(valor)[:10], "%Y-%m-%d").strftime("%d/%m/%Y")
+    except ValueError:
+        return str(valor)
+
+
+def _paragrafo_texto(texto):
+    # Texto livre do perito: escapa a marcação do reportlab e preserva as quebras de linha
+    return escape(str(texto or "").strip() or "-").replace("\n", "<br/>")
+
+
+class ModeloLaudo:
+    """Modelo de laudo de uma vara: estilos, cabeçalho e ordem das seções"""
+
+    def __init__(self, vara, definicao):
+        self.vara = vara
+        self.cabecalho = list(definicao["cabecalho"])
+        self.titulo = definicao["titulo"]
+        self.secoes = dict(definicao["secoes"])
+        fonte, tamanho = definicao["fonte"], definicao["tamanho_fonte"]
+        fonte_negrito = f"{fonte}-Bold"
+        self.fonte, self.fonte_negrito = fonte, fonte_negrito
+
+        self.estilo_titulo = ParagraphStyle(
+            "titulo", fontName=fonte_negrito, fontSize=tamanho + 4, leading=tamanho + 8,
+            alignment=TA_CENTER, spaceAfter=tamanho
+        )
+        self.estilo_secao = ParagraphStyle(
+            "secao", fontName=fonte_negrito, fontSize=tamanho + 1, leading=tamanho + 4,
+            spaceBefore=tamanho, spaceAfter=tamanho / 2
+        )
+        self.estilo_corpo = ParagraphStyle(
+            "corpo", fontName=fonte, fontSize=tamanho, leading=tamanho * 1.4, alignment=TA_JUSTIFY
+        )
+        self.estilo_tabela = TableStyle([
+            ("FONTNAME", (0, 0), (0, -1), fonte_negrito),
+            ("FONTNAME", (1, 0), (1, -1), fonte),
+            ("FONTSIZE", (0, 0), (-1, -1), tamanho),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("LINEBELOW", (0, 0), (-1, -1), 0.25, colors.lightgrey),
+        ])
+        self.tamanho = tamanho
+        self._titulos = {secao: escape(titulo) for secao, titulo in self.secoes.items()}
+
+    # ------------------------------------------------------------ página
+
+    def _desenhar_pagina(self, canvas, documento):
+        largura, altura = A4
+        canvas.saveState()
+        canvas.setFont(self.fonte_negrito, self.tamanho - 1)
+        y = altura - 1.5 * cm
+        for linha in self.cabecalho:
+            canvas.drawCentredString(largura / 2, y, linha)
+            y -= self.tamanho + 2
+        canvas.setFont(self.fonte, self.tamanho - 2)
+        canvas.drawString(2 * cm, 1.2 * cm, documento.rodape)
+        canvas.drawRightString(largura - 2 * cm, 1.2 * cm, f"Página {canvas.getPageNumber()}")
+        canvas.restoreState()
+
+    # ------------------------------------------------------------ seções
+
+    def _identificacao(self, laudo):
+        linhas = [
+            ("Processo", laudo.get("numero_processo")),
+            ("Periciando(a)", laudo.get("nome_parte")),
+            ("CPF", laudo.get("cpf")),
+            ("RG", laudo.get("rg")),
+            ("Tipo de perícia", laudo.get("tipo")),
+            ("Data e horário da perícia", f"{formatar_data(laudo.get('data'))} às {laudo.get('horario') or '-'}"),
+            ("Local", laudo.get("local")),
+            ("Data de nascimento", formatar_data(laudo.get("data_nascimento"))),
+            ("Idade", f"{laudo['idade']} anos" if laudo.get("idade") not in (None, "") else "-"),
+            ("Profissão", laudo.get("profissao")),
+            ("Escolaridade", laudo.get("escolaridade")),
+            ("Histórico laboral", laudo.get("historico_laboral")),
+            ("CID(s)", laudo.get("cid")),
+            ("NB", laudo.get("nb")),
+            ("DER", formatar_data(laudo.get("der"))),
+        ]
+        dados = [[rotulo, Paragraph(_paragrafo_texto(valor), self.estilo_corpo)] for rotulo, valor in linhas]
+        return [Table(dados, colWidths=[5 * cm, None], style=self.estilo_tabela)]
+
+    def _patologias(self, laudo):
+        patologias = laudo.get("patologias") or []
+        if not patologias:
+            return [Paragraph("Nenhuma patologia identificada.", self.estilo_corpo)]
+        return [Paragraph(f"• {_paragrafo_texto(patologia)}", self.estilo_corpo) for patologia in patologias]
+
+    def _incapacidade(self, laudo):
+        texto = (
+            f"<b>Incapacidade laboral:</b> {_paragrafo_texto(laudo.get('incapacidade'))}<br/>"
+            f"<b>Data de início:</b> {formatar_data(laudo.get('data_inicio'))}<br/>"
+            f"<b>Data provável de término:</b> {formatar_data(laudo.get('data_fim'))}"
+        )
+        return [Paragraph(texto, self.estilo_corpo)]
+
+    def _secao(self, secao, laudo):
+        if secao == "identificacao":
+            return self._identificacao(laudo)
+        if secao == "patologias":
+            return self._patologias(laudo)
+        if secao == "incapacidade":
+            return self._incapacidade(laudo)
+        return [Paragraph(_paragrafo_texto(laudo.get(secao)), self.estilo_corpo)]
+
+    def montar(self, laudo):
+        """Flowables do laudo; laudo é o dicionário do processo com os campos do editor"""
+        conteudo = [Spacer(1, 0.8 * cm), Paragraph(escape(self.titulo), self.estilo_titulo)]
+        for secao, titulo in self._titulos.items():
+            # O título não fica sozinho no fim da página
+            conteudo.append(CondPageBreak(3 * cm))
+            conteudo.append(Paragraph(titulo, self.estilo_secao))
+            conteudo.extend(self._secao(secao, laudo))
+        return conteudo
+
+    def renderizar(self, laudo):
+        """Bytes do PDF do laudo"""
+        buffer = io.BytesIO()
+        documento = SimpleDocTemplate(
+            buffer, pagesize=A4, leftMargin=2 * cm, rightMargin=2 * cm,
+            topMargin=1.5 * cm + len(self.cabecalho) * (self.tamanho + 2), bottomMargin=2 * cm,
+            title=f"{self.titulo} - {laudo.get('numero_processo', '')}", author=self.vara,
+        )
+        documento.rodape = f"Processo {laudo.get('numero_processo', '')} - {laudo.get('nome_parte', '')}"
+        documento.build(self.montar(laudo), onFirstPage=self._desenhar_pagina, onLaterPages=self._desenhar_pagina)
+        return buffer.getvalue()
+
+
+def obter_modelo(vara):
+    """Modelo da vara (ou o padrão com o nome do local).
+
+    Montado a cada laudo: são só alguns estilos, e o custo da renderização está na quebra de linhas
+    do texto de cada laudo, que não se aproveita entre laudos.
+    """
+    definicao = {**MODELO_PADRAO, "cabecalho": [*MODELO_PADRAO["cabecalho"], (vara or "").upper()]}
+    definicao.update(MODELOS_VARA.get(vara, {}))
+    return ModeloLaudo(vara, definicao)
+
+
+def renderizar_laudo(processo):
+    """PDF (bytes) do laudo de um processo, no modelo da vara do processo"""
+    return obter_modelo(processo.get("local")).renderizar(processo)
+
+
+def renderizar_laudos(processos):
+    """Laudos de vários processos (por exemplo, os do dia) numa chamada: [(processo, bytes do PDF)]"""
+    return [(processo, renderizar_laudo(processo)) for processo in processos]
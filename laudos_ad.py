@@ -1,6 +1,7 @@
-import openai
 import streamlit as st
 
+from resumo_processo import paginas_de_texto, resumo_extrativo
+
 # openai.api_key = st.secrets["OPENAI_API_KEY"]
 
 def redigir_laudo_interface():
@@ -40,18 +41,15 @@ def redigir_laudo_interface():
         st.success("Laudo salvo com sucesso! (simulação)")
 
 
-# Função para gerar laudo automaticamente conforme padrões da 17ª Vara
-def gerar_laudo_ad(texto_extraido, nome_parte):
-    st.write("Executando gerar_laudo_ad")
-    st.write("Nome da parte:", nome_parte)
-    st.write("Texto extraído:", texto_extraido)
-
-    laudo = f"""LAUDO MÉDICO PERICIAL - AUXÍLIO-DOENÇA
+# Monta o texto do pré-laudo sem usar a interface (pode rodar num processo worker);
+# resumo é o "Resumo do processo" já limitado (resumo_processo), nunca o texto integral
+def montar_laudo_ad(resumo, nome_parte):
+    return f"""LAUDO MÉDICO PERICIAL - AUXÍLIO-DOENÇA
 
 Autor: {nome_parte}
 
 Resumo do processo:
-{texto_extraido}
+{resumo}
 
 Anamnese:
 [Preencher com dados da entrevista clínica]
@@ -64,7 +62,17 @@ Conclusão:
 
 Este laudo foi gerado automaticamente com base nos padrões da 17ª Vara Federal.
 """
+
+
+# Função para gerar laudo automaticamente conforme padrões da 17ª Vara
+def gerar_laudo_ad(texto_extraido, nome_parte):
+    st.write("Executando gerar_laudo_ad")
+    st.write("Nome da parte:", nome_parte)
+    # Só o tamanho do texto vai para a página; o laudo leva um resumo limitado
+    st.write("Texto extraído:", f"{len(texto_extraido)} caracteres")
+
+    laudo = montar_laudo_ad(resumo_extrativo(paginas_de_texto(texto_extraido)), nome_parte)
     st.success("Laudo gerado com sucesso!")
     return laudo
 
-__all__ = ["gerar_laudo_ad", "redigir_laudo_interface"]
+__all__ = ["gerar_laudo_ad", "montar_laudo_ad", "redigir_laudo_interface"]
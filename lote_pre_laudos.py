@@ -0,0 +1,61 @@
+import os
+
+from arquivos_processo import abrir_blob
+from cache_texto import hash_pdf
+from campos_processo import campos_para_processo
+from extracao_pdf import extrair_campos_pdf, extrair_texto_pdf, paginas_em_cache
+from laudos_ad import montar_laudo_ad
+from resumo_processo import paginas_de_texto, resumo_extrativo
+
+# Número máximo de processos worker da fila de pré-laudos (configurável por variável de ambiente)
+MAX_WORKERS_LOTE = int(os.environ.get("LAUDOS_WORKERS_LOTE", min(4, os.cpu_count() or 1)))
+
+# Geradores de pré-laudo por sigla do tipo de perícia
+GERADORES_PRE_LAUDO = {
+    "AD": montar_laudo_ad,
+    # futuro: "BPC": montar_laudo_bpc,
+}
+
+
+def sigla_tipo(tipo):
+    """'Auxílio Doença (AD)' -> 'AD'"""
+    return tipo.split('(')[-1].replace(')', '').strip()
+
+
+def _gerar_pre_laudo(processo):
+    """Executado no worker: extrai texto e campos do PDF do processo e monta o pré-laudo.
+
+    Retorna {"pre_laudo": texto ou None, "campos": campos do processo}.
+    """
+    gerador = GERADORES_PRE_LAUDO.get(sigla_tipo(processo.get("tipo", "")))
+    resumo = ""
+    campos = {}
+    if processo.get("pdf_handle"):
+        # O worker mapeia o PDF do diretório de blobs; só o handle passa pelo pipe
+        with abrir_blob(processo["pdf_handle"]) as buffer:
+            sha256 = processo.get("pdf_sha256") or hash_pdf(buffer)
+            if gerador is not None:
+                # O pré-laudo leva um resumo limitado (sem páginas descartáveis), não o texto integral
+                texto = extrair_texto_pdf(buffer, sha256=sha256)
+                paginas = paginas_em_cache(sha256)
+                resumo = resumo_extrativo(enumerate(paginas) if paginas is not None else paginas_de_texto(texto))
+            campos = campos_para_processo(extrair_campos_pdf(buffer, sha256=sha256))
+    return {
+        "pre_laudo": gerador(resumo, processo["nome_parte"]) if gerador is not None else None,
+        "campos": campos,
+    }
+
+
+def campos_do_resultado(processo, resultado):
+    """Campos a gravar no processo a partir do resultado do worker.
+
+    Campos extraídos do PDF só preenchem o que ainda não foi informado.
+    """
+    campos = {
+        campo: valor for campo, valor in resultado["campos"].items()
+        if not processo.get(campo) or campo == "campos_fonte"
+    }
+    campos["anexo_status"] = "Pronto"
+    if resultado["pre_laudo"] is not None:
+        campos["pre_laudo"] = resultado["pre_laudo"]
+    return campos
@@ -0,0 +1,143 @@
+import asyncio
+import statistics
+import time
+
+from cliente_ia import MAX_REQUISICOES_SIMULTANEAS, completar, criar_cliente
+from resumo_processo import resumir_processo_async
+
+# Versão dos templates abaixo; incrementar ao alterá-los invalida as respostas em cache
+VERSAO_PROMPTS = 1
+
+# Limite de caracteres do texto do processo enviado em cada pedido
+LIMITE_TEXTO_PROCESSO = 12000
+
+INSTRUCOES_SISTEMA = (
+    "Você é um médico perito judicial redigindo laudos de auxílio-doença para a Justiça Federal. "
+    "Escreva em português formal, na terceira pessoa, sem inventar fatos que não estejam no processo."
+)
+
+# Seções redigidas pela IA: seção -> instrução
+SECOES_REDACAO = {
+    "anamnese": (
+        "Redija a anamnese do(a) periciando(a) {nome_parte} ({tipo}) a partir do processo abaixo: "
+        "queixa principal, história da doença atual e tratamentos realizados."
+    ),
+    "historico": (
+        "Resuma o histórico de benefícios e de vínculos laborais do(a) periciando(a) {nome_parte} "
+        "a partir do processo abaixo (NB, DER, períodos de afastamento e indeferimentos)."
+    ),
+    "conclusao": (
+        "Redija uma minuta de conclusão pericial para {nome_parte} ({tipo}) com base nos documentos "
+        "médicos do processo abaixo, indicando os pontos que o perito ainda precisa confirmar no exame."
+    ),
+}
+
+
+def montar_mensagens(secao, processo):
+    instrucao = SECOES_REDACAO[secao].format(
+        nome_parte=processo.get("nome_parte", ""),
+        tipo=processo.get("tipo", "AD"),
+    )
+    texto = (processo.get("texto") or "")[:LIMITE_TEXTO_PROCESSO]
+    return [
+        {"role": "system", "content": INSTRUCOES_SISTEMA},
+        {"role": "user", "content": f"{instrucao}\n\nProcesso:\n{texto}"},
+    ]
+
+
+async def redigir_secao(cliente, semaforo, secao, processo, **opcoes):
+    """Redige uma seção do laudo e retorna (texto, métricas); opções são repassadas a completar"""
+    return await completar(
+        cliente, semaforo, montar_mensagens(secao, processo), versao_prompt=VERSAO_PROMPTS, **opcoes
+    )
+
+
+async def _redigir_processo(cliente, semaforo, processo, secoes, **opcoes):
+    redigido = {"processo_id": processo.get("id"), "secoes": {}, "erros": {}, "metricas": {}}
+    if "paginas" in processo:
+        # Processo longo: as seções partem do resumo (map-reduce) em vez do texto integral
+        try:
+            resumo, redigido["metricas_resumo"] = await resumir_processo_async(
+                processo["paginas"], cliente, semaforo, **opcoes
+            )
+        except Exception as e:
+            redigido["erros"]["resumo"] = f"{type(e).__name__}: {e}"
+            return redigido
+        redigido["resumo"] = resumo
+        processo = {**processo, "texto": resumo}
+
+    tarefas = [redigir_secao(cliente, semaforo, secao, processo, **opcoes) for secao in secoes]
+    resultados = await asyncio.gather(*tarefas, return_exceptions=True)
+    for secao, resultado in zip(secoes, resultados):
+        if isinstance(resultado, BaseException):
+            redigido["erros"][secao] = f"{type(resultado).__name__}: {resultado}"
+        else:
+            redigido["secoes"][secao], redigido["metricas"][secao] = resultado
+    return redigido
+
+
+async def redigir_lote_async(processos, secoes=tuple(SECOES_REDACAO), cliente=None,
+                             max_simultaneas=MAX_REQUISICOES_SIMULTANEAS, **opcoes):
+    """Redige as seções de todos os processos ao mesmo tempo, com no máximo `max_simultaneas` pedidos em andamento.
+
+    Cada processo precisa de "nome_parte", "tipo" e "texto" ou "paginas" ((número, texto) de cada
+    página, resumidas antes da redação). Opções como cache, modelo e timeout são repassadas a completar.
+
+    Retorna (resultados por processo, métricas do lote).
+    """
+    semaforo = asyncio.Semaphore(max_simultaneas)
+    proprio_cliente = cliente is None
+    if proprio_cliente:
+        cliente = criar_cliente()
+    inicio = time.perf_counter()
+    try:
+        resultados = await asyncio.gather(
+            *(_redigir_processo(cliente, semaforo, processo, secoes, **opcoes) for processo in processos)
+        )
+    finally:
+        if proprio_cliente:
+            await cliente.close()
+    return resultados, metricas_lote(resultados, time.perf_counter() - inicio)
+
+
+def metricas_lote(resultados, duracao):
+    """Vazão, latência do pedido e tempo total por seção (p50/p95) de um lote, e o custo de cada etapa do resumo"""
+    metricas = [m for resultado in resultados for m in resultado["metricas"].values()]
+    latencias = sorted(m["latencia"] for m in metricas)
+    tempos_totais = sorted(m["tempo_total"] for m in metricas)
+    resumo = {}
+    for resultado in resultados:
+        for etapa, valores in resultado.get("metricas_resumo", {}).items():
+            acumulado = resumo.setdefault(etapa, {})
+            for nome, valor in valores.items():
+                acumulado[nome] = acumulado.get(nome, 0) + valor
+    return {
+        "duracao": duracao,
+        "pedidos": len(metricas),
+        "acertos_cache": sum(m["cache"] for m in metricas),
+        "falhas": sum(len(resultado["erros"]) for resultado in resultados),
+        "novas_tentativas": sum(m["tentativas"] - 1 for m in metricas),
+        "pedidos_por_segundo": len(metricas) / duracao if duracao else 0.0,
+        "latencia_p50": statistics.median(latencias) if latencias else 0.0,
+        "latencia_p95": latencias[int(len(latencias) * 0.95)] if latencias else 0.0,
+        "tempo_total_p50": statistics.median(tempos_totais) if tempos_totais else 0.0,
+        "tempo_total_p95": tempos_totais[int(len(tempos_totais) * 0.95)] if tempos_totais else 0.0,
+        "tokens_entrada": sum(m["tokens_entrada"] for m in metricas),
+        "tokens_saida": sum(m["tokens_saida"] for m in metricas),
+        "resumo": resumo,
+    }
+
+
+def redigir_lote(processos, cliente=None, **opcoes):
+    """Versão síncrona de redigir_lote_async (para chamar da interface ou de scripts).
+
+    O cliente fica preso ao laço de eventos desta chamada e é fechado ao final.
+    """
+    async def executar():
+        cliente_ia = cliente or criar_cliente()
+        try:
+            return await redigir_lote_async(processos, cliente=cliente_ia, **opcoes)
+        finally:
+            await cliente_ia.close()
+
+    return asyncio.run(executar())
@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+
+from cliente_ia import MAX_REQUISICOES_SIMULTANEAS, completar, criar_cliente
+
+# Orçamentos em tokens (estimados em ~4 caracteres por token; configuráveis por variável de ambiente)
+CARACTERES_POR_TOKEN = 4
+ORCAMENTO_RESUMO_PARCIAL = 300
+# Um trecho comporta ao menos dois resumos parciais; com menos, a redução não teria o que juntar
+ORCAMENTO_TRECHO = max(int(os.environ.get("LAUDOS_RESUMO_TOKENS_TRECHO", "3000")), 3 * ORCAMENTO_RESUMO_PARCIAL)
+ORCAMENTO_RESUMO = int(os.environ.get("LAUDOS_RESUMO_TOKENS", "800"))
+
+# Versão dos templates de resumo (faz parte da chave do cache de respostas)
+VERSAO_PROMPTS_RESUMO = 1
+
+# Páginas com menos texto que isso (capas, separadores, digitalizações sem OCR) são descartadas
+MINIMO_CARACTERES_PAGINA = 80
+
+# Peças processuais sem conteúdo médico, reconhecidas pelo início da página
+PADRAO_PAGINA_DESCARTAVEL = re.compile(
+    r"(certid[ãa]o|procura[çc][ãa]o|substabelecimento|termo de juntada|ato ordinat[óo]rio|"
+    r"(mandado de )?intima[çc][ãa]o|declara[çc][ãa]o de hipossufici[êe]ncia|comprovante de resid[êe]ncia)"
+)
+
+INSTRUCOES_RESUMO = (
+    "Você auxilia um médico perito judicial. Resuma apenas fatos presentes no texto, em português, "
+    "sem opiniões: doenças e CIDs, tratamentos, exames, afastamentos, benefícios (NB, DER) e datas."
+)
+
+
+def estimar_tokens(texto):
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+
+def pagina_descartavel(texto, vistas):
+    """Página vazia, de peça processual sem conteúdo médico ou repetida (vistas guarda as já lidas)"""
+    normalizado = " ".join(texto.split()).lower()
+    if len(normalizado) < MINIMO_CARACTERES_PAGINA:
+        return True
+    if PADRAO_PAGINA_DESCARTAVEL.match(normalizado[:200]):
+        return True
+    assinatura = hashlib.sha1(normalizado.encode("utf-8")).digest()
+    if assinatura in vistas:
+        return True
+    vistas.add(assinatura)
+    return False
+
+
+def _partes(texto, limite):
+    """Divide um texto maior que o limite em partes, de preferência em quebras de linha"""
+    while len(texto) > limite:
+        corte = texto.rfind("\n", 0, limite)
+        if corte <= limite // 2:
+            corte = limite
+        yield texto[:corte]
+        texto = texto[corte:]
+    yield texto
+
+
+def paginas_de_texto(texto, tamanho=ORCAMENTO_RESUMO_PARCIAL * 10):
+    """Divide um texto já extraído (sem os limites das páginas) em (número, parte) do tamanho de uma página"""
+    return enumerate(_partes(texto, tamanho))
+
+
+def dividir_em_trechos(paginas, orcamento_tokens=ORCAMENTO_TRECHO, estatisticas=None):
+    """Agrupa (número, texto) das páginas em trechos de até orcamento_tokens, à medida que as páginas chegam.
+
+    Páginas descartáveis ficam de fora. Gera {"paginas": (primeira, última), "texto"} com as
+    páginas numeradas a partir de 0; estatisticas (dict) recebe páginas lidas e descartadas.
+    """
+    estatisticas = estatisticas if estatisticas is not None else {}
+    estatisticas.setdefault("paginas", 0)
+    estatisticas.setdefault("descartadas", 0)
+    limite = orcamento_tokens * CARACTERES_POR_TOKEN
+    vistas = set()
+    atual, tamanho, primeira, ultima = [], 0, None, None
+    for numero, texto in paginas:
+        estatisticas["paginas"] += 1
+        if pagina_descartavel(texto, vistas):
+            estatisticas["descartadas"] += 1
+            continue
+        for parte in _partes(texto, limite):
+            if atual and tamanho + len(parte) > limite:
+                yield {"paginas": (primeira, ultima), "texto": "".join(atual)}
+                atual, tamanho, primeira = [], 0, None
+            if primeira is None:
+                primeira = numero
+            atual.append(parte)
+            tamanho += len(parte)
+            ultima = numero
+    if atual:
+        yield {"paginas": (primeira, ultima), "texto": "".join(atual)}
+
+
+def resumo_extrativo(paginas, orcamento_tokens=ORCAMENTO_RESUMO):
+    """Resumo sem modelo: o início do texto útil (sem páginas descartáveis) até o orçamento"""
+    limite = orcamento_tokens * CARACTERES_POR_TOKEN
+    partes, tamanho = [], 0
+    for trecho in dividir_em_trechos(paginas, orcamento_tokens):
+        restante = limite - tamanho
+        if len(trecho["texto"]) > restante:
+            partes.append(trecho["texto"][:restante].rstrip() + "\n[...]")
+            break
+        partes.append(trecho["texto"])
+        tamanho += len(trecho["texto"])
+    return "".join(partes).strip()
+
+
+def _mensagens_parcial(trecho):
+    primeira, ultima = trecho["paginas"]
+    return [
+        {"role": "system", "content": INSTRUCOES_RESUMO},
+        {"role": "user", "content": (
+            f"Resuma em até {ORCAMENTO_RESUMO_PARCIAL * 3 // 4} palavras as páginas {primeira + 1} a {ultima + 1} "
+            f"do processo:\n\n{trecho['texto']}"
+        )},
+    ]
+
+
+def _mensagens_reducao(resumos, final):
+    pedido = (
+        f"Com base nos resumos parciais abaixo, em ordem de páginas, escreva o \"Resumo do processo\" "
+        f"para o laudo pericial em até {ORCAMENTO_RESUMO * 3 // 4} palavras."
+        if final else
+        f"Junte os resumos parciais abaixo, em ordem de páginas, num só resumo de até "
+        f"{ORCAMENTO_RESUMO_PARCIAL * 3 // 4} palavras."
+    )
+    return [
+        {"role": "system", "content": INSTRUCOES_RESUMO},
+        {"role": "user", "content": pedido + "\n\n" + "\n\n---\n\n".join(resumos)},
+    ]
+
+
+def _agrupar(resumos, orcamento_tokens):
+    grupos, atual, tokens = [], [], 0
+    for resumo in resumos:
+        if atual and tokens + estimar_tokens(resumo) > orcamento_tokens:
+            grupos.append(atual)
+            atual, tokens = [], 0
+        atual.append(resumo)
+        tokens += estimar_tokens(resumo)
+    if atual:
+        grupos.append(atual)
+    return grupos
+
+
+def _somar(etapa, metricas):
+    etapa["pedidos"] += 1
+    etapa["acertos_cache"] += metricas["cache"]
+    etapa["tokens_entrada"] += metricas["tokens_entrada"]
+    etapa["tokens_saida"] += metricas["tokens_saida"]
+
+
+def _nova_etapa():
+    return {"pedidos": 0, "acertos_cache": 0, "tokens_entrada": 0, "tokens_saida": 0, "duracao": 0.0}
+
+
+async def _cancelar(tarefas):
+    """Cancela os pedidos ainda em andamento e espera que terminem (o gather só repassa o primeiro erro)"""
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+async def resumir_processo_async(paginas, cliente, semaforo, orcamento_trecho=ORCAMENTO_TRECHO, **opcoes):
+    """Resumo limitado do processo por map-reduce: resume os trechos em paralelo e junta os resumos.
+
+    paginas: (número, texto) de cada página, pode ser um gerador. Opções (modelo, timeout,
+    cache) são repassadas a completar. Retorna (resumo, métricas por etapa).
+    """
+    opcoes.setdefault("versao_prompt", VERSAO_PROMPTS_RESUMO)
+    divisao = {"trechos": 0, "tokens": 0}
+    mapa, reducao = _nova_etapa(), _nova_etapa()
+    reducao["niveis"] = 0
+    metricas = {"divisao": divisao, "mapa": mapa, "reducao": reducao}
+
+    # Mapa: cada trecho vai para o modelo assim que é formado, enquanto as próximas páginas são lidas
+    inicio = time.perf_counter()
+    trechos, tarefas = [], []
+    try:
+        for trecho in dividir_em_trechos(paginas, orcamento_trecho, divisao):
+            trechos.append(trecho)
+            divisao["trechos"] += 1
+            divisao["tokens"] += estimar_tokens(trecho["texto"])
+            # Enquanto o texto útil couber no resumo final, nenhum pedido é feito
+            if divisao["tokens"] > ORCAMENTO_RESUMO:
+                for pendente in trechos[len(tarefas):]:
+                    tarefas.append(asyncio.ensure_future(completar(
+                        cliente, semaforo, _mensagens_parcial(pendente), max_tokens=ORCAMENTO_RESUMO_PARCIAL, **opcoes
+                    )))
+                await asyncio.sleep(0)
+        divisao["duracao"] = time.perf_counter() - inicio
+
+        # Processo curto: o próprio texto útil já é o resumo
+        if not tarefas:
+            return "".join(trecho["texto"] for trecho in trechos).strip(), metricas
+
+        inicio = time.perf_counter()
+        respostas = await asyncio.gather(*tarefas)
+    except BaseException:
+        # Falha na leitura das páginas ou num pedido: os demais pedidos não continuam gastando tokens
+        await _cancelar(tarefas)
+        raise
+    resumos = []
+    for texto, metricas_pedido in respostas:
+        resumos.append(texto)
+        _somar(mapa, metricas_pedido)
+    mapa["duracao"] = time.perf_counter() - inicio
+
+    # Redução: enquanto os resumos não couberem num pedido, junta grupos em paralelo (em árvore)
+    inicio = time.perf_counter()
+    while len(resumos) > 1 and sum(estimar_tokens(resumo) for resumo in resumos) > orcamento_trecho:
+        grupos = _agrupar(resumos, orcamento_trecho)
+        # Cada resumo sozinho no grupo (orçamento pequeno ou resumos longos): outro nível só repetiria os
+        # pedidos sem diminuir a lista; a redução final junta o que houver
+        if len(grupos) == len(resumos):
+            break
+        reducao["niveis"] += 1
+        tarefas = [
+            asyncio.ensure_future(completar(cliente, semaforo, _mensagens_reducao(grupo, final=False),
+                                            max_tokens=ORCAMENTO_RESUMO_PARCIAL, **opcoes))
+            for grupo in grupos
+        ]
+        try:
+            respostas = await asyncio.gather(*tarefas)
+        except BaseException:
+            await _cancelar(tarefas)
+            raise
+        resumos = []
+        for texto, metricas_pedido in respostas:
+            resumos.append(texto)
+            _somar(reducao, metricas_pedido)
+    reducao["niveis"] += 1
+    resumo, metricas_pedido = await completar(
+        cliente, semaforo, _mensagens_reducao(resumos, final=True), max_tokens=ORCAMENTO_RESUMO, **opcoes
+    )
+    _somar(reducao, metricas_pedido)
+    reducao["duracao"] = time.perf_counter() - inicio
+    # O orçamento vale mesmo se o modelo ignorar max_tokens
+    return resumo[:ORCAMENTO_RESUMO * CARACTERES_POR_TOKEN], metricas
+
+
+def resumir_processo(paginas, cliente=None, max_simultaneas=MAX_REQUISICOES_SIMULTANEAS, **opcoes):
+    """Versão síncrona de resumir_processo_async (para scripts); o cliente é fechado ao final"""
+    async def executar():
+        cliente_ia = cliente or criar_cliente()
+        try:
+            return await resumir_processo_async(paginas, cliente_ia, asyncio.Semaphore(max_simultaneas), **opcoes)
+        finally:
+            await cliente_ia.close()
+
+    return asyncio.run(executar())
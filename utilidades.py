@@ -1,29 +1,94 @@
 from fpdf import FPDF
 import os
-from datetime import datetime
+import tempfile
+from datetime import date, datetime
 
-def gerar_certidao_ausencia(numero_processo, nome_parte, tipo, horario, data, local, nome_arquivo="certidao_ausencia.pdf"):
+TITULO_CERTIDAO = "CERTIDÃO DE AUSÊNCIA"
+
+
+def _data(data):
+    """Aceita date/datetime ou data ISO (como vem do banco)"""
+    if isinstance(data, (date, datetime)):
+        return data
+    return datetime.strptime(data, "%Y-%m-%d").date()
+
+
+def _latin1(texto):
+    # As fontes padrão do FPDF só cobrem Latin-1; caracteres fora dele viram "?" em vez de quebrar o PDF
+    return str(texto).encode("latin-1", "replace").decode("latin-1")
+
+
+def _novo_documento():
+    """Documento com a fonte já definida; cada add_page reaproveita a fonte e o layout"""
     pdf = FPDF()
-    pdf.add_page()
     pdf.set_font("Arial", size=12)
+    return pdf
+
+
+def _escrever_certidao(pdf, numero_processo, nome_parte, tipo, horario, data, local):
+    data_formatada = _data(data).strftime('%d/%m/%Y')
+    pdf.add_page()
 
-    pdf.cell(200, 10, txt="CERTIDÃO DE AUSÊNCIA", ln=True, align="C")
+    pdf.cell(200, 10, txt=TITULO_CERTIDAO, ln=True, align="C")
     pdf.ln(10)
 
     texto = (
-        f"Certifico que, na data de {data.strftime('%d/%m/%Y')}, às {horario}, "
+        f"Certifico que, na data de {data_formatada}, às {horario}, "
         f"no local de perícia \"{local}\", referente ao processo {numero_processo} "
         f"do tipo {tipo}, a parte autora {nome_parte} não compareceu para a realização da perícia médica designada.\n\n"
         f"Assim, lavro a presente certidão para os devidos fins."
     )
 
-    pdf.multi_cell(0, 10, txt=texto)
+    pdf.multi_cell(0, 10, txt=_latin1(texto))
     pdf.ln(20)
 
-    pdf.cell(0, 10, txt=f"Local e data: {local}, {data.strftime('%d/%m/%Y')}", ln=True)
+    pdf.cell(0, 10, txt=_latin1(f"Local e data: {local}, {data_formatada}"), ln=True)
+
+
+def _escrever_certidao_processo(pdf, processo):
+    _escrever_certidao(
+        pdf, processo["numero_processo"], processo["nome_parte"], processo.get("tipo", ""),
+        processo["horario"], processo["data"], processo["local"]
+    )
+
+
+def _bytes_documento(pdf):
+    # FPDF 1.7 devolve o PDF como str Latin-1
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def gerar_certidoes_ausencia(processos, mesclar=True):
+    """Certidões de ausência de vários processos, geradas em memória numa única passada.
+
+    processos: dicionários do repositório (numero_processo, nome_parte, tipo, horario, data, local).
+    mesclar=True retorna os bytes de um único PDF com uma certidão por página; mesclar=False
+    retorna [(processo, bytes do PDF)] com uma certidão por arquivo.
+    """
+    if mesclar:
+        pdf = _novo_documento()
+        for processo in processos:
+            _escrever_certidao_processo(pdf, processo)
+        return _bytes_documento(pdf) if pdf.page else b""
+    certidoes = []
+    for processo in processos:
+        pdf = _novo_documento()
+        _escrever_certidao_processo(pdf, processo)
+        certidoes.append((processo, _bytes_documento(pdf)))
+    return certidoes
+
+
+def gerar_certidao_ausencia(numero_processo, nome_parte, tipo, horario, data, local, nome_arquivo=None):
+    """Grava uma certidão em temp/ e retorna o caminho (sem nome_arquivo, o nome é único por chamada)"""
+    pdf = _novo_documento()
+    _escrever_certidao(pdf, numero_processo, nome_parte, tipo, horario, data, local)
 
     os.makedirs("temp", exist_ok=True)
-    caminho = os.path.join("temp", nome_arquivo)
-    pdf.output(caminho)
+    if nome_arquivo:
+        caminho = os.path.join("temp", nome_arquivo)
+    else:
+        descritor, caminho = tempfile.mkstemp(dir="temp", prefix="certidao_ausencia_", suffix=".pdf")
+        os.close(descritor)
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(_bytes_documento(pdf))
 
-    return caminho
\ No newline at end of file
+    return caminho
@@ -1,14 +1,9 @@
+from extracao_pdf import extrair_texto_pdf as _extrair_texto_pdf
 
-
-
-import fitz  # PyMuPDF
-
-def extrair_texto_pdf(caminho_pdf):
+def extrair_texto_pdf(caminho_pdf, **opcoes):
     texto = ""
     try:
-        with fitz.open(caminho_pdf) as doc:
-            for pagina in doc:
-                texto += pagina.get_text()
+        texto = _extrair_texto_pdf(caminho_pdf, **opcoes)
     except Exception as e:
         print(f"Erro ao extrair texto do PDF: {e}")
-    return texto
\ No newline at end of file
+    return texto